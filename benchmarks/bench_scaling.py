@@ -0,0 +1,195 @@
+"""
+Calls per machine as a function of workers run by the Supervisor.
+
+For each worker count the benchmark starts the real Supervisor with stand-in
+workers (benchmarks/scaling_worker.py). Each worker is pinned to its core and
+admits jobs with its AdmissionController like the agent. A dispatcher then
+offers calls at a steady rate, sending each to the least loaded worker as the
+LiveKit server does, and trying the next worker when one rejects it. Every
+accepted call runs the agent's per-call CPU work in real time.
+
+Reported per worker count:
+    peak     most calls running at once
+    ok       calls that stayed real time (never more than --max-lag behind)
+    late     calls that fell behind
+    rejected calls no worker admitted
+    spread   accepted calls per worker
+
+Usage:
+    python benchmarks/bench_scaling.py [--max-workers N] [--duration 30]
+        [--call-seconds 20] [--rate 2]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+from typing import Any, Optional
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import aiohttp
+
+WORKER_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "scaling_worker.py"
+)
+
+
+def _supervise(num_workers: int, base_port: int) -> None:
+    import logging
+
+    from supervisor import Supervisor
+
+    logging.basicConfig(level=logging.WARNING)
+    Supervisor(WORKER_SCRIPT, [], num_workers=num_workers, base_port=base_port).run()
+
+
+async def _get(session: aiohttp.ClientSession, url: str) -> Optional[Any]:
+    try:
+        async with session.get(url) as resp:
+            return await resp.json()
+    except aiohttp.ClientError:
+        return None
+
+
+async def _wait_ready(
+    session: aiohttp.ClientSession, urls: list[str], timeout: float
+) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        loads = await asyncio.gather(*(_get(session, f"{url}/load") for url in urls))
+        if all(load is not None for load in loads):
+            return
+        await asyncio.sleep(0.5)
+    raise RuntimeError("workers did not start in time")
+
+
+async def _dispatch(
+    session: aiohttp.ClientSession, urls: list[str], job_id: str, seconds: float
+) -> Optional[int]:
+    """Offer a call to the workers from least to most loaded; return the taker."""
+    loads = await asyncio.gather(*(_get(session, f"{url}/load") for url in urls))
+    order = sorted(
+        (i for i, load in enumerate(loads) if load is not None),
+        key=lambda i: (loads[i]["load"], loads[i]["active"]),
+    )
+    for i in order:
+        async with session.post(
+            f"{urls[i]}/jobs", json={"id": job_id, "seconds": seconds}
+        ) as resp:
+            if (await resp.json())["accepted"]:
+                return i
+    return None
+
+
+async def _offer_calls(
+    urls: list[str], duration: float, call_seconds: float, rate: float
+) -> dict[str, Any]:
+    async with aiohttp.ClientSession() as session:
+        await _wait_ready(session, urls, timeout=120)
+        dispatches = []
+        peak = 0
+        started = time.monotonic()
+        sent = 0
+        while time.monotonic() - started < duration:
+            # admission may defer a job, so do not wait for one before the next
+            dispatches.append(
+                asyncio.create_task(
+                    _dispatch(session, urls, f"call-{sent}", call_seconds)
+                )
+            )
+            sent += 1
+            loads = await asyncio.gather(
+                *(_get(session, f"{url}/load") for url in urls)
+            )
+            peak = max(peak, sum(load["active"] for load in loads if load is not None))
+            await asyncio.sleep(max(started + sent / rate - time.monotonic(), 0.0))
+
+        takers = await asyncio.gather(*dispatches)
+        # let the accepted calls finish, sampling concurrency while they drain
+        deadline = time.monotonic() + call_seconds + 5
+        while time.monotonic() < deadline:
+            loads = await asyncio.gather(
+                *(_get(session, f"{url}/load") for url in urls)
+            )
+            active = sum(load["active"] for load in loads if load is not None)
+            peak = max(peak, active)
+            if active == 0:
+                break
+            await asyncio.sleep(1.0)
+        calls = await asyncio.gather(*(_get(session, f"{url}/calls") for url in urls))
+
+    return {
+        "takers": takers,
+        "peak": peak,
+        "calls": [call for worker_calls in calls for call in worker_calls or []],
+    }
+
+
+def run(
+    workers: int, base_port: int, duration: float, call_seconds: float, rate: float
+) -> dict[str, Any]:
+    """Start a Supervisor with the given worker count and offer calls to it."""
+    ctx = multiprocessing.get_context("spawn")
+    supervisor = ctx.Process(target=_supervise, args=(workers, base_port))
+    supervisor.start()
+    urls = [f"http://127.0.0.1:{base_port + i}" for i in range(workers)]
+    try:
+        return asyncio.run(_offer_calls(urls, duration, call_seconds, rate))
+    finally:
+        # SIGTERM: the supervisor forwards it to its workers and waits for them
+        supervisor.terminate()
+        supervisor.join(timeout=90)
+        if supervisor.is_alive():
+            supervisor.kill()
+
+
+def main() -> None:
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+    cpus = cpus or list(range(os.cpu_count() or 1))
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--max-workers", type=int, default=len(cpus))
+    parser.add_argument(
+        "--duration", type=float, default=30.0, help="seconds calls are offered"
+    )
+    parser.add_argument("--call-seconds", type=float, default=20.0)
+    parser.add_argument(
+        "--rate", type=float, default=2.0, help="calls offered per second per worker"
+    )
+    parser.add_argument("--max-lag", type=float, default=0.25)
+    parser.add_argument("--base-port", type=int, default=18081)
+    args = parser.parse_args()
+
+    print(f"cores available: {len(cpus)}")
+    print(
+        f"{'workers':>8} {'offered':>8} {'peak':>6} {'ok':>6} {'late':>6} "
+        f"{'rejected':>9} {'scaling':>8}  spread"
+    )
+    baseline = None
+    for workers in range(1, args.max_workers + 1):
+        result = run(
+            workers,
+            args.base_port,
+            args.duration,
+            args.call_seconds,
+            args.rate * workers,
+        )
+        takers = result["takers"]
+        ok = sum(call["max_lag_s"] <= args.max_lag for call in result["calls"])
+        late = len(result["calls"]) - ok
+        rejected = takers.count(None)
+        spread = "/".join(str(takers.count(i)) for i in range(workers))
+        baseline = baseline or result["peak"] or 1
+        print(
+            f"{workers:>8} {len(takers):>8} {result['peak']:>6} {ok:>6} {late:>6} "
+            f"{rejected:>9} {result['peak'] / baseline:>7.2f}x  {spread}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Stand-in agent worker started by the Supervisor in the scaling benchmark.
+
+It is set up like the real worker: configure_worker pins the process to its core
+and picks its port, and an AdmissionController computes its load and admits
+jobs. Instead of registering with LiveKit it serves its load and takes jobs over
+HTTP. Each job simulates one call, running the agent's per-call CPU work (Silero
+VAD, the interruption energy check and Soniox token bookkeeping) paced at real
+time, and records how far it fell behind.
+
+Endpoints:
+    GET /load   current load, its components and admission counters
+    POST /jobs  {"id": str, "seconds": float}, answers {"accepted": bool}
+    GET /calls  lag of every finished call
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import numpy as np
+from aiohttp import web
+from livekit import rtc
+from livekit.plugins.silero.onnx_model import OnnxModel, new_inference_session
+
+from interruptions import InterruptionClassifier
+from supervisor import WORKER_INDEX_ENV, configure_worker, worker_cpu
+from worker_load import AdmissionController, load_reporter
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 320  # 20ms
+TOKENS = [
+    {
+        "text": "merhaba",
+        "start_ms": 0,
+        "end_ms": 400,
+        "is_final": True,
+        "confidence": 0.9,
+    },
+    {
+        "text": "alarm",
+        "start_ms": 450,
+        "end_ms": 800,
+        "is_final": False,
+        "confidence": 0.8,
+    },
+]
+
+
+class _JobRequest:
+    """The part of livekit's JobRequest that AdmissionController.request_fnc uses."""
+
+    def __init__(self, job_id: str) -> None:
+        self.id = job_id
+        self.accepted: Optional[bool] = None
+
+    async def accept(self) -> None:
+        self.accepted = True
+
+    async def reject(self) -> None:
+        self.accepted = False
+
+
+class StandInWorker:
+    def __init__(self) -> None:
+        self.index = int(os.environ.get(WORKER_INDEX_ENV, "0"))
+        self.admission = AdmissionController(cpu_index=worker_cpu())
+        self.session = new_inference_session(True)
+        rng = np.random.default_rng(self.index)
+        self.audio = (rng.standard_normal(SAMPLE_RATE) * 3000).astype(np.int16)
+        self.frames = [
+            rtc.AudioFrame(
+                self.audio[i : i + FRAME_SAMPLES].tobytes(),
+                SAMPLE_RATE,
+                1,
+                FRAME_SAMPLES,
+            )
+            for i in range(0, SAMPLE_RATE, FRAME_SAMPLES)
+        ]
+        self.active = 0
+        # a thread per call: queued calls would hide how far behind they are
+        self.executor = ThreadPoolExecutor(max_workers=256)
+        self.calls: list[dict[str, Any]] = []
+        self._tasks: set[asyncio.Task] = set()
+
+    def _call(self, job_id: str, seconds: float) -> dict[str, Any]:
+        """Run one call's per-second work in real time; runs in its own thread."""
+        model = OnnxModel(onnx_session=self.session, sample_rate=SAMPLE_RATE)
+        window = model.window_size_samples
+        windows = [
+            self.audio[i : i + window].astype(np.float32) / 32768.0
+            for i in range(0, SAMPLE_RATE - window + 1, window)
+        ]
+        classifier = InterruptionClassifier()
+
+        started = time.perf_counter()
+        max_lag = 0.0
+        for second in range(int(seconds)):
+            for samples in windows:
+                model(samples)
+            for i in range(0, len(self.frames), 10):
+                classifier.energy_dbfs(self.frames[i : i + 10])
+            for _ in range(5):
+                classifier.observe_tokens(TOKENS)
+            # the next second of audio arrives one second after this one
+            due = started + second + 1
+            max_lag = max(max_lag, time.perf_counter() - due)
+            time.sleep(max(due - time.perf_counter(), 0.0))
+        return {"id": job_id, "seconds": seconds, "max_lag_s": round(max_lag, 3)}
+
+    async def _run_call(self, job_id: str, seconds: float) -> None:
+        self.active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            self.calls.append(
+                await loop.run_in_executor(self.executor, self._call, job_id, seconds)
+            )
+        finally:
+            self.active -= 1
+
+    async def handle_load(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "worker": self.index,
+                "load": self.admission.current_load(),
+                "components": self.admission.components(),
+                "active": self.active,
+                "accepted": self.admission.accepted,
+                "deferred": self.admission.deferred,
+                "rejected": self.admission.rejected,
+            }
+        )
+
+    async def handle_job(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        job = _JobRequest(body["id"])
+        await self.admission.request_fnc(job)
+        if job.accepted:
+            task = asyncio.create_task(self._run_call(job.id, float(body["seconds"])))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return web.json_response({"worker": self.index, "accepted": bool(job.accepted)})
+
+    async def handle_calls(self, request: web.Request) -> web.Response:
+        return web.json_response(self.calls)
+
+
+async def _main() -> None:
+    # rejections are expected here, the benchmark counts them
+    logging.getLogger("worker_load").setLevel(logging.ERROR)
+    overrides = configure_worker()
+    worker = StandInWorker()
+    # the load of a worker's calls, as the real job processes publish it
+    load_reporter.add_gauge("calls", lambda: worker.active)
+    load_reporter.start()
+    worker.admission.components()
+
+    app = web.Application()
+    app.router.add_get("/load", worker.handle_load)
+    app.router.add_post("/jobs", worker.handle_job)
+    app.router.add_get("/calls", worker.handle_calls)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", overrides.get("port", 8081)).start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await load_reporter.aclose()
+
+
+if __name__ == "__main__":
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_main())
@@ -1,4 +1,14 @@
+import asyncio
+import contextvars
+import json
 import logging
+import multiprocessing.util
+import os
+import re
+import sys
+import time
+from collections.abc import AsyncIterable
+from typing import Any, Callable, Optional, Union
 
 from dotenv import load_dotenv
 from livekit.agents import (
@@ -6,29 +16,296 @@ from livekit.agents import (
     Agent,
     AgentFalseInterruptionEvent,
     AgentSession,
+    ConversationItemAddedEvent,
     JobContext,
     JobProcess,
     MetricsCollectedEvent,
+    ModelSettings,
     RoomInputOptions,
     RunContext,
     WorkerOptions,
     cli,
+    llm,
     metrics,
 )
 from livekit.agents.llm import function_tool
-from livekit.plugins import cartesia, deepgram, noise_cancellation, openai, silero
-from soniox_plugin import create_soniox_stt
+from livekit.plugins import deepgram, noise_cancellation, silero
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
+from agent_config import AgentConfig, ConfigWatcher
+from call_recorder import CallRecorder, RecordingWriter
+from context_window import ContextWindowManager
+from crm_tools import CRMTools, ToolError, create_crm_backend
+from interruptions import GatedVAD, InterruptionClassifier, SpeechResumer
+from provider_pool import ProviderPools
+from soniox_plugin import SonioxSTT, SpeakerLock, StablePrefix, create_soniox_stt
+from stt_failover import FailoverSTT
+from supervisor import Supervisor, configure_worker, worker_cpu
+from tts_chunker import ChunkedTTSPipeline
+from worker_load import AdmissionController, load_directory, load_reporter
+
 logger = logging.getLogger("agent")
 
 load_dotenv(".env.local")
 
 
-class Assistant(Agent):
-    def __init__(self) -> None:
-        super().__init__(
-            instructions="""
+def _normalize_transcript(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", text.casefold()).split())
+
+
+def _last_user_text(chat_ctx: llm.ChatContext) -> str:
+    items = chat_ctx.items
+    if items and items[-1].type == "message" and items[-1].role == "user":
+        return items[-1].text_content or ""
+    return ""
+
+
+def _chunk_content(chunk: Any) -> tuple[str, list[dict[str, Any]]]:
+    """Return the text and tool calls carried by an llm_node chunk."""
+    if isinstance(chunk, str):
+        return chunk, []
+    if isinstance(chunk, llm.ChatChunk) and chunk.delta is not None:
+        return chunk.delta.content or "", [call.model_dump() for call in chunk.delta.tool_calls]
+    return "", []
+
+
+# set inside speculative generations, so their LLM requests can be told apart
+speculating: contextvars.ContextVar[bool] = contextvars.ContextVar("speculating", default=False)
+
+
+class _Speculation:
+    """A single in-flight LLM generation started from a stable interim prefix."""
+
+    _DONE = object()
+
+    def __init__(
+        self,
+        text: str,
+        anchor_id: Optional[str],
+        stream: AsyncIterable[Any],
+        on_done: Optional[Callable[["_Speculation"], None]] = None,
+    ) -> None:
+        self.text = text
+        self.anchor_id = anchor_id
+        self.started_at = time.perf_counter()
+        self.claimed_at: Optional[float] = None
+        self.reply = ""
+        self.tool_calls: list[dict[str, Any]] = []
+        self.ttft_s: Optional[float] = None
+        self.duration_s: Optional[float] = None
+        self._chunks: asyncio.Queue = asyncio.Queue()
+        self._error: Optional[BaseException] = None
+        self._on_done = on_done
+        self._task = asyncio.create_task(self._run(stream))
+
+    async def _run(self, stream: AsyncIterable[Any]) -> None:
+        # the task runs in its own copy of the context
+        speculating.set(True)
+        try:
+            async for chunk in stream:
+                if self.ttft_s is None:
+                    self.ttft_s = round(time.perf_counter() - self.started_at, 3)
+                text, tool_calls = _chunk_content(chunk)
+                self.reply += text
+                self.tool_calls.extend(tool_calls)
+                self._chunks.put_nowait(chunk)
+        except Exception as e:
+            self._error = e
+        finally:
+            self.duration_s = round(time.perf_counter() - self.started_at, 3)
+            self._chunks.put_nowait(self._DONE)
+            if self._on_done is not None:
+                self._on_done(self)
+
+    async def stream(self) -> AsyncIterable[Any]:
+        try:
+            while True:
+                chunk = await self._chunks.get()
+                if chunk is self._DONE:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                yield chunk
+        finally:
+            # stop generating when the consumer stops reading
+            self.cancel()
+
+    def cancel(self) -> None:
+        self._task.cancel()
+
+
+class SpeculativeReplyController:
+    """Starts LLM generation on the stable Soniox prefix before the caller finishes.
+
+    A running speculation is restarted only when the stable prefix changes
+    materially: when a word it answered is revised, when the prefix has grown by
+    `min_extension_words` words, or when Soniox has finalized the whole prefix.
+    Shorter extensions leave it running instead of issuing an LLM request per
+    stable word. When the real turn reaches `llm_node`, the speculation is used
+    only if the final transcript equals its text, since a single word
+    ("olur"/"olmaz") can invert the meaning, and it counts as a hit once that
+    reply has been generated completely.
+
+    Every started speculation ends as a hit, a restart (replaced by a newer
+    prefix) or waste (discarded without a replacement).
+    """
+
+    def __init__(self, *, min_chars: int = 12, min_extension_words: int = 3) -> None:
+        self.min_chars = min_chars
+        self.min_extension_words = min_extension_words
+        self._agent: Optional[Agent] = None
+        self._current: Optional[_Speculation] = None
+        self.started = 0
+        self.hits = 0
+        self.restarts = 0
+        self.skipped = 0
+        self.wasted = 0
+        self.saved_seconds = 0.0
+        self._generation_listeners: list[Callable[[dict[str, Any]], None]] = []
+        self._commit_listeners: list[Callable[[], None]] = []
+
+    def on_generation(self, callback: Callable[[dict[str, Any]], None]) -> None:
+        """
+        Register a callback invoked when a speculative generation ends.
+
+        Args:
+            callback: Called with the prefix the generation answered, its reply,
+                tool calls and timings, whether or not the reply was used
+        """
+        self._generation_listeners.append(callback)
+
+    def _generation_done(self, speculation: _Speculation) -> None:
+        generation = {
+            "user_text": speculation.text,
+            "text": speculation.reply,
+            "tool_calls": speculation.tool_calls,
+            "duration_s": speculation.duration_s,
+        }
+        if speculation.ttft_s is not None:
+            generation["ttft_s"] = speculation.ttft_s
+        for listener in self._generation_listeners:
+            try:
+                listener(generation)
+            except Exception as e:
+                logger.error(f"Error in speculation listener: {e}")
+
+    def on_turn_committed(self, callback: Callable[[], None]) -> None:
+        """
+        Register a callback invoked when a user turn is committed.
+
+        Args:
+            callback: Called with no arguments, e.g. SonioxSTT.commit_turn so the
+                next stable prefix starts from the next turn
+        """
+        self._commit_listeners.append(callback)
+
+    def turn_committed(self) -> None:
+        """Notify that the user turn the stable prefixes described was committed."""
+        for listener in self._commit_listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Error in turn commit listener: {e}")
+
+    def _is_material(self, current: str, prefix: StablePrefix) -> bool:
+        """Whether a new stable prefix warrants restarting the speculation on `current`."""
+        old_words = _normalize_transcript(current).split()
+        new_words = _normalize_transcript(prefix.text).split()
+        if new_words[: len(old_words)] != old_words:
+            return True  # revised
+        added = len(new_words) - len(old_words)
+        return added >= self.min_extension_words or (prefix.is_final and added > 0)
+
+    def attach(self, agent: Optional[Agent]) -> None:
+        """Speculate for this agent while it is active; None stops speculating."""
+        self._agent = agent
+        if agent is None:
+            self.close()
+
+    def on_stable_prefix(self, prefix: StablePrefix) -> None:
+        agent = self._agent
+        if agent is None or len(prefix.text) < self.min_chars:
+            return
+
+        current = self._current
+        if current is not None:
+            if not self._is_material(current.text, prefix):
+                if _normalize_transcript(current.text) != _normalize_transcript(prefix.text):
+                    self.skipped += 1
+                return
+            current.cancel()
+            self.restarts += 1
+
+        chat_ctx = agent.chat_ctx.copy()
+        anchor_id = chat_ctx.items[-1].id if chat_ctx.items else None
+        chat_ctx.add_message(role="user", content=prefix.text)
+        if isinstance(agent, Assistant):
+            chat_ctx = agent.prepare_chat_ctx(chat_ctx)
+        stream = Agent.default.llm_node(agent, chat_ctx, agent.tools, ModelSettings())
+        self._current = _Speculation(prefix.text, anchor_id, stream, self._generation_done)
+        self.started += 1
+        logger.debug(f"speculative generation started on prefix '{prefix.text}'")
+
+    def claim(self, chat_ctx: llm.ChatContext) -> Optional[_Speculation]:
+        """Return the running speculation if it answers the final user turn."""
+        speculation, self._current = self._current, None
+        if speculation is None:
+            return None
+
+        items = chat_ctx.items
+        user_text = ""
+        anchor_id = None
+        if items and items[-1].type == "message" and items[-1].role == "user":
+            user_text = items[-1].text_content or ""
+            anchor_id = items[-2].id if len(items) > 1 else None
+
+        if anchor_id != speculation.anchor_id or _normalize_transcript(
+            speculation.text
+        ) != _normalize_transcript(user_text):
+            speculation.cancel()
+            self.wasted += 1
+            return None
+
+        speculation.claimed_at = time.perf_counter()
+        return speculation
+
+    def settle(self, speculation: _Speculation, completed: bool) -> None:
+        """
+        Record the outcome of a claimed speculation.
+
+        A reply that was discarded before it finished, e.g. a preemptive
+        generation cancelled by further user speech, is counted as waste.
+        """
+        if not completed:
+            speculation.cancel()
+            self.wasted += 1
+            return
+        self.hits += 1
+        self.saved_seconds += (speculation.claimed_at or 0.0) - speculation.started_at
+
+    def close(self) -> None:
+        if self._current is not None:
+            self._current.cancel()
+            self._current = None
+            self.wasted += 1
+
+    def stats(self) -> dict[str, float]:
+        started = self.started or 1
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "restarts": self.restarts,
+            "skipped_extensions": self.skipped,
+            "wasted": self.wasted,
+            "hit_ratio": self.hits / started,
+            "restart_ratio": self.restarts / started,
+            "waste_ratio": self.wasted / started,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+
+# Used when the agent config does not provide instructions
+DEFAULT_INSTRUCTIONS = """
 System:
 ## Bu akışı takip et
 Müşteri keşfi (2-3 soru) → Pronet ürünlerinin faydalarını müşterinin ihtiyacına göre açıkla ve hizala → Müşteriyi belirli bir ürün veya çözümle eşleştir → Doğrudan danışmanlık randevusu teklifine geç. Adım atlama ya da sorulardan direkt randevuya geçme.
@@ -366,58 +643,373 @@ abilmemiz için birkaç kısa sorum olacak. Ardından güvenlik danışmanımız
 > "Dünyadaki en son teknoloji ile üretilen sistemleri size sunuyoruz. Size bu teknolojik ürünler ile ilgili de bilgi vermek isterim. Panel ve dedektörler birbiriyle sürekli konuşur, yani sistem tüm parçaların çalışıp çalışmadığını kontrol eder. Bu sayede arıza ve/veya sabotaj durumlarında hemen haberimiz olur ve müdahale ederiz. Gerekirse teknik ekibin hemen yönlendirilmesini sağlarız."
 > "Evinizde kullanacağımız sistem çift haberleşme kanalı ile merkezle iletişim sağlıyor. GPRS ve internet ile merkez ile haberleşiyor panel. Dolayısıyla herhangi birinde sabotaj veya teknik başka bir sebepten kesinti olursa diğeri bilgi vermeye devam ediyor."
 > "Dünyadaki son teknolojiyi kullandığımız için gelişmiş teknik alt yapımız sayesinde sisteminizi yedi yirmi dört sürekli olarak takip ediyoruz. Dolayısıyla alarm sisteminiz parçalansa bile çalışmaya devam ediyor ve panel sabotaja uğradığına dair sinyal gönderiyor. Biz de dak
-"never ask questions like "how can i help you today" - yu are outbound. remember that. never mess this up.  you are an outbound agent.""",
+"never ask questions like "how can i help you today" - yu are outbound. remember that. never mess this up.  you are an outbound agent."""
+
+
+class Assistant(Agent):
+    def __init__(
+        self,
+        speculation: Optional[SpeculativeReplyController] = None,
+        tts_pipeline: Optional[ChunkedTTSPipeline] = None,
+        crm: Optional[CRMTools] = None,
+        resumer: Optional[SpeechResumer] = None,
+        context_window: Optional[ContextWindowManager] = None,
+        recorder: Optional[CallRecorder] = None,
+        instructions: Optional[str] = None,
+    ) -> None:
+        super().__init__(
+            instructions=instructions or DEFAULT_INSTRUCTIONS,
+        )
+
+        self._speculation = speculation
+        self.tts_pipeline = tts_pipeline or ChunkedTTSPipeline()
+        self.crm = crm or CRMTools(create_crm_backend())
+        self.resumer = resumer
+        self.context_window = context_window or ContextWindowManager()
+        self.recorder = recorder
+        if recorder is not None:
+            # keep provider responses so the call can be replayed offline
+            self.tts_pipeline.on_chunk(lambda chunk: recorder.record_event("tts_chunk", **chunk))
+            self.context_window.on_summary(
+                lambda summary: recorder.record_event("llm_response", kind="summary", **summary)
+            )
+            if speculation is not None:
+                speculation.on_generation(
+                    lambda generation: recorder.record_event(
+                        "llm_response", kind="speculative", **generation
+                    )
+                )
+
+    async def on_enter(self) -> None:
+        # speculate only while this agent is running in a session
+        if self._speculation is not None:
+            self._speculation.attach(self)
+
+    async def on_exit(self) -> None:
+        if self._speculation is not None:
+            self._speculation.attach(None)
+
+    async def on_user_turn_completed(
+        self, turn_ctx: llm.ChatContext, new_message: llm.ChatMessage
+    ) -> None:
+        # the next stable prefix belongs to the next turn
+        if self._speculation is not None:
+            self._speculation.turn_committed()
+
+    def prepare_chat_ctx(self, chat_ctx: llm.ChatContext) -> llm.ChatContext:
+        # keep recent turns verbatim and fold older ones into a background summary
+        summary_llm = self.session.llm if isinstance(self.session.llm, llm.LLM) else None
+        return self.context_window.prepare(chat_ctx, summary_llm)
+
+    async def llm_node(
+        self,
+        chat_ctx: llm.ChatContext,
+        tools: list[Union[llm.FunctionTool, llm.RawFunctionTool]],
+        model_settings: ModelSettings,
+    ):
+        speculation = self._speculation.claim(chat_ctx) if self._speculation else None
+        chat_ctx = self.prepare_chat_ctx(chat_ctx)
+        turn = self.context_window.start_turn(chat_ctx)
+        if speculation is not None:
+            stream = speculation.stream()
+        else:
+            stream = Agent.default.llm_node(self, chat_ctx, tools, model_settings)
+
+        started = time.perf_counter()
+        text = ""
+        tool_calls = []
+        completed = False
+        try:
+            with load_reporter.track("llm"):
+                async for chunk in stream:
+                    if "ttft_s" not in turn:
+                        turn["ttft_s"] = round(time.perf_counter() - started, 3)
+                    chunk_text, chunk_tool_calls = _chunk_content(chunk)
+                    text += chunk_text
+                    tool_calls.extend(chunk_tool_calls)
+                    yield chunk
+            completed = True
+        finally:
+            if speculation is not None:
+                self._speculation.settle(speculation, completed)
+            turn["duration_s"] = round(time.perf_counter() - started, 3)
+            if self.recorder is not None:
+                self.recorder.record_event(
+                    "llm_response",
+                    kind="turn",
+                    **turn,
+                    speculative=speculation is not None,
+                    user_text=_last_user_text(chat_ctx),
+                    text=text,
+                    tool_calls=tool_calls,
+                )
+
+    async def tts_node(self, text: AsyncIterable[str], model_settings: ModelSettings):
+        if self.resumer is not None:
+            text = self.resumer.capture_text(text)
+
+        # the prompt forbids punctuation, so chunk on clauses ourselves instead of
+        # relying on the TTS sentence tokenizer, and start playback on the first chunk
+        frames = self.tts_pipeline.run(
+            self.session.tts,
+            text,
+            conn_options=self.session.conn_options.tts_conn_options,
         )
+        if self.resumer is not None:
+            frames = self.resumer.capture_audio(frames)
+
+        with load_reporter.track("tts"):
+            async for frame in frames:
+                yield frame
 
     # all functions annotated with @function_tool will be passed to the LLM when this
     # agent is active
     @function_tool
-    async def lookup_weather(self, context: RunContext, location: str):
-        """Use this tool to look up current weather information in the given location.
+    async def lookup_lead(self, context: RunContext):
+        """Use this tool to look up what we already know about the customer being called.
+
+        Returns the lead record (name, phone, address, interests) left with Pronet. Check it before asking for information the customer may already have given.
+        """
 
-        If the location is not supported by the weather service, the tool will indicate this. You must tell the user the location's weather is unavailable.
+        logger.info("Looking up lead")
+
+        try:
+            return await self.crm.get_lead()
+        except ToolError as e:
+            raise llm.ToolError("Müşteri kaydına şu anda ulaşılamıyor") from e
+
+    @function_tool
+    async def check_availability(self, context: RunContext, date_range: str):
+        """Use this tool to check available consultation appointment slots.
 
         Args:
-            location: The location to look up weather information for (e.g. city name)
+            date_range: The days the customer prefers (e.g. "yarın", "hafta sonu", "bu hafta")
         """
 
-        logger.info(f"Looking up weather for {location}")
+        logger.info(f"Checking availability for {date_range}")
 
-        return "sunny with a temperature of 70 degrees."
+        try:
+            return await self.crm.find_slots(date_range)
+        except ToolError as e:
+            raise llm.ToolError("Takvime şu anda ulaşılamıyor") from e
+
+    @function_tool
+    async def schedule_calendar_lock(
+        self,
+        context: RunContext,
+        appointment_time: str,
+        full_name: str,
+        phone_number: str,
+        address: str,
+        kvkk_consent: bool,
+    ):
+        """Use this tool to lock in the consultation appointment.
+
+        Only call it after all four mandatory items are collected and confirmed and the customer agreed on a slot.
+
+        Args:
+            appointment_time: The chosen slot, exactly as returned by check_availability
+            full_name: The customer's confirmed name and surname
+            phone_number: The confirmed contact number, exactly as the customer said it
+            address: The confirmed installation address, including the city
+            kvkk_consent: Whether the customer approved the processing of their personal data
+        """
+
+        logger.info(f"Booking appointment at {appointment_time}")
+
+        if not kvkk_consent:
+            raise llm.ToolError("KVKK onayı alınmadan randevu oluşturulamaz")
+        if not self.crm.lead_id:
+            raise llm.ToolError("Bu arama için müşteri kaydı yok, randevu oluşturulamaz")
+
+        details = {
+            "full_name": full_name,
+            "phone_number": phone_number,
+            "address": address,
+            "kvkk_consent": kvkk_consent,
+        }
+        try:
+            return await self.crm.book_appointment(appointment_time, details)
+        except ToolError as e:
+            raise llm.ToolError("Randevu sistemi yanıt vermedi") from e
+
+
+DEFAULT_CONFIG = AgentConfig(instructions=DEFAULT_INSTRUCTIONS)
+DEFAULT_LANGUAGE = DEFAULT_CONFIG.language
+DEFAULT_LANGUAGE_HINTS = list(DEFAULT_CONFIG.language_hints)
+
+
+def _parse_metadata(*metadata: str) -> dict[str, Any]:
+    """Merge JSON job/room metadata; later metadata wins, non-JSON is ignored."""
+    merged: dict[str, Any] = {}
+    for raw in metadata:
+        if not raw:
+            continue
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            merged.update(data)
+    return merged
+
+
+def _language_options(data: dict[str, Any]) -> dict[str, Any]:
+    """Read `language` / `language_hints` from parsed metadata."""
+    options: dict[str, Any] = {}
+    if isinstance(data.get("language"), str):
+        options["language"] = data["language"]
+    hints = data.get("language_hints")
+    if isinstance(hints, str):
+        hints = [h.strip() for h in hints.split(",") if h.strip()]
+    if isinstance(hints, list):
+        options["language_hints"] = [str(h) for h in hints]
+    return options
 
 
 def prewarm(proc: JobProcess):
     proc.userdata["vad"] = silero.VAD.load()
+    # LLM and TTS clients for the call this process will run; a process runs a
+    # single job, so they are built here while it waits and connected by warm()
+    proc.userdata["providers"] = ProviderPools()
+    # prompts and pipeline settings from AGENT_CONFIG_PATH, reloaded when the files
+    # change so a rollout reaches the next job without restarting this process
+    config_watcher = ConfigWatcher.from_env(DEFAULT_CONFIG)
+    config_watcher.start()
+    proc.userdata["config"] = config_watcher
+    # rolling STT provider latency and error rates, shared by the calls of this process
+    proc.userdata["stt_health"] = {}
+
+    # one writer per process, shared by every call handled here
+    if recording_dir := os.getenv("CALL_RECORDING_DIR"):
+        writer = RecordingWriter(recording_dir)
+        # calls only flush their own recorder; the writer is closed once when the
+        # process exits
+        multiprocessing.util.Finalize(writer, writer.close, exitpriority=10)
+        proc.userdata["recording_writer"] = writer
 
 
 async def entrypoint(ctx: JobContext):
     # Logging setup
     # Add any other context you want in all log entries here
+    # The config is read once, the whole call runs on the version active at its start
+    config_watcher: ConfigWatcher = ctx.proc.userdata["config"]
+    config = config_watcher.current()
     ctx.log_context_fields = {
         "room": ctx.room.name,
+        "config_version": config.version,
     }
 
+    # Start LLM generation on the stable part of the caller's interim transcript so the
+    # reply is mostly ready by the time the turn ends
+    speculation = SpeculativeReplyController()
+    metadata = _parse_metadata(ctx.job.metadata, ctx.job.room.metadata)
+    language_options = {
+        "language": config.language,
+        "language_hints": list(config.language_hints),
+        **_language_options(metadata),
+    }
+    # With diarization enabled in the config, lock the transcript onto the caller so
+    # the agent's echo on speakerphone and bystanders don't trigger turns; only speech
+    # heard while the agent is silent can claim the lock
+    speaker_lock = SpeakerLock(eligible=lambda: session.agent_state != "speaking")
+    stt = create_soniox_stt(
+        diarize=config.diarize,
+        speaker_lock=speaker_lock if config.diarize else None,
+        stability_window_ms=config.stability_window_ms,
+        stability_min_confidence=config.stability_min_confidence,
+        max_segment_tokens=config.max_segment_tokens,
+        **language_options,
+    )
+    stt.on_stable_prefix(speculation.on_stable_prefix)
+    speculation.on_turn_committed(stt.commit_turn)
+    # Publish live STT streams, pending LLM/TTS requests and loop lag to the worker;
+    # the reporter belongs to this process, which runs only this job
+    load_reporter.add_gauge("soniox_streams", lambda: stt.active_streams)
+    load_reporter.start()
+    # Fetch the lead record and the default slot search before the first turn
+    crm = CRMTools(create_crm_backend(), lead_id=metadata.get("lead_id"))
+    prefetch_task = asyncio.create_task(crm.prefetch())
+    # Reject background noise before it interrupts the agent, and resume the cached
+    # reply audio when an interruption still turns out to be false
+    classifier = InterruptionClassifier(token_filter=speaker_lock.is_primary)
+    stt.on_tokens(classifier.observe_tokens)
+    resumer = SpeechResumer()
+    vad = GatedVAD(
+        ctx.proc.userdata["vad"],
+        classifier,
+        agent_speaking=lambda: session.agent_state == "speaking",
+    )
+
+    # Open the OpenAI connection and Cartesia's websocket while the call sets up
+    providers: ProviderPools = ctx.proc.userdata["providers"]
+    session_tts = providers.tts(voice=config.tts_voice)
+    warm_task = asyncio.create_task(providers.warm(session_tts))
+
+    # When enabled in the config, fall back to Deepgram mid-call when Soniox fails or
+    # stops answering speech, replaying the unfinished utterance; speculation and the
+    # speaker lock only run while Soniox is active
+    session_stt: Union[SonioxSTT, FailoverSTT] = stt
+    if config.stt_failover and os.getenv("DEEPGRAM_API_KEY"):
+        session_stt = FailoverSTT(
+            [stt, deepgram.STT(model="nova-3", language="multi")],
+            cost_per_minute=[config.soniox_cost_per_minute, config.deepgram_cost_per_minute],
+            health=ctx.proc.userdata["stt_health"],
+            hedge_seconds=config.stt_hedge_seconds,
+        )
+
+    # Persist tokens, conversation items, LLM/TTS responses and optionally inbound
+    # audio for this call
+    recorder: Optional[CallRecorder] = None
+    if (writer := ctx.proc.userdata.get("recording_writer")) is not None:
+        recorder = CallRecorder(
+            writer,
+            call_id=f"{ctx.room.name}-{ctx.job.id}",
+            record_audio=os.getenv("CALL_RECORDING_AUDIO") == "1",
+        )
+        recorder.record_event(
+            "call_started", config_version=config.version, **language_options
+        )
+        stt.on_tokens(recorder.record_tokens)
+        stt.on_audio(recorder.record_audio_frame)
+
+    assistant = Assistant(
+        speculation=speculation,
+        crm=crm,
+        resumer=resumer,
+        recorder=recorder,
+        instructions=config.instructions,
+    )
+
     # Set up a voice AI pipeline using OpenAI, Cartesia, Deepgram, and the LiveKit turn detector
     session = AgentSession(
         # A Large Language Model (LLM) is your agent's brain, processing user input and generating a response
         # See all providers at https://docs.livekit.io/agents/integrations/llm/
-        llm=openai.LLM(model="gpt-4o-mini"),
+        llm=providers.llm(model=config.llm_model),
         # Speech-to-text (STT) is your agent's ears, turning the user's speech into text that the LLM can understand
         # See all providers at https://docs.livekit.io/agents/integrations/stt/
-        # stt=deepgram.STT(model="nova-3", language="multi"),  # Original Deepgram STT
-        stt=create_soniox_stt(language="tr"),  # Soniox STT for Turkish with real-time streamingsee w
+        stt=session_stt,  # Soniox STT for Turkish with real-time streaming, Deepgram as fallback
         # Text-to-speech (TTS) is your agent's voice, turning the LLM's text into speech that the user can hear
         # See all providers at https://docs.livekit.io/agents/integrations/tts/
-        tts=cartesia.TTS(voice="fa7bfcdc-603c-4bf1-a600-a371400d2f8c"),
+        tts=session_tts,
         # VAD and turn detection are used to determine when the user is speaking and when the agent should respond
         # See more at https://docs.livekit.io/agents/build/turns
         turn_detection=MultilingualModel(),
-        vad=ctx.proc.userdata["vad"],
+        vad=vad,
         # allow the LLM to generate a response while waiting for the end of turn
         # See more at https://docs.livekit.io/agents/build/audio/#preemptive-generation
         preemptive_generation=True,
     )
 
+    if recorder is not None:
+
+        @session.on("conversation_item_added")
+        def _on_conversation_item_added(ev: ConversationItemAddedEvent):
+            if ev.item.type == "message":
+                recorder.record_event(
+                    "message", role=ev.item.role, text=ev.item.text_content or ""
+                )
+
     # To use a realtime model instead of a voice pipeline, use the following session setup instead:
     # session = AgentSession(
     #     # See all providers at https://docs.livekit.io/agents/integrations/realtime/
@@ -425,11 +1017,17 @@ async def entrypoint(ctx: JobContext):
     # )
 
     # sometimes background noise could interrupt the agent session, these are considered false positive interruptions
-    # when it's detected, you may resume the agent's speech
+    # when it's detected, resume the cached audio and only regenerate if it is not available
     @session.on("agent_false_interruption")
     def _on_agent_false_interruption(ev: AgentFalseInterruptionEvent):
-        logger.info("false positive interruption, resuming")
-        session.generate_reply(instructions=ev.extra_instructions or NOT_GIVEN)
+        played_text = ev.message.text_content if ev.message else ""
+        if resumer.resume(session, played_text or ""):
+            logger.info("false positive interruption, resuming cached speech")
+            return
+
+        logger.info("false positive interruption, regenerating reply")
+        handle = session.generate_reply(instructions=ev.extra_instructions or NOT_GIVEN)
+        resumer.mark_regenerated(handle.id)
 
     # Metrics collection, to measure pipeline performance
     # For more information, see https://docs.livekit.io/agents/build/metrics/
@@ -439,10 +1037,32 @@ async def entrypoint(ctx: JobContext):
     def _on_metrics_collected(ev: MetricsCollectedEvent):
         metrics.log_metrics(ev.metrics)
         usage_collector.collect(ev.metrics)
+        resumer.collect_metrics(ev.metrics)
 
     async def log_usage():
         summary = usage_collector.get_summary()
         logger.info(f"Usage: {summary}")
+        speculation.close()
+        logger.info(f"Speculative replies: {speculation.stats()}")
+        logger.info(f"TTS first audio: {assistant.tts_pipeline.stats()}")
+        await assistant.context_window.aclose()
+        logger.info(f"Context window: {assistant.context_window.stats()}")
+        logger.info(f"LLM turns: {json.dumps(assistant.context_window.turns)}")
+        logger.info(f"Interruptions: {resumer.stats(suppressed=vad.suppressed_segments)}")
+        logger.info(f"Speakers: {speaker_lock.stats()}")
+        logger.info(f"STT tokens: {stt.token_stats()}")
+        if isinstance(session_stt, FailoverSTT):
+            logger.info(f"STT failover: {session_stt.stats()}")
+        prefetch_task.cancel()
+        logger.info(f"CRM tools: {crm.runner.stats()}")
+        await crm.backend.aclose()
+        await load_reporter.aclose()
+        warm_task.cancel()
+        logger.info(f"Provider pools: {providers.stats()}")
+        logger.info(f"Agent config: {config_watcher.stats()}")
+        if recorder is not None:
+            recorder.close()
+            logger.info(f"Recording writer: {recorder.writer.stats()}")
 
     ctx.add_shutdown_callback(log_usage)
 
@@ -456,7 +1076,7 @@ async def entrypoint(ctx: JobContext):
 
     # Start the session, which initializes the voice pipeline and warms up the models
     await session.start(
-        agent=Assistant(),
+        agent=assistant,
         room=ctx.room,
         room_input_options=RoomInputOptions(
             # LiveKit Cloud enhanced noise cancellation
@@ -466,9 +1086,47 @@ async def entrypoint(ctx: JobContext):
         ),
     )
 
+    if session.output.audio is not None:
+        session.output.audio.on(
+            "playback_finished",
+            lambda ev: resumer.on_playback_finished(ev.playback_position, ev.interrupted),
+        )
+
     # Join the room and connect to the user
     await ctx.connect()
 
+    # Language changes pushed through room metadata are applied to the live STT stream
+    @ctx.room.on("room_metadata_changed")
+    def _on_room_metadata_changed(old_metadata: str, metadata: str):
+        if options := _language_options(_parse_metadata(metadata)):
+            logger.info(f"updating STT language options: {options}")
+            stt.update_options(**options)
+
 
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
+    # `agent.py supervise start` runs one pinned worker per core, AGENT_WORKERS
+    # overrides the count
+    if len(sys.argv) > 1 and sys.argv[1] == "supervise":
+        supervisor = Supervisor(
+            os.path.abspath(__file__),
+            sys.argv[2:],
+            num_workers=int(os.getenv("AGENT_WORKERS", "0")) or None,
+        )
+        sys.exit(supervisor.run())
+
+    worker_overrides = configure_worker()
+    # Job processes inherit the load directory; the worker reports the highest of CPU,
+    # STT streams, pending LLM/TTS requests and loop lag, and defers or rejects jobs
+    # when that gets too high so the dispatcher routes them elsewhere
+    load_directory()
+    admission = AdmissionController(cpu_index=worker_cpu())
+    cli.run_app(
+        WorkerOptions(
+            entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
+            request_fnc=admission.request_fnc,
+            load_fnc=admission.load,
+            load_threshold=admission.hard_threshold,
+            **worker_overrides,
+        )
+    )
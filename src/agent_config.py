@@ -0,0 +1,259 @@
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+CONFIG_PATH_ENV = "AGENT_CONFIG_PATH"
+SETTINGS_FILE = "config.json"
+PROMPT_SUFFIXES = (".md", ".txt")
+
+
+@dataclass(frozen=True)
+class AgentConfig:
+    """Prompt and pipeline settings a job is started with."""
+
+    instructions: str = ""
+    llm_model: str = "gpt-4o-mini"
+    tts_voice: str = "fa7bfcdc-603c-4bf1-a600-a371400d2f8c"
+    language: str = "tr"
+    language_hints: tuple[str, ...] = ()
+    diarize: bool = False
+    stability_window_ms: int = 600
+    stability_min_confidence: float = 0.85
+    max_segment_tokens: int = 256
+    stt_failover: bool = False
+    stt_hedge_seconds: float = 0.0
+    soniox_cost_per_minute: float = 0.002
+    deepgram_cost_per_minute: float = 0.0077
+    version: str = "default"
+
+    def replace(self, settings: dict[str, Any]) -> "AgentConfig":
+        """
+        Return a copy with the given settings applied.
+
+        Unknown keys are logged and ignored; values are converted to the type of
+        the field's current value.
+
+        Raises:
+            ValueError: If a value cannot be converted
+        """
+        fields = {f.name for f in dataclasses.fields(self)} - {"version"}
+        changes: dict[str, Any] = {}
+        for key, value in settings.items():
+            if key not in fields:
+                logger.warning(f"Ignoring unknown config setting {key!r}")
+                continue
+            current = getattr(self, key)
+            if isinstance(current, tuple):
+                if isinstance(value, str):
+                    value = [v.strip() for v in value.split(",") if v.strip()]
+                if not isinstance(value, list):
+                    raise ValueError(f"{key} must be a list")
+                changes[key] = tuple(str(v) for v in value)
+            elif isinstance(current, bool):
+                if not isinstance(value, bool):
+                    raise ValueError(f"{key} must be true or false")
+                changes[key] = value
+            else:
+                try:
+                    changes[key] = type(current)(value)
+                except (TypeError, ValueError) as e:
+                    raise ValueError(f"invalid value for {key}: {value!r}") from e
+        return dataclasses.replace(self, **changes)
+
+
+def _source_files(path: str) -> list[str]:
+    """Files a config is loaded from: a JSON file, or a directory of settings and prompts."""
+    if not os.path.isdir(path):
+        return [path]
+    names = sorted(
+        name
+        for name in os.listdir(path)
+        if name == SETTINGS_FILE or name.endswith(PROMPT_SUFFIXES)
+    )
+    return [os.path.join(path, name) for name in names]
+
+
+def load_config(path: str, defaults: AgentConfig) -> AgentConfig:
+    """
+    Load a config from a JSON file or a config directory.
+
+    A directory holds an optional `config.json` with settings and any number of
+    `.md`/`.txt` prompt files, joined in name order to form the instructions. A
+    JSON file may set the instructions directly. Settings that are not given keep
+    their default. The version is a hash of the source files' content.
+
+    Args:
+        path: Config file or directory
+        defaults: Values for settings the config does not set
+
+    Returns:
+        The loaded config
+
+    Raises:
+        OSError: If a source file cannot be read
+        ValueError: If the settings are not valid JSON or have invalid values
+    """
+    digest = hashlib.sha256()
+    settings: dict[str, Any] = {}
+    prompts: list[str] = []
+    for file in _source_files(path):
+        with open(file, "rb") as f:
+            data = f.read()
+        digest.update(os.path.basename(file).encode())
+        digest.update(data)
+        if file.endswith(".json"):
+            parsed = json.loads(data.decode("utf-8"))
+            if not isinstance(parsed, dict):
+                raise ValueError(f"{file} must contain a JSON object")
+            settings.update(parsed)
+        else:
+            prompts.append(data.decode("utf-8").strip())
+
+    if prompts:
+        settings["instructions"] = "\n\n".join(p for p in prompts if p)
+    config = defaults.replace(settings)
+    return dataclasses.replace(config, version=digest.hexdigest()[:12])
+
+
+class ConfigWatcher:
+    """
+    Keeps the current agent config and reloads it when its files change.
+
+    A background thread stats the source files every poll interval and only reads
+    them when a modification time, size or inode changed. A config that fails to
+    load is logged and the previous one stays active. A successful load is swapped
+    in with a single reference assignment, so a job reading `current()` gets one
+    consistent config; jobs already running keep the config they started with.
+    The instructions are assembled from the prompt files when the config is
+    loaded, off the job's path.
+
+    Write config files atomically (write a temporary file, then rename) to avoid
+    loading a partial file; a partial load fails and is retried on the next change.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        defaults: AgentConfig,
+        *,
+        poll_interval: float = 2.0,
+    ) -> None:
+        """
+        Initialize the watcher and load the initial config.
+
+        Args:
+            path: Config file or directory; only the defaults are used when None
+            defaults: Config used for settings the files do not set
+            poll_interval: Seconds between checks for changed files
+        """
+        self.path = path
+        self.defaults = defaults
+        self.poll_interval = poll_interval
+        self.reloads = 0
+        self.failures = 0
+        self._signature: Optional[tuple[Any, ...]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._current = defaults
+        if path is not None:
+            self._signature = self._stat()
+            try:
+                self._current = load_config(path, defaults)
+            except (OSError, ValueError) as e:
+                self.failures += 1
+                logger.error(
+                    f"Failed to load agent config from {path}, using defaults: {e}"
+                )
+        logger.info(f"Agent config version {self._current.version}")
+
+    @classmethod
+    def from_env(cls, defaults: AgentConfig, **kwargs: Any) -> "ConfigWatcher":
+        """Create a watcher for the path in AGENT_CONFIG_PATH, if set."""
+        return cls(os.getenv(CONFIG_PATH_ENV) or None, defaults, **kwargs)
+
+    def current(self) -> AgentConfig:
+        """Return the active config."""
+        return self._current
+
+    def _stat(self) -> tuple[Any, ...]:
+        signature: list[Any] = []
+        try:
+            files = _source_files(self.path or "")
+        except OSError:
+            return ()
+        for file in files:
+            try:
+                st = os.stat(file)
+            except OSError:
+                continue
+            signature.append((file, st.st_mtime_ns, st.st_size, st.st_ino))
+        return tuple(signature)
+
+    def check(self) -> bool:
+        """
+        Reload the config if its files changed.
+
+        Returns:
+            True if a new config version was swapped in
+        """
+        if self.path is None:
+            return False
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+
+        try:
+            config = load_config(self.path, self.defaults)
+        except (OSError, ValueError) as e:
+            self.failures += 1
+            logger.error(
+                f"Failed to reload agent config, keeping {self._current.version}: {e}"
+            )
+            return False
+
+        if config.version == self._current.version:
+            return False
+        previous, self._current = self._current, config
+        self.reloads += 1
+        logger.info(f"Agent config reloaded: {previous.version} -> {config.version}")
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error checking agent config: {e}")
+
+    def start(self) -> None:
+        """Start watching the config files in a daemon thread."""
+        if self.path is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="agent-config", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stop watching."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def stats(self) -> dict[str, Any]:
+        """Return the active version and reload counts."""
+        return {
+            "version": self._current.version,
+            "reloads": self.reloads,
+            "failures": self.failures,
+        }
@@ -0,0 +1,433 @@
+import glob
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from collections.abc import Iterator
+from typing import Any, Optional
+
+from livekit.rtc.audio_frame import AudioFrame
+
+logger = logging.getLogger(__name__)
+
+
+_MAGIC = b"CRB1"
+_HEADER = struct.Struct("<4sBHII")
+
+KIND_EVENTS = 1
+KIND_PCM = 2
+
+
+def _estimate_size(value: Any) -> int:
+    """Approximate the JSON size of an event field, including nested lists and dicts."""
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return 2 + sum(len(key) + 4 + _estimate_size(v) for key, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return 2 + sum(_estimate_size(v) + 1 for v in value)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return 8
+
+
+class RecordingWriter:
+    """
+    Process-wide writer that persists call recordings in compressed segment files.
+
+    Calls hand over whole batches; serialization, compression and file I/O happen
+    on a dedicated thread that coalesces everything queued into a single write.
+    Each process appends to its own `segment-<pid>-<n>.crb` files and records the
+    location of every batch in `index-<pid>.jsonl`.
+
+    Memory is bounded by max_pending_bytes: batches submitted while the queue is
+    full are dropped and counted instead of blocking the event loop.
+
+    The writer belongs to the process, not to a call: calls only flush their
+    CallRecorder, and the writer is closed once when the process shuts down.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        max_pending_bytes: int = 128 * 1024 * 1024,
+        compression_level: int = 1,
+    ) -> None:
+        """
+        Initialize the writer.
+
+        Args:
+            directory: Directory for segment and index files
+            segment_max_bytes: Size after which a new segment file is started
+            max_pending_bytes: Upper bound on batch bytes waiting to be written
+            compression_level: zlib compression level (1 favours throughput)
+        """
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.max_pending_bytes = max_pending_bytes
+        self.compression_level = compression_level
+
+        self._queue: queue.Queue[
+            Optional[tuple[str, int, Any, dict[str, Any], int]]
+        ] = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._pending_bytes = 0
+        self._segment_path: Optional[str] = None
+        self._segment_index = 0
+        self._segment_size = 0
+        self._index_path: Optional[str] = None
+
+        self.batches = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.dropped_batches = 0
+        self.dropped_bytes = 0
+        self.write_seconds = 0.0
+
+    def submit(
+        self, call_id: str, kind: int, payload: Any, meta: dict[str, Any], size: int
+    ) -> bool:
+        """
+        Queue a batch for writing without blocking.
+
+        Args:
+            call_id: Call the batch belongs to
+            kind: KIND_EVENTS (payload is a list of records) or KIND_PCM (bytes)
+            meta: Extra fields stored in the index entry
+            size: Approximate payload size in bytes, used for the memory bound
+
+        Returns:
+            False if the batch was dropped because the writer is backlogged or
+            already closed
+        """
+        with self._lock:
+            if self._closed:
+                self.dropped_batches += 1
+                self.dropped_bytes += size
+                return False
+            if self._pending_bytes + size > self.max_pending_bytes:
+                self.dropped_batches += 1
+                self.dropped_bytes += size
+                return False
+            self._pending_bytes += size
+            if self._thread is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._thread = threading.Thread(
+                    target=self._run, name="call-recorder-writer", daemon=True
+                )
+                self._thread.start()
+            # queued under the lock so close() always enqueues its sentinel last
+            self._queue.put((call_id, kind, payload, meta, size))
+        return True
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        Write everything still queued and stop the writer thread.
+
+        Called once at process shutdown; batches submitted afterwards are dropped.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self) -> dict[str, float]:
+        """Return write throughput and backlog figures."""
+        return {
+            "batches": self.batches,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "pending_bytes": self._pending_bytes,
+            "dropped_batches": self.dropped_batches,
+            "dropped_bytes": self.dropped_bytes,
+            "write_seconds": round(self.write_seconds, 3),
+            "write_mb_per_s": round(self.bytes_in / self.write_seconds / 1e6, 2)
+            if self.write_seconds
+            else 0.0,
+        }
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batches = [self._queue.get()]
+            # coalesce whatever else is already queued into one write
+            while True:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batches:
+                stop = True
+                batches = [b for b in batches if b is not None]
+            if not batches:
+                continue
+
+            started = time.perf_counter()
+            try:
+                self._write(batches)
+            except Exception as e:
+                logger.error(f"Failed to write call recordings: {e}")
+            finally:
+                self.write_seconds += time.perf_counter() - started
+                with self._lock:
+                    self._pending_bytes -= sum(b[4] for b in batches)
+
+    def _write(self, batches: list[tuple[str, int, Any, dict[str, Any], int]]) -> None:
+        blob = bytearray()
+        entries = []
+        for call_id, kind, payload, meta, _ in batches:
+            if kind == KIND_EVENTS:
+                raw = "\n".join(
+                    json.dumps(record, ensure_ascii=False) for record in payload
+                ).encode()
+            else:
+                raw = bytes(payload)
+            data = zlib.compress(raw, self.compression_level)
+            call_bytes = call_id.encode()
+
+            if (
+                self._segment_path is None
+                or self._segment_size + len(blob) >= self.segment_max_bytes
+            ):
+                if blob:
+                    self._flush_segment(blob, entries)
+                    blob, entries = bytearray(), []
+                self._open_segment()
+
+            offset = self._segment_size + len(blob)
+            blob += _HEADER.pack(_MAGIC, kind, len(call_bytes), len(raw), len(data))
+            blob += call_bytes
+            blob += data
+            entries.append(
+                {
+                    "call_id": call_id,
+                    "kind": kind,
+                    "segment": os.path.basename(self._segment_path),
+                    "offset": offset,
+                    "length": len(blob) - (offset - self._segment_size),
+                    **meta,
+                }
+            )
+            self.batches += 1
+            self.bytes_in += len(raw)
+            self.bytes_out += len(data)
+
+        if blob:
+            self._flush_segment(blob, entries)
+
+    def _flush_segment(self, blob: bytearray, entries: list[dict[str, Any]]) -> None:
+        # files are opened per coalesced write, so no handle outlives a flush
+        with open(self._segment_path, "ab") as segment:
+            segment.write(blob)
+        self._segment_size += len(blob)
+        with open(self._index_path, "a", encoding="utf-8") as index:
+            index.write("".join(json.dumps(e) + "\n" for e in entries))
+
+    def _open_segment(self) -> None:
+        pid = os.getpid()
+        self._segment_index += 1
+        self._segment_path = os.path.join(
+            self.directory, f"segment-{pid}-{self._segment_index:06d}.crb"
+        )
+        try:
+            self._segment_size = os.path.getsize(self._segment_path)
+        except OSError:
+            self._segment_size = 0
+        if self._index_path is None:
+            self._index_path = os.path.join(self.directory, f"index-{pid}.jsonl")
+
+
+class CallRecorder:
+    """
+    Per-call buffer of transcript tokens, conversation items and optional PCM.
+
+    Recording methods only append to in-memory buffers; once a buffer reaches
+    flush_bytes (or on close) it is handed to the shared RecordingWriter as one
+    batch. Timestamps are seconds since the recorder was created.
+    """
+
+    def __init__(
+        self,
+        writer: RecordingWriter,
+        call_id: str,
+        *,
+        record_audio: bool = False,
+        flush_bytes: int = 256 * 1024,
+        audio_flush_bytes: int = 1024 * 1024,
+    ) -> None:
+        """
+        Initialize the recorder.
+
+        Args:
+            writer: Shared writer for the process
+            call_id: Identifier stored with every batch
+            record_audio: Whether inbound PCM is recorded
+            flush_bytes: Event buffer size that triggers a batch
+            audio_flush_bytes: PCM buffer size that triggers a batch
+        """
+        self.writer = writer
+        self.call_id = call_id
+        self.record_audio = record_audio
+        self.flush_bytes = flush_bytes
+        self.audio_flush_bytes = audio_flush_bytes
+
+        self._started_at = time.monotonic()
+        self.started_at_wall = time.time()
+        self._events: list[dict[str, Any]] = []
+        self._events_bytes = 0
+        self._events_first_ts = 0.0
+        self._audio = bytearray()
+        self._audio_first_ts = 0.0
+        self._audio_format: tuple[int, int] = (0, 0)
+        self._closed = False
+
+    def _now(self) -> float:
+        return round(time.monotonic() - self._started_at, 4)
+
+    def record_event(self, event_type: str, **fields: Any) -> None:
+        """Buffer a generic event record."""
+        if self._closed:
+            return
+        now = self._now()
+        if not self._events:
+            self._events_first_ts = now
+        record = {"t": now, "type": event_type, **fields}
+        self._events.append(record)
+        # approximate encoded size, the exact encoding happens on the writer thread;
+        # token lists and tool calls are counted too so the memory bound holds
+        self._events_bytes += 32 + len(event_type) + _estimate_size(fields)
+        if self._events_bytes >= self.flush_bytes:
+            self._flush_events()
+
+    def record_tokens(self, tokens: list[dict[str, Any]]) -> None:
+        """Buffer the tokens of one Soniox message."""
+        if tokens:
+            self.record_event("tokens", tokens=tokens)
+
+    def record_audio_frame(self, frame: AudioFrame) -> None:
+        """Buffer an inbound PCM frame if audio recording is enabled."""
+        if not self.record_audio or self._closed:
+            return
+        fmt = (frame.sample_rate, frame.num_channels)
+        if self._audio and fmt != self._audio_format:
+            self._flush_audio()
+        if not self._audio:
+            self._audio_first_ts = self._now()
+            self._audio_format = fmt
+        self._audio += frame.data.cast("B")
+        if len(self._audio) >= self.audio_flush_bytes:
+            self._flush_audio()
+
+    def flush(self) -> None:
+        """Hand all buffered data to the writer."""
+        self._flush_events()
+        self._flush_audio()
+
+    def close(self) -> None:
+        """Flush remaining data; later records are ignored."""
+        if self._closed:
+            return
+        self.record_event("call_ended", started_at=self.started_at_wall)
+        self.flush()
+        self._closed = True
+
+    def _flush_events(self) -> None:
+        if not self._events:
+            return
+        events, self._events = self._events, []
+        size, self._events_bytes = self._events_bytes, 0
+        self.writer.submit(
+            self.call_id,
+            KIND_EVENTS,
+            events,
+            {
+                "first_ts": self._events_first_ts,
+                "last_ts": events[-1]["t"],
+                "count": len(events),
+            },
+            size,
+        )
+
+    def _flush_audio(self) -> None:
+        if not self._audio:
+            return
+        audio, self._audio = self._audio, bytearray()
+        sample_rate, num_channels = self._audio_format
+        self.writer.submit(
+            self.call_id,
+            KIND_PCM,
+            audio,
+            {
+                "first_ts": self._audio_first_ts,
+                "sample_rate": sample_rate,
+                "num_channels": num_channels,
+                "samples": len(audio) // (2 * max(num_channels, 1)),
+            },
+            len(audio),
+        )
+
+
+def read_index(directory: str, call_id: Optional[str] = None) -> list[dict[str, Any]]:
+    """
+    Load index entries from every writer process in a recording directory.
+
+    Args:
+        directory: Recording directory
+        call_id: Only return entries for this call
+
+    Returns:
+        Index entries ordered by first timestamp
+    """
+    entries = []
+    for path in sorted(glob.glob(os.path.join(directory, "index-*.jsonl"))):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if call_id is None or entry["call_id"] == call_id:
+                    entries.append(entry)
+    entries.sort(key=lambda e: (e["call_id"], e.get("first_ts", 0.0)))
+    return entries
+
+
+def read_batch(directory: str, entry: dict[str, Any]) -> Any:
+    """
+    Read and decompress the batch an index entry points to.
+
+    Returns:
+        A list of event records for KIND_EVENTS, raw PCM bytes for KIND_PCM
+    """
+    with open(os.path.join(directory, entry["segment"]), "rb") as f:
+        f.seek(entry["offset"])
+        magic, kind, call_len, _raw_len, data_len = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC:
+            raise ValueError(
+                f"Corrupt recording segment at {entry['segment']}:{entry['offset']}"
+            )
+        f.seek(call_len, os.SEEK_CUR)
+        raw = zlib.decompress(f.read(data_len))
+
+    if kind == KIND_EVENTS:
+        return [json.loads(line) for line in raw.decode().splitlines()]
+    return raw
+
+
+def iter_events(directory: str, call_id: str) -> Iterator[dict[str, Any]]:
+    """Yield the event records of a call in timestamp order."""
+    for entry in read_index(directory, call_id):
+        if entry["kind"] == KIND_EVENTS:
+            yield from read_batch(directory, entry)
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Optional
+
+from livekit.agents import llm, utils
+
+logger = logging.getLogger(__name__)
+
+
+SUMMARY_MESSAGE_ID = "context_window.summary"
+# id of the instructions message of a summary update request
+SUMMARY_REQUEST_ID = "context_window.summary_request"
+
+_SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a sales phone call. Update the summary with "
+    "the new conversation turns. Keep the caller's name, situation, needs, "
+    "objections and any times or appointments discussed, and note what the agent "
+    "has already explained or offered. Write short plain sentences in the language "
+    "of the conversation and return only the updated summary."
+)
+
+
+def _item_text(item: llm.ChatItem) -> str:
+    if item.type == "message":
+        return item.text_content or ""
+    if item.type == "function_call":
+        return f"{item.name}({item.arguments})"
+    if item.type == "function_call_output":
+        return f"{item.name} -> {item.output}"
+    return ""
+
+
+def _is_instructions(item: llm.ChatItem) -> bool:
+    return item.type == "message" and item.role in ("system", "developer")
+
+
+class ContextWindowManager:
+    """
+    Bounds the prompt sent to the LLM on long calls.
+
+    Instructions and the last `keep_turns` user turns are sent verbatim. Older
+    turns are folded into a running summary by a background LLM call once
+    `summarize_batch` of them have accumulated, so summarisation never sits on the
+    critical path; until a summary lands the older turns are still sent verbatim.
+    The summary is a single system message right after the instructions and only
+    changes when a batch is folded in, which keeps the prompt prefix stable for
+    provider-side prompt caching. If the prompt still exceeds max_prompt_tokens the
+    oldest history items are dropped.
+
+    Token counts are estimated from character length; the estimate only has to be
+    consistent across turns, not exact.
+    """
+
+    def __init__(
+        self,
+        *,
+        keep_turns: int = 6,
+        summarize_batch: int = 4,
+        max_prompt_tokens: int = 12000,
+        chars_per_token: float = 3.5,
+        summary_timeout: float = 20.0,
+    ) -> None:
+        """
+        Initialize the manager.
+
+        Args:
+            keep_turns: Number of most recent user turns kept verbatim
+            summarize_batch: Older items that trigger a background summary update
+            max_prompt_tokens: Upper bound on the estimated prompt size per turn
+            chars_per_token: Characters per token used for estimates
+            summary_timeout: Seconds a summary update may take before it is abandoned
+        """
+        self.keep_turns = keep_turns
+        self.summarize_batch = summarize_batch
+        self.max_prompt_tokens = max_prompt_tokens
+        self.chars_per_token = chars_per_token
+        self.summary_timeout = summary_timeout
+
+        self.summary = ""
+        self._summarized_ids: set = set()
+        self._summary_task: Optional[asyncio.Task] = None
+
+        self.turns: list[dict[str, float]] = []
+        self.summaries = 0
+        self.summary_failures = 0
+        self.summary_seconds = 0.0
+        self.dropped_items = 0
+        self._summary_listeners: list[Callable[[dict[str, Any]], None]] = []
+
+    def on_summary(self, callback: Callable[[dict[str, Any]], None]) -> None:
+        """
+        Register a callback invoked after every successful summary update.
+
+        Args:
+            callback: Called with the summary text and the duration of the request
+        """
+        self._summary_listeners.append(callback)
+
+    def estimate_tokens(self, items: list[llm.ChatItem]) -> int:
+        return int(
+            sum(len(_item_text(item)) + 4 for item in items) / self.chars_per_token
+        )
+
+    def prepare(
+        self, chat_ctx: llm.ChatContext, summary_llm: Optional[llm.LLM] = None
+    ) -> llm.ChatContext:
+        """
+        Build the bounded chat context for one LLM request.
+
+        Args:
+            chat_ctx: Full chat context of the session
+            summary_llm: LLM used to update the summary in the background; without
+                one older turns are only dropped when over the token cap
+
+        Returns:
+            A new chat context; the session's context is left untouched
+        """
+        instructions = [item for item in chat_ctx.items if _is_instructions(item)]
+        history = [item for item in chat_ctx.items if not _is_instructions(item)]
+
+        # the recent window starts at the keep_turns-th user message from the end
+        user_indices = [
+            i
+            for i, item in enumerate(history)
+            if item.type == "message" and item.role == "user"
+        ]
+        cutoff = (
+            user_indices[-self.keep_turns]
+            if len(user_indices) >= self.keep_turns
+            else 0
+        )
+        older = [
+            item for item in history[:cutoff] if item.id not in self._summarized_ids
+        ]
+        recent = history[cutoff:]
+
+        if summary_llm is not None and len(older) >= self.summarize_batch:
+            self._schedule_summary(older, summary_llm)
+
+        prefix = list(instructions)
+        if self.summary:
+            prefix.append(
+                llm.ChatMessage(
+                    id=SUMMARY_MESSAGE_ID,
+                    role="system",
+                    content=[f"Summary of the call so far:\n{self.summary}"],
+                )
+            )
+
+        budget = self.max_prompt_tokens - self.estimate_tokens(prefix)
+        kept = older + recent
+        while len(kept) > 1 and self.estimate_tokens(kept) > budget:
+            kept.pop(0)
+            self.dropped_items += 1
+        # never start the history with a dangling tool call or output
+        while len(kept) > 1 and kept[0].type in (
+            "function_call",
+            "function_call_output",
+        ):
+            kept.pop(0)
+            self.dropped_items += 1
+
+        return llm.ChatContext(prefix + kept)
+
+    def _schedule_summary(
+        self, items: list[llm.ChatItem], summary_llm: llm.LLM
+    ) -> None:
+        if self._summary_task is not None and not self._summary_task.done():
+            return
+        self._summary_task = asyncio.create_task(self._summarize(items, summary_llm))
+
+    async def _summarize(self, items: list[llm.ChatItem], summary_llm: llm.LLM) -> None:
+        lines = []
+        for item in items:
+            if text := _item_text(item).strip():
+                role = item.role if item.type == "message" else "tool"
+                lines.append(f"{role}: {text}")
+
+        ctx = llm.ChatContext.empty()
+        ctx.add_message(
+            role="system", content=_SUMMARY_INSTRUCTIONS, id=SUMMARY_REQUEST_ID
+        )
+        ctx.add_message(
+            role="user",
+            content=f"Current summary:\n{self.summary or '-'}\n\nNew turns:\n"
+            + "\n".join(lines),
+        )
+
+        started = time.perf_counter()
+        try:
+            summary = await asyncio.wait_for(
+                self._complete(summary_llm, ctx), self.summary_timeout
+            )
+        except Exception as e:
+            self.summary_failures += 1
+            logger.warning(f"Context summary update failed: {e}")
+            return
+        finally:
+            duration = time.perf_counter() - started
+            self.summary_seconds += duration
+
+        for listener in self._summary_listeners:
+            try:
+                listener({"text": summary, "duration_s": round(duration, 3)})
+            except Exception as e:
+                logger.error(f"Error in summary listener: {e}")
+
+        if summary.strip():
+            self.summary = summary.strip()
+            self._summarized_ids.update(item.id for item in items)
+            self.summaries += 1
+            logger.debug(f"folded {len(items)} items into the call summary")
+
+    @staticmethod
+    async def _complete(summary_llm: llm.LLM, ctx: llm.ChatContext) -> str:
+        text = ""
+        async with summary_llm.chat(chat_ctx=ctx) as stream:
+            async for chunk in stream:
+                if chunk.delta and chunk.delta.content:
+                    text += chunk.delta.content
+        return text
+
+    def start_turn(self, chat_ctx: llm.ChatContext) -> dict[str, float]:
+        """Record the prompt size of an LLM request and return its turn record."""
+        turn = {
+            "turn": len(self.turns),
+            "prompt_tokens": self.estimate_tokens(chat_ctx.items),
+            "items": len(chat_ctx.items),
+        }
+        self.turns.append(turn)
+        return turn
+
+    async def aclose(self) -> None:
+        if self._summary_task is not None:
+            await utils.aio.cancel_and_wait(self._summary_task)
+            self._summary_task = None
+
+    def stats(self) -> dict[str, Any]:
+        """Return summarisation counts and how prompt size and latency evolved."""
+        stats: dict[str, Any] = {
+            "turns": len(self.turns),
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+            "summary_seconds": round(self.summary_seconds, 3),
+            "dropped_items": self.dropped_items,
+        }
+        if self.turns:
+            stats["prompt_tokens_first"] = self.turns[0]["prompt_tokens"]
+            stats["prompt_tokens_last"] = self.turns[-1]["prompt_tokens"]
+            stats["prompt_tokens_max"] = max(t["prompt_tokens"] for t in self.turns)
+
+        # compare the first and last third of the call to see whether latency drifts
+        ttfts = [t["ttft_s"] for t in self.turns if "ttft_s" in t]
+        if len(ttfts) >= 3:
+            third = len(ttfts) // 3
+            stats["ttft_early_avg_s"] = round(sum(ttfts[:third]) / third, 3)
+            stats["ttft_late_avg_s"] = round(sum(ttfts[-third:]) / third, 3)
+        return stats
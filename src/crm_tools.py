@@ -0,0 +1,357 @@
+import asyncio
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable
+from typing import Any, Callable, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class ToolError(Exception):
+    """Raised when a tool's backend call fails or is refused."""
+
+
+class ToolTimeoutError(ToolError):
+    """Raised when a backend call exceeds its per-tool timeout."""
+
+
+class CRMBackend(ABC):
+    """Lead and appointment operations the sales agent can call during a call."""
+
+    @abstractmethod
+    async def get_lead(self, lead_id: str) -> dict[str, Any]:
+        """Return the lead record (name, phone, address, interests...)."""
+
+    @abstractmethod
+    async def find_slots(self, date_range: str) -> list[str]:
+        """Return free consultation slots within a free-form date range."""
+
+    @abstractmethod
+    async def book_appointment(
+        self, lead_id: str, appointment_time: str, details: dict[str, Any]
+    ) -> dict[str, Any]:
+        """Lock a consultation slot and return the booking."""
+
+    async def aclose(self) -> None:  # noqa: B027
+        """Release backend resources; a no-op for backends that hold none."""
+
+
+class LocalCRMBackend(CRMBackend):
+    """
+    In-memory stand-in backend for development and offline runs.
+
+    latency simulates the round-trip time of the real CRM.
+    """
+
+    def __init__(
+        self,
+        *,
+        leads: Optional[dict[str, dict[str, Any]]] = None,
+        slots: Optional[list[str]] = None,
+        latency: float = 0.0,
+    ) -> None:
+        self.leads = leads or {}
+        self.slots = slots or [
+            "yarın sabah on",
+            "yarın öğleden sonra iki",
+            "yarın akşam altı",
+            "cumartesi sabah on bir",
+        ]
+        self.latency = latency
+        self.bookings: list[dict[str, Any]] = []
+
+    async def get_lead(self, lead_id: str) -> dict[str, Any]:
+        await asyncio.sleep(self.latency)
+        return dict(self.leads.get(lead_id, {"id": lead_id}))
+
+    async def find_slots(self, date_range: str) -> list[str]:
+        await asyncio.sleep(self.latency)
+        return list(self.slots)
+
+    async def book_appointment(
+        self, lead_id: str, appointment_time: str, details: dict[str, Any]
+    ) -> dict[str, Any]:
+        await asyncio.sleep(self.latency)
+        if appointment_time in self.slots:
+            self.slots.remove(appointment_time)
+        booking = {"lead_id": lead_id, "appointment_time": appointment_time, **details}
+        self.bookings.append(booking)
+        return booking
+
+
+class HttpCRMBackend(CRMBackend):
+    """CRM backend reached over a JSON REST API."""
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        api_key: Optional[str] = None,
+        session: Optional[aiohttp.ClientSession] = None,
+    ) -> None:
+        """
+        Initialize the HTTP backend.
+
+        Args:
+            base_url: API root, e.g. https://crm.example.com/api
+            api_key: Bearer token sent with every request
+            session: Shared aiohttp session; one is created lazily if omitted
+        """
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self._session = session
+        self._owns_session = session is None
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            headers = (
+                {"Authorization": f"Bearer {self.api_key}"} if self.api_key else None
+            )
+            self._session = aiohttp.ClientSession(headers=headers)
+        return self._session
+
+    async def _request(self, method: str, path: str, **kwargs: Any) -> Any:
+        """
+        Send a request and return the decoded JSON body.
+
+        Raises:
+            ToolError: If the CRM cannot be reached, answers with an error status
+                or returns a body that is not JSON
+        """
+        try:
+            async with self._ensure_session().request(
+                method, f"{self.base_url}{path}", **kwargs
+            ) as resp:
+                resp.raise_for_status()
+                return await resp.json()
+        except aiohttp.ClientResponseError as e:
+            raise ToolError(f"CRM {method} {path} failed with status {e.status}") from e
+        except (aiohttp.ClientError, ValueError) as e:
+            raise ToolError(f"CRM {method} {path} failed: {e}") from e
+
+    async def get_lead(self, lead_id: str) -> dict[str, Any]:
+        return await self._request("GET", f"/leads/{lead_id}")
+
+    async def find_slots(self, date_range: str) -> list[str]:
+        data = await self._request("GET", "/slots", params={"range": date_range})
+        return list(data.get("slots", []))
+
+    async def book_appointment(
+        self, lead_id: str, appointment_time: str, details: dict[str, Any]
+    ) -> dict[str, Any]:
+        return await self._request(
+            "POST",
+            "/appointments",
+            json={"lead_id": lead_id, "appointment_time": appointment_time, **details},
+        )
+
+    async def aclose(self) -> None:
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+            self._session = None
+
+
+def create_crm_backend() -> CRMBackend:
+    """Use the HTTP backend when CRM_API_URL is set, the local stand-in otherwise."""
+    if base_url := os.getenv("CRM_API_URL"):
+        return HttpCRMBackend(base_url, api_key=os.getenv("CRM_API_KEY"))
+    return LocalCRMBackend()
+
+
+class ToolRunner:
+    """
+    Runs tool backend calls for one call with caching, timeouts and latency metrics.
+
+    Cached entries store the in-flight future, so a lookup started by a prefetch
+    is shared with the tool call that needs it instead of being issued twice.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeouts: Optional[dict[str, float]] = None,
+        default_timeout: float = 4.0,
+    ) -> None:
+        """
+        Initialize the runner.
+
+        Args:
+            timeouts: Per-tool timeout in seconds
+            default_timeout: Timeout for tools without an explicit value
+        """
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self._cache: dict[tuple[str, str], tuple[float, asyncio.Future[Any]]] = {}
+        self._metrics: dict[str, dict[str, float]] = {}
+
+    async def run(
+        self,
+        tool: str,
+        call: Callable[[], Awaitable[Any]],
+        *,
+        cache_key: Optional[str] = None,
+        ttl: float = 0.0,
+    ) -> Any:
+        """
+        Run a backend call under the tool's timeout.
+
+        Args:
+            tool: Tool name used for timeouts and metrics
+            call: Zero-argument coroutine factory performing the request
+            cache_key: Key for idempotent lookups; None disables caching
+            ttl: Seconds a cached result stays valid
+
+        Returns:
+            The call result
+
+        Raises:
+            ToolTimeoutError: If the call does not finish in time
+        """
+        metrics = self._metrics.setdefault(
+            tool,
+            {
+                "calls": 0,
+                "cache_hits": 0,
+                "timeouts": 0,
+                "errors": 0,
+                "total_s": 0.0,
+                "max_s": 0.0,
+            },
+        )
+        metrics["calls"] += 1
+
+        key = (tool, cache_key) if cache_key is not None else None
+        if key is not None:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                future = cached[1]
+                if not (future.done() and (future.cancelled() or future.exception())):
+                    metrics["cache_hits"] += 1
+                    return await asyncio.shield(future)
+
+        started = time.perf_counter()
+        future = asyncio.ensure_future(self._timed(tool, call))
+        # the result may outlive the caller (prefetch, cancelled turn), mark it retrieved
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        if key is not None:
+            self._cache[key] = (time.monotonic() + ttl, future)
+
+        try:
+            return await asyncio.shield(future)
+        except ToolTimeoutError:
+            metrics["timeouts"] += 1
+            raise
+        except Exception:
+            metrics["errors"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics["total_s"] += elapsed
+            metrics["max_s"] = max(metrics["max_s"], elapsed)
+
+    async def _timed(self, tool: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        timeout = self.timeouts.get(tool, self.default_timeout)
+        try:
+            return await asyncio.wait_for(call(), timeout)
+        except asyncio.TimeoutError:
+            raise ToolTimeoutError(
+                f"{tool} did not respond within {timeout:.1f}s"
+            ) from None
+
+    async def gather(self, *calls: Awaitable[Any]) -> list[Any]:
+        """Run independent tool calls concurrently, returning exceptions in place."""
+        return list(await asyncio.gather(*calls, return_exceptions=True))
+
+    def invalidate(self, tool: str, cache_key: Optional[str] = None) -> None:
+        """Drop cached results of a tool, or a single key of it."""
+        for key in list(self._cache):
+            if key[0] == tool and (cache_key is None or key[1] == cache_key):
+                del self._cache[key]
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Return per-tool call counts and latency."""
+        return {
+            tool: {
+                **m,
+                "avg_s": round(m["total_s"] / m["calls"], 3) if m["calls"] else 0.0,
+                "total_s": round(m["total_s"], 3),
+                "max_s": round(m["max_s"], 3),
+            }
+            for tool, m in self._metrics.items()
+        }
+
+
+class CRMTools:
+    """
+    CRM operations for one call, backed by a ToolRunner.
+
+    Lead data and slot searches are idempotent and cached; bookings are not, and
+    invalidate the cached slots.
+    """
+
+    LEAD_TTL = 600.0
+    SLOTS_TTL = 60.0
+
+    def __init__(
+        self,
+        backend: CRMBackend,
+        *,
+        lead_id: Optional[str] = None,
+        runner: Optional[ToolRunner] = None,
+    ) -> None:
+        self.backend = backend
+        self.lead_id = lead_id
+        self.runner = runner or ToolRunner(
+            timeouts={"get_lead": 2.0, "find_slots": 3.0, "book_appointment": 6.0}
+        )
+
+    async def get_lead(self) -> dict[str, Any]:
+        if not self.lead_id:
+            return {}
+        lead_id = self.lead_id
+        return await self.runner.run(
+            "get_lead",
+            lambda: self.backend.get_lead(lead_id),
+            cache_key=lead_id,
+            ttl=self.LEAD_TTL,
+        )
+
+    async def find_slots(self, date_range: str) -> list[str]:
+        return await self.runner.run(
+            "find_slots",
+            lambda: self.backend.find_slots(date_range),
+            cache_key=date_range.strip().casefold(),
+            ttl=self.SLOTS_TTL,
+        )
+
+    async def book_appointment(
+        self, appointment_time: str, details: Optional[dict[str, Any]] = None
+    ) -> dict[str, Any]:
+        """
+        Book a slot for the call's lead with the details collected on the call.
+
+        Raises:
+            ToolError: If the call has no lead to book for, or the backend fails
+        """
+        if not self.lead_id:
+            raise ToolError("no lead to book the appointment for")
+        lead_id = self.lead_id
+        booking = await self.runner.run(
+            "book_appointment",
+            lambda: self.backend.book_appointment(
+                lead_id, appointment_time, details or {}
+            ),
+        )
+        self.runner.invalidate("find_slots")
+        return booking
+
+    async def prefetch(self, date_range: str = "bu hafta") -> None:
+        """Warm the lead record and the default slot search concurrently."""
+        results = await self.runner.gather(self.get_lead(), self.find_slots(date_range))
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"CRM prefetch failed: {result}")
@@ -0,0 +1,324 @@
+import asyncio
+import dataclasses
+import logging
+import math
+import time
+from collections.abc import AsyncIterable
+from typing import Any, Callable, Optional
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import utils
+from livekit.agents import vad as agents_vad
+
+logger = logging.getLogger(__name__)
+
+
+class InterruptionClassifier:
+    """
+    Decides whether caller audio heard while the agent speaks is a real barge-in.
+
+    Combines VAD speech duration, the energy of the analysed frames and the most
+    recent Soniox tokens (confidence and spoken duration). Speech that the STT
+    recognises with confidence interrupts right away; without STT evidence only
+    sustained, loud speech interrupts. Everything else is treated as noise.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_energy_dbfs: float = -45.0,
+        min_token_confidence: float = 0.6,
+        min_token_duration: float = 0.3,
+        sustained_speech: float = 1.2,
+        token_max_age: float = 1.5,
+        token_filter: Optional[Callable[[dict[str, Any]], bool]] = None,
+    ) -> None:
+        """
+        Initialize the classifier.
+
+        Args:
+            min_energy_dbfs: Frames quieter than this are never speech
+            min_token_confidence: Average token confidence that confirms speech
+            min_token_duration: Spoken duration of recognised tokens that confirms speech
+            sustained_speech: VAD speech duration that interrupts without STT evidence
+            token_max_age: Seconds after which STT evidence is considered stale
+            token_filter: Returns False for tokens that are not evidence of the
+                caller speaking, e.g. tokens of a non-primary speaker
+        """
+        self.min_energy_dbfs = min_energy_dbfs
+        self.min_token_confidence = min_token_confidence
+        self.min_token_duration = min_token_duration
+        self.sustained_speech = sustained_speech
+        self.token_max_age = token_max_age
+        self.token_filter = token_filter
+
+        self._token_confidence = 0.0
+        self._token_duration = 0.0
+        self._token_time = 0.0
+
+    def observe_tokens(self, tokens: list[dict[str, Any]]) -> None:
+        """Record STT evidence from the tokens of one Soniox message."""
+        spoken = [
+            t
+            for t in tokens
+            if t.get("text", "").strip()
+            and (self.token_filter is None or self.token_filter(t))
+        ]
+        if not spoken:
+            return
+        self._token_confidence = sum(t.get("confidence", 0.0) for t in spoken) / len(
+            spoken
+        )
+        self._token_duration = (
+            max(t.get("end_ms", 0) for t in spoken)
+            - min(t.get("start_ms", 0) for t in spoken)
+        ) / 1000.0
+        self._token_time = time.monotonic()
+
+    @staticmethod
+    def energy_dbfs(frames: list[rtc.AudioFrame]) -> float:
+        """Return the RMS level of the frames in dBFS."""
+        if not frames:
+            return -math.inf
+        samples = np.concatenate(
+            [np.frombuffer(f.data, dtype=np.int16) for f in frames]
+        ).astype(np.float32)
+        if not samples.size:
+            return -math.inf
+        rms = float(np.sqrt(np.mean(samples * samples)))
+        return 20 * math.log10(rms / 32768.0) if rms > 0 else -math.inf
+
+    def is_speech(self, ev: agents_vad.VADEvent) -> bool:
+        """Return True if the VAD inference should be allowed to interrupt."""
+        if self.energy_dbfs(ev.frames) < self.min_energy_dbfs:
+            return False
+
+        if time.monotonic() - self._token_time <= self.token_max_age and (
+            self._token_confidence >= self.min_token_confidence
+            and self._token_duration >= self.min_token_duration
+        ):
+            return True
+
+        return ev.speech_duration >= self.sustained_speech
+
+
+class GatedVAD(agents_vad.VAD):
+    """
+    VAD wrapper that hides noise from the interruption logic while the agent speaks.
+
+    Events are forwarded unchanged except INFERENCE_DONE events the classifier
+    rejects while `agent_speaking()` is true: their speech duration is reported
+    as zero, which keeps AgentSession below min_interruption_duration. Start and
+    end of speech events still drive turn detection as before.
+    """
+
+    def __init__(
+        self,
+        vad: agents_vad.VAD,
+        classifier: InterruptionClassifier,
+        agent_speaking: Callable[[], bool],
+    ) -> None:
+        super().__init__(capabilities=vad.capabilities)
+        self._vad = vad
+        self.classifier = classifier
+        self.agent_speaking = agent_speaking
+        self.suppressed_segments = 0
+        self._vad.on("metrics_collected", lambda m: self.emit("metrics_collected", m))
+
+    def stream(self) -> "GatedVADStream":
+        return GatedVADStream(self)
+
+
+class GatedVADStream(agents_vad.VADStream):
+    def __init__(self, vad: GatedVAD) -> None:
+        self._gated = vad
+        self._inner = vad._vad.stream()
+        super().__init__(vad)
+
+    async def _main_task(self) -> None:
+        async def _forward_input() -> None:
+            async for item in self._input_ch:
+                if isinstance(item, self._FlushSentinel):
+                    self._inner.flush()
+                else:
+                    self._inner.push_frame(item)
+            self._inner.end_input()
+
+        forward_task = asyncio.create_task(_forward_input())
+        suppressing = False
+        try:
+            async for ev in self._inner:
+                if ev.type == agents_vad.VADEventType.START_OF_SPEECH:
+                    suppressing = False
+                elif (
+                    ev.type == agents_vad.VADEventType.INFERENCE_DONE
+                    and ev.speech_duration > 0
+                    and self._gated.agent_speaking()
+                    and not self._gated.classifier.is_speech(ev)
+                ):
+                    if not suppressing:
+                        suppressing = True
+                        self._gated.suppressed_segments += 1
+                        logger.debug("suppressed likely noise while agent is speaking")
+                    ev = dataclasses.replace(ev, speech_duration=0.0)
+                self._event_ch.send_nowait(ev)
+        finally:
+            await utils.aio.cancel_and_wait(forward_task)
+            await self._inner.aclose()
+
+
+class SpeechResumer:
+    """
+    Keeps the audio of the agent's latest reply so it can be resumed after a
+    false interruption instead of being regenerated by the LLM and TTS.
+
+    Only a reply whose audio was fully synthesized can be resumed: when the
+    interruption cancels the TTS before synthesis ends, the cached audio stops
+    short of the reply text and the reply is regenerated instead. With chunked
+    TTS that is the case for most interruptions early in a long reply.
+    """
+
+    def __init__(self, *, max_seconds: float = 60.0) -> None:
+        """
+        Initialize the resumer.
+
+        Args:
+            max_seconds: Longest reply kept in memory; longer replies are not resumable
+        """
+        self.max_seconds = max_seconds
+        self._frames: list[rtc.AudioFrame] = []
+        self._duration = 0.0
+        self._text = ""
+        self._complete = False
+        self._overflow = False
+        self.playback_position: Optional[float] = None
+
+        self.interruptions = 0
+        self.false_interruptions = 0
+        self.resumed = 0
+        self.regenerated = 0
+        self.resumed_chars = 0
+        self.wasted_llm_tokens = 0
+        self.wasted_tts_chars = 0
+        self._wasted_speech_ids: set = set()
+
+    async def capture_text(self, text: AsyncIterable[str]) -> AsyncIterable[str]:
+        """Pass the reply text through while keeping a copy."""
+        self._frames, self._duration, self._text = [], 0.0, ""
+        self._complete = self._overflow = False
+        self.playback_position = None
+        async for delta in text:
+            self._text += delta
+            yield delta
+
+    async def capture_audio(
+        self, frames: AsyncIterable[rtc.AudioFrame]
+    ) -> AsyncIterable[rtc.AudioFrame]:
+        """Pass the reply audio through while keeping a copy."""
+        async for frame in frames:
+            if not self._overflow:
+                self._duration += frame.duration
+                if self._duration > self.max_seconds:
+                    self._overflow = True
+                    self._frames = []
+                else:
+                    self._frames.append(frame)
+            yield frame
+        self._complete = True
+
+    def on_playback_finished(self, playback_position: float, interrupted: bool) -> None:
+        """Remember where playback stopped when the reply was interrupted."""
+        if interrupted:
+            self.interruptions += 1
+            self.playback_position = playback_position
+
+    def resume(self, session: Any, played_text: str) -> bool:
+        """
+        Replay the rest of the interrupted reply from the cached audio.
+
+        Args:
+            session: The AgentSession to speak on
+            played_text: Text of the interrupted message, i.e. the transcript of the
+                audio played before the interruption
+
+        Returns:
+            False if the cached audio does not cover the interrupted reply
+        """
+        self.false_interruptions += 1
+        position = self.playback_position
+        if position is None or not self._complete or self._overflow or not self._frames:
+            return False
+
+        remaining_text = self._remaining_text(played_text, position)
+        remaining_frames = self._frames_from(position)
+        if remaining_text is None or not remaining_frames:
+            return False
+
+        async def _audio() -> AsyncIterable[rtc.AudioFrame]:
+            for frame in remaining_frames:
+                yield frame
+
+        session.say(remaining_text, audio=_audio(), add_to_chat_ctx=True)
+        self.resumed += 1
+        self.resumed_chars += len(remaining_text)
+        self.playback_position = None
+        return True
+
+    def _remaining_text(self, played_text: str, position: float) -> Optional[str]:
+        words = self._text.split()
+        played = played_text.split()
+        count = len(played)
+        head = max(count - 1, 0)
+        if count > len(words) or words[:head] != played[:head]:
+            return None
+        if count and words[count - 1] != played[-1]:
+            # playback stopped inside a word, which is said again
+            if not words[count - 1].startswith(played[-1]):
+                return None
+            count -= 1
+        elif count == len(words):
+            # the transcript was not synchronized with playback and holds the whole
+            # reply, so estimate the cut from the playback position
+            count = int(len(words) * min(position / self._duration, 1.0))
+        return " ".join(words[count:])
+
+    def _frames_from(self, position: float) -> list[rtc.AudioFrame]:
+        elapsed = 0.0
+        for i, frame in enumerate(self._frames):
+            if elapsed + frame.duration > position:
+                return self._frames[i:]
+            elapsed += frame.duration
+        return []
+
+    def mark_regenerated(self, speech_id: str) -> None:
+        """Attribute the LLM/TTS usage of a regenerated reply to false interruptions."""
+        self.regenerated += 1
+        self._wasted_speech_ids.add(speech_id)
+
+    def collect_metrics(self, metrics: Any) -> None:
+        """Accumulate usage of regenerated replies from session metrics."""
+        if getattr(metrics, "speech_id", None) not in self._wasted_speech_ids:
+            return
+        self.wasted_llm_tokens += getattr(metrics, "prompt_tokens", 0) + getattr(
+            metrics, "completion_tokens", 0
+        )
+        self.wasted_tts_chars += getattr(metrics, "characters_count", 0)
+
+    def stats(self, suppressed: int = 0) -> dict[str, float]:
+        """Return interruption counts and the usage wasted on regenerated replies."""
+        return {
+            "interruptions": self.interruptions,
+            "suppressed_noise": suppressed,
+            "false_interruptions": self.false_interruptions,
+            "false_interruption_rate": round(
+                self.false_interruptions / self.interruptions, 3
+            )
+            if self.interruptions
+            else 0.0,
+            "resumed": self.resumed,
+            "resumed_chars": self.resumed_chars,
+            "regenerated": self.regenerated,
+            "wasted_llm_tokens": self.wasted_llm_tokens,
+            "wasted_tts_chars": self.wasted_tts_chars,
+        }
@@ -0,0 +1,255 @@
+import logging
+import time
+from typing import Any, Optional
+
+import aiohttp
+import httpx
+import openai as openai_sdk
+from livekit.plugins import cartesia, openai
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderMetrics:
+    """In-flight requests, pool utilisation and connect times for one provider."""
+
+    def __init__(self, name: str, limit: int) -> None:
+        self.name = name
+        self.limit = limit
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.connects = 0
+        self.connect_seconds = 0.0
+        self.connect_max_s = 0.0
+        self._busy_integral = 0.0
+        self._started_at = self._changed_at = time.monotonic()
+
+    def _advance(self) -> None:
+        now = time.monotonic()
+        self._busy_integral += self.in_flight * (now - self._changed_at)
+        self._changed_at = now
+
+    def request_started(self) -> None:
+        self._advance()
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def request_finished(self) -> None:
+        self._advance()
+        self.in_flight -= 1
+
+    def connected(self, seconds: float) -> None:
+        self.connects += 1
+        self.connect_seconds += seconds
+        self.connect_max_s = max(self.connect_max_s, seconds)
+
+    def stats(self) -> dict[str, float]:
+        self._advance()
+        elapsed = max(self._changed_at - self._started_at, 1e-9)
+        return {
+            "limit": self.limit,
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "avg_utilisation": round(self._busy_integral / elapsed / self.limit, 4),
+            "connects": self.connects,
+            "connect_avg_s": round(self.connect_seconds / self.connects, 3)
+            if self.connects
+            else 0.0,
+            "connect_max_s": round(self.connect_max_s, 3),
+        }
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """Response body that marks the request finished once it is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, metrics: ProviderMetrics) -> None:
+        self._stream = stream
+        self._metrics = metrics
+        self._closed = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._metrics.request_finished()
+        await self._stream.aclose()
+
+
+class _TrackedTransport(httpx.AsyncHTTPTransport):
+    """httpx transport recording in-flight requests and TCP/TLS connect times."""
+
+    def __init__(self, metrics: ProviderMetrics, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.metrics = metrics
+
+    @property
+    def open_connections(self) -> int:
+        return len(self._pool.connections)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        connect_started: Optional[float] = None
+        https = request.url.scheme == "https"
+
+        async def _trace(event: str, info: dict[str, Any]) -> None:
+            nonlocal connect_started
+            if event == "connection.connect_tcp.started":
+                connect_started = time.perf_counter()
+            elif connect_started is not None and event == (
+                "connection.start_tls.complete"
+                if https
+                else "connection.connect_tcp.complete"
+            ):
+                self.metrics.connected(time.perf_counter() - connect_started)
+
+        request.extensions = {**request.extensions, "trace": _trace}
+        self.metrics.request_started()
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            self.metrics.request_finished()
+            raise
+        response.stream = _TrackedStream(response.stream, self.metrics)
+        return response
+
+
+def _aiohttp_trace_config(metrics: ProviderMetrics) -> aiohttp.TraceConfig:
+    """Trace hooks for aiohttp; requests count as in flight until their headers arrive."""
+    trace_config = aiohttp.TraceConfig()
+
+    async def _on_request_start(session, ctx, params) -> None:
+        metrics.request_started()
+
+    async def _on_request_done(session, ctx, params) -> None:
+        metrics.request_finished()
+
+    async def _on_connection_create_start(session, ctx, params) -> None:
+        ctx.connect_started = time.perf_counter()
+
+    async def _on_connection_create_end(session, ctx, params) -> None:
+        metrics.connected(time.perf_counter() - ctx.connect_started)
+
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_request_end.append(_on_request_done)
+    trace_config.on_request_exception.append(_on_request_done)
+    trace_config.on_connection_create_start.append(_on_connection_create_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    return trace_config
+
+
+class ProviderPools:
+    """
+    LLM and TTS clients of a job process, with pool metrics.
+
+    livekit's default process executor runs a single job per process and then
+    exits, so these clients serve one call; nothing is shared across calls. What
+    they buy is timing: the OpenAI client is built in prewarm while the process
+    waits idle for its job, and `warm` opens the OpenAI connection and Cartesia's
+    websocket at the start of the call, while the room connects, instead of on the
+    first LLM or TTS request. Each provider's connection pool also bounds the
+    call's in-flight requests: requests beyond the limit wait for a free
+    connection.
+
+    prewarm runs before the process has an event loop, so the aiohttp session used
+    by Cartesia is created on first use inside the job. Sharing the clients across
+    calls would need the thread job executor, which the rest of the worker (the
+    load reporter, the recording writer) does not support.
+    """
+
+    def __init__(
+        self,
+        *,
+        llm_max_in_flight: int = 32,
+        tts_max_in_flight: int = 32,
+        keepalive_expiry: float = 120.0,
+        openai_base_url: Optional[str] = None,
+    ) -> None:
+        """
+        Initialize the pools.
+
+        Args:
+            llm_max_in_flight: Concurrent OpenAI requests (and connections)
+            tts_max_in_flight: Concurrent Cartesia requests (and connections)
+            keepalive_expiry: Seconds idle connections are kept open
+            openai_base_url: OpenAI API root, defaults to the SDK default
+        """
+        self.keepalive_expiry = keepalive_expiry
+        self.llm_metrics = ProviderMetrics("openai", llm_max_in_flight)
+        self.tts_metrics = ProviderMetrics("cartesia", tts_max_in_flight)
+
+        self._llm_transport = _TrackedTransport(
+            self.llm_metrics,
+            limits=httpx.Limits(
+                max_connections=llm_max_in_flight,
+                max_keepalive_connections=llm_max_in_flight,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            http2=False,
+        )
+        self.llm_client = openai_sdk.AsyncClient(
+            base_url=openai_base_url,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                timeout=httpx.Timeout(connect=15.0, read=5.0, write=5.0, pool=5.0),
+                follow_redirects=True,
+                transport=self._llm_transport,
+            ),
+        )
+        self._http_session: Optional[aiohttp.ClientSession] = None
+
+    def http_session(self) -> aiohttp.ClientSession:
+        """Return the shared aiohttp session, creating it on the running loop."""
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.tts_metrics.limit,
+                    keepalive_timeout=self.keepalive_expiry,
+                    ttl_dns_cache=300,
+                ),
+                trace_configs=[_aiohttp_trace_config(self.tts_metrics)],
+            )
+        return self._http_session
+
+    def llm(self, **kwargs: Any) -> openai.LLM:
+        """Create a job's LLM on the shared OpenAI client."""
+        return openai.LLM(client=self.llm_client, **kwargs)
+
+    def tts(self, **kwargs: Any) -> cartesia.TTS:
+        """Create a job's TTS on the shared HTTP session."""
+        return cartesia.TTS(http_session=self.http_session(), **kwargs)
+
+    async def warm(self, tts: Optional[cartesia.TTS] = None) -> None:
+        """
+        Open the provider connections of a call before its first request.
+
+        Args:
+            tts: The call's TTS, whose pooled websocket is opened in the background
+        """
+        if tts is not None:
+            # the session's own prewarm finds this connection and does not open another
+            tts.prewarm()
+
+        started = time.perf_counter()
+        try:
+            await self.llm_client.models.list()
+        except Exception as e:
+            logger.warning(f"Failed to warm openai connection: {e}")
+            return
+        logger.debug(
+            f"openai connection warmed in {time.perf_counter() - started:.3f}s"
+        )
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Return per-provider pool metrics."""
+        return {
+            "openai": {
+                **self.llm_metrics.stats(),
+                "open_connections": self._llm_transport.open_connections,
+            },
+            "cartesia": self.tts_metrics.stats(),
+        }
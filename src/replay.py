@@ -0,0 +1,684 @@
+"""
+Offline replay of recorded calls.
+
+Feeds a call recorded by CallRecorder back through SonioxRecognizeStream, the
+Assistant and the AgentSession pipeline with the Soniox session, the LLM and the
+TTS replaced by their recorded responses, and writes a per-stage timing trace.
+
+Usage:
+    python src/replay.py RECORDING_DIR --list
+    python src/replay.py RECORDING_DIR CALL_ID [--speed 10] [--trace trace.jsonl]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from livekit import rtc
+from livekit.agents import AgentSession, llm, tts, utils
+from livekit.agents.types import (
+    DEFAULT_API_CONNECT_OPTIONS,
+    NOT_GIVEN,
+    APIConnectOptions,
+)
+from livekit.agents.voice import io
+
+from agent import (
+    DEFAULT_LANGUAGE,
+    DEFAULT_LANGUAGE_HINTS,
+    Assistant,
+    SpeculativeReplyController,
+    _last_user_text,
+    _normalize_transcript,
+    speculating,
+)
+from call_recorder import KIND_PCM, read_batch, read_index
+from context_window import SUMMARY_REQUEST_ID
+from crm_tools import CRMTools, LocalCRMBackend
+from interruptions import SpeechResumer
+from soniox_plugin import SonioxRecognizeStream, SonioxSTT, SpeakerLock
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RecordedCall:
+    """Everything replay needs from one recorded call, timestamps in call seconds."""
+
+    call_id: str
+    language_options: dict[str, Any] = field(default_factory=dict)
+    token_messages: list[tuple[float, list[dict[str, Any]]]] = field(
+        default_factory=list
+    )
+    user_turns: list[tuple[float, str]] = field(default_factory=list)
+    llm_responses: list[dict[str, Any]] = field(default_factory=list)
+    tts_chunks: list[dict[str, Any]] = field(default_factory=list)
+    audio: list[tuple[float, int, int, bytes]] = field(default_factory=list)
+    duration: float = 0.0
+
+
+def load_call(directory: str, call_id: str) -> RecordedCall:
+    """
+    Load a recorded call.
+
+    Args:
+        directory: Recording directory written by RecordingWriter
+        call_id: Call to load
+
+    Returns:
+        The recorded call
+    """
+    call = RecordedCall(call_id=call_id)
+    for entry in read_index(directory, call_id):
+        if entry["kind"] == KIND_PCM:
+            call.audio.append(
+                (
+                    entry["first_ts"],
+                    entry["sample_rate"],
+                    entry["num_channels"],
+                    read_batch(directory, entry),
+                )
+            )
+            continue
+
+        for event in read_batch(directory, entry):
+            call.duration = max(call.duration, event["t"])
+            if event["type"] == "call_started":
+                call.language_options = {
+                    k: v
+                    for k, v in event.items()
+                    if k in ("language", "language_hints")
+                }
+            elif event["type"] == "tokens":
+                call.token_messages.append((event["t"], event["tokens"]))
+            elif event["type"] == "message" and event["role"] == "user":
+                call.user_turns.append((event["t"], event["text"]))
+            elif event["type"] == "llm_response":
+                call.llm_responses.append(event)
+            elif event["type"] == "tts_chunk":
+                call.tts_chunks.append(event)
+
+    call.audio.sort(key=lambda a: a[0])
+    return call
+
+
+class ReplayClock:
+    """
+    Call-time clock; speed 1 replays in real time, higher values accelerate.
+
+    Recorded provider latencies are scaled by the same factor, so at high speeds
+    the trace is dominated by the processing time of the plugin and agent code.
+    """
+
+    def __init__(self, speed: float = 1.0) -> None:
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        self.speed = speed
+        self._start: Optional[float] = None
+
+    def start(self) -> None:
+        self._start = asyncio.get_running_loop().time()
+
+    def now(self) -> float:
+        if self._start is None:
+            return 0.0
+        return (asyncio.get_running_loop().time() - self._start) * self.speed
+
+    async def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            await asyncio.sleep(seconds / self.speed)
+
+    async def sleep_until(self, t: float) -> None:
+        await self.sleep(t - self.now())
+
+
+class ReplayTrace:
+    """Timestamped per-stage events of a replay."""
+
+    def __init__(self, clock: ReplayClock) -> None:
+        self.clock = clock
+        self.events: list[dict[str, Any]] = []
+
+    def add(self, stage: str, event: str, **fields: Any) -> None:
+        self.events.append(
+            {"t": round(self.clock.now(), 4), "stage": stage, "event": event, **fields}
+        )
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for event in self.events:
+                f.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+
+    def turns(self) -> list[dict[str, float]]:
+        """
+        Per user turn latencies from the commit of the turn.
+
+        Returns:
+            One entry per committed turn with the delay until the first LLM token,
+            the first TTS audio and the start of playback
+        """
+        turns: list[dict[str, float]] = []
+        current: Optional[dict[str, float]] = None
+        for event in self.events:
+            key = (event["stage"], event["event"])
+            if key == ("turn", "committed"):
+                current = {"turn": len(turns), "committed_t": event["t"]}
+                turns.append(current)
+            elif current is None:
+                continue
+            elif (
+                key == ("llm", "first_token")
+                and event.get("kind") != "summary"
+                and "llm_s" not in current
+            ):
+                current["llm_s"] = round(event["t"] - current["committed_t"], 4)
+            elif key == ("tts", "first_audio") and "tts_s" not in current:
+                current["tts_s"] = round(event["t"] - current["committed_t"], 4)
+            elif key == ("playback", "started") and "playback_s" not in current:
+                current["playback_s"] = round(event["t"] - current["committed_t"], 4)
+        return turns
+
+
+class ReplayRecognizeStream(SonioxRecognizeStream):
+    """
+    Soniox stream that receives the recorded messages instead of a WebSocket.
+
+    Messages are taken from a queue shared by all streams of the call, so a stream
+    started late first catches up on the messages recorded before it started and a
+    replacement stream continues where the previous one stopped.
+    """
+
+    def __init__(
+        self,
+        *,
+        messages: deque[tuple[float, list[dict[str, Any]]]],
+        clock: ReplayClock,
+        trace: ReplayTrace,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self._messages = messages
+        self._clock = clock
+        self._trace = trace
+
+    async def _connect(self) -> None:
+        pass
+
+    async def _listen(self) -> None:
+        while self._messages:
+            t, tokens = self._messages[0]
+            await self._clock.sleep_until(t)
+            self._messages.popleft()
+            self._trace.add(
+                "stt",
+                "tokens",
+                final=sum(1 for token in tokens if token.get("is_final")),
+                pending=sum(1 for token in tokens if not token.get("is_final")),
+            )
+            if not await self._handle_message({"tokens": tokens}):
+                break
+
+    async def write(self, frame: rtc.AudioFrame) -> None:
+        for listener in self._audio_listeners:
+            listener(frame)
+
+
+class ReplaySTT(SonioxSTT):
+    """SonioxSTT whose streams replay a recorded token stream."""
+
+    def __init__(
+        self, call: RecordedCall, clock: ReplayClock, trace: ReplayTrace, **kwargs: Any
+    ) -> None:
+        super().__init__(api_key="replay", **kwargs)
+        self._messages = deque(call.token_messages)
+        self._clock = clock
+        self._trace = trace
+
+    def _create_stream(self, **kwargs: Any) -> SonioxRecognizeStream:
+        return ReplayRecognizeStream(
+            messages=self._messages, clock=self._clock, trace=self._trace, **kwargs
+        )
+
+
+class ReplayLLMStream(llm.LLMStream):
+    def __init__(
+        self,
+        replay_llm: "ReplayLLM",
+        *,
+        response: Optional[dict[str, Any]],
+        chat_ctx: llm.ChatContext,
+        tools: list[Any],
+        conn_options: APIConnectOptions,
+    ) -> None:
+        super().__init__(
+            replay_llm, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options
+        )
+        self._response = response
+        self._replay = replay_llm
+
+    async def _run(self) -> None:
+        response = self._response
+        if response is None:
+            return
+
+        clock = self._replay.clock
+        request_id = utils.shortuuid("replay_")
+        await clock.sleep(response.get("ttft_s", 0.0))
+        kind = response.get("kind", "turn")
+        self._replay.trace.add(
+            "llm", "first_token", kind=kind, turn=response.get("turn")
+        )
+
+        words = response.get("text", "").split(" ")
+        # spread the remaining recorded generation time over the words
+        step = max(
+            response.get("duration_s", 0.0) - response.get("ttft_s", 0.0), 0.0
+        ) / max(len(words), 1)
+        for i, word in enumerate(words):
+            if i:
+                await clock.sleep(step)
+            self._event_ch.send_nowait(
+                llm.ChatChunk(
+                    id=request_id,
+                    delta=llm.ChoiceDelta(
+                        role="assistant", content=f" {word}" if i else word
+                    ),
+                )
+            )
+
+        tool_calls = [
+            llm.FunctionToolCall(**call) for call in response.get("tool_calls", [])
+        ]
+        if tool_calls:
+            self._event_ch.send_nowait(
+                llm.ChatChunk(
+                    id=request_id, delta=llm.ChoiceDelta(tool_calls=tool_calls)
+                )
+            )
+        self._replay.trace.add("llm", "done", kind=kind, turn=response.get("turn"))
+
+
+def _request_kind(chat_ctx: llm.ChatContext) -> str:
+    """Classify an LLM request like the recorded llm_response events."""
+    if any(item.id == SUMMARY_REQUEST_ID for item in chat_ctx.items):
+        return "summary"
+    return "speculative" if speculating.get() else "turn"
+
+
+class ReplayLLM(llm.LLM):
+    """
+    LLM answering with the recorded responses.
+
+    Each request is matched to a recorded response of the same kind: replies to
+    user turns and speculative generations by their user text, summary updates in
+    order. Responses are consumed in recorded order; a match also drops the earlier
+    responses of its kind that the replay never asked for, e.g. a turn answered by a
+    speculation. A speculative request without a recorded generation borrows the
+    turn reply for its text, in case the replay claims it. Requests without a
+    matching response get an empty reply.
+    """
+
+    def __init__(
+        self, responses: list[dict[str, Any]], clock: ReplayClock, trace: ReplayTrace
+    ) -> None:
+        super().__init__()
+        self.clock = clock
+        self.trace = trace
+        self._pending: list[dict[str, Any]] = list(responses)
+
+    @property
+    def model(self) -> str:
+        return "replay"
+
+    def _find(self, kind: str, user_text: Optional[str]) -> Optional[int]:
+        for i, response in enumerate(self._pending):
+            # recordings from before kinds were recorded only hold turns
+            if response.get("kind", "turn") != kind:
+                continue
+            if (
+                user_text is None
+                or _normalize_transcript(response.get("user_text", "")) == user_text
+            ):
+                return i
+        return None
+
+    def _pick(self, chat_ctx: llm.ChatContext) -> Optional[dict[str, Any]]:
+        kind = _request_kind(chat_ctx)
+        user_text = (
+            None
+            if kind == "summary"
+            else _normalize_transcript(_last_user_text(chat_ctx))
+        )
+        i = self._find(kind, user_text)
+        if i is None:
+            if (
+                kind == "speculative"
+                and (i := self._find("turn", user_text)) is not None
+            ):
+                return self._pending[i]
+            logger.debug(f"no recorded {kind} response for '{user_text}'")
+            return None
+
+        response = self._pending.pop(i)
+        self._pending = [
+            other
+            for j, other in enumerate(self._pending)
+            if j >= i or other.get("kind", "turn") != kind
+        ]
+        return response
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: Optional[list[Any]] = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        parallel_tool_calls: Any = NOT_GIVEN,
+        tool_choice: Any = NOT_GIVEN,
+        extra_kwargs: Any = NOT_GIVEN,
+    ) -> ReplayLLMStream:
+        return ReplayLLMStream(
+            self,
+            response=self._pick(chat_ctx),
+            chat_ctx=chat_ctx,
+            tools=tools or [],
+            conn_options=conn_options,
+        )
+
+
+class ReplayChunkedStream(tts.ChunkedStream):
+    def __init__(
+        self,
+        replay_tts: "ReplayTTS",
+        *,
+        input_text: str,
+        chunk: dict[str, Any],
+        conn_options: APIConnectOptions,
+    ) -> None:
+        super().__init__(
+            tts=replay_tts, input_text=input_text, conn_options=conn_options
+        )
+        self._replay = replay_tts
+        self._chunk = chunk
+
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        replay = self._replay
+        output_emitter.initialize(
+            request_id=utils.shortuuid("replay_"),
+            sample_rate=replay.sample_rate,
+            num_channels=1,
+            mime_type="audio/pcm",
+        )
+        await replay.clock.sleep(self._chunk.get("ttfb_s", 0.0))
+        replay.trace.add("tts", "first_audio", text=self.input_text[:40])
+
+        # silence of the recorded duration, pushed in 100ms pieces
+        remaining = int(self._chunk.get("audio_s", 0.0) * replay.sample_rate)
+        piece = replay.sample_rate // 10
+        while remaining > 0:
+            samples = min(piece, remaining)
+            output_emitter.push(b"\x00\x00" * samples)
+            remaining -= samples
+        output_emitter.flush()
+
+
+class ReplayTTS(tts.TTS):
+    """TTS producing silence with the recorded latency and duration of each chunk."""
+
+    def __init__(
+        self,
+        chunks: list[dict[str, Any]],
+        clock: ReplayClock,
+        trace: ReplayTrace,
+        *,
+        sample_rate: int = 24000,
+        fallback_chars_per_second: float = 14.0,
+    ) -> None:
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False),
+            sample_rate=sample_rate,
+            num_channels=1,
+        )
+        self.clock = clock
+        self.trace = trace
+        self.fallback_chars_per_second = fallback_chars_per_second
+        self._chunks: dict[str, deque[dict[str, Any]]] = {}
+        for chunk in chunks:
+            self._chunks.setdefault(chunk["text"], deque()).append(chunk)
+
+    def synthesize(
+        self,
+        text: str,
+        *,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> ReplayChunkedStream:
+        recorded = self._chunks.get(text)
+        if recorded:
+            chunk = recorded.popleft()
+        else:
+            chunk = {
+                "ttfb_s": 0.2,
+                "audio_s": len(text) / self.fallback_chars_per_second,
+            }
+        return ReplayChunkedStream(
+            self, input_text=text, chunk=chunk, conn_options=conn_options
+        )
+
+
+class ReplayAudioInput(io.AudioInput):
+    """Paces the recorded inbound PCM, or silence when audio was not recorded."""
+
+    FRAME_MS = 20
+
+    def __init__(
+        self, call: RecordedCall, clock: ReplayClock, sample_rate: int = 16000
+    ) -> None:
+        super().__init__(label="replay")
+        self._clock = clock
+        self._frames = self._iter_frames(call, sample_rate)
+        self._sample_rate = sample_rate
+
+    def _iter_frames(self, call: RecordedCall, sample_rate: int):
+        for first_ts, rate, channels, pcm in call.audio:
+            samples = rate * self.FRAME_MS // 1000
+            size = samples * channels * 2
+            for i, offset in enumerate(range(0, len(pcm) - size + 1, size)):
+                t = first_ts + i * self.FRAME_MS / 1000
+                yield (
+                    t,
+                    rtc.AudioFrame(
+                        pcm[offset : offset + size], rate, channels, samples
+                    ),
+                )
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        item = next(self._frames, None)
+        if item is not None:
+            await self._clock.sleep_until(item[0])
+            return item[1]
+
+        # keep the STT stream running after the recorded audio ends
+        samples = self._sample_rate * self.FRAME_MS // 1000
+        await self._clock.sleep(self.FRAME_MS / 1000)
+        return rtc.AudioFrame(b"\x00\x00" * samples, self._sample_rate, 1, samples)
+
+
+class ReplayAudioOutput(io.AudioOutput):
+    """Plays agent audio against the replay clock and reports playback like RoomIO."""
+
+    _FLUSH = object()
+
+    def __init__(self, clock: ReplayClock, trace: ReplayTrace) -> None:
+        super().__init__(label="replay", next_in_chain=None, sample_rate=None)
+        self._clock = clock
+        self._trace = trace
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._played = 0.0
+        self._segment_open = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        if self._task is None:
+            self._task = asyncio.create_task(self._play())
+        self._queue.put_nowait(frame)
+
+    def flush(self) -> None:
+        super().flush()
+        self._queue.put_nowait(self._FLUSH)
+
+    def clear_buffer(self) -> None:
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._finish(interrupted=True)
+
+    def _finish(self, *, interrupted: bool) -> None:
+        if not self._segment_open:
+            return
+        self._segment_open = False
+        self._trace.add(
+            "playback",
+            "finished",
+            audio_s=round(self._played, 3),
+            interrupted=interrupted,
+        )
+        self.on_playback_finished(
+            playback_position=self._played, interrupted=interrupted
+        )
+
+    async def _play(self) -> None:
+        while True:
+            item = await self._queue.get()
+            if item is self._FLUSH:
+                self._finish(interrupted=False)
+                continue
+            if not self._segment_open:
+                self._segment_open = True
+                self._played = 0.0
+                self._trace.add("playback", "started")
+            await self._clock.sleep(item.duration)
+            self._played += item.duration
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            await utils.aio.cancel_and_wait(self._task)
+
+
+async def replay_call(call: RecordedCall, *, speed: float = 1.0) -> ReplayTrace:
+    """
+    Replay a recorded call through the agent pipeline.
+
+    User turns are committed at their recorded times instead of running VAD and
+    the turn detector, so the replay is independent of inference timing. Timers
+    inside AgentSession (endpointing delays) still run on wall time and appear
+    stretched by the speed factor; compare accelerated traces with each other and
+    use speed 1 for absolute latencies.
+
+    Args:
+        call: Recorded call
+        speed: Clock speed, 1 for real time
+
+    Returns:
+        The timing trace
+    """
+    clock = ReplayClock(speed)
+    trace = ReplayTrace(clock)
+
+    language_options = {
+        "language": DEFAULT_LANGUAGE,
+        "language_hints": DEFAULT_LANGUAGE_HINTS,
+        **call.language_options,
+    }
+    # recorded tokens carry all speakers, so the speaker filter replays too
+    speaker_lock = SpeakerLock(eligible=lambda: session.agent_state != "speaking")
+    stt = ReplaySTT(call, clock, trace, speaker_lock=speaker_lock, **language_options)
+    speculation = SpeculativeReplyController()
+    stt.on_stable_prefix(speculation.on_stable_prefix)
+    speculation.on_turn_committed(stt.commit_turn)
+    assistant = Assistant(
+        speculation=speculation,
+        crm=CRMTools(LocalCRMBackend()),
+        resumer=SpeechResumer(),
+    )
+    session = AgentSession(
+        stt=stt,
+        llm=ReplayLLM(call.llm_responses, clock, trace),
+        tts=ReplayTTS(call.tts_chunks, clock, trace),
+        turn_detection="manual",
+        preemptive_generation=True,
+    )
+    session.input.audio = ReplayAudioInput(call, clock)
+    output = ReplayAudioOutput(clock, trace)
+    session.output.audio = output
+
+    @session.on("user_input_transcribed")
+    def _on_transcribed(ev) -> None:
+        trace.add("stt", "final" if ev.is_final else "interim", text=ev.transcript)
+
+    @session.on("agent_state_changed")
+    def _on_agent_state(ev) -> None:
+        trace.add("agent", ev.new_state)
+
+    @session.on("metrics_collected")
+    def _on_metrics(ev) -> None:
+        trace.add(
+            "metrics",
+            ev.metrics.type,
+            **ev.metrics.model_dump(exclude={"type", "timestamp"}),
+        )
+
+    clock.start()
+    await session.start(agent=assistant)
+    try:
+        for t, text in call.user_turns:
+            await clock.sleep_until(t)
+            trace.add("turn", "committed", text=text)
+            session.commit_user_turn()
+        await clock.sleep_until(call.duration)
+    finally:
+        await session.aclose()
+        await output.aclose()
+        speculation.close()
+
+    trace.add(
+        "replay",
+        "finished",
+        speculation=speculation.stats(),
+        tts=assistant.tts_pipeline.stats(),
+        speakers=speaker_lock.stats(),
+    )
+    return trace
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded call offline")
+    parser.add_argument("directory", help="recording directory (CALL_RECORDING_DIR)")
+    parser.add_argument("call_id", nargs="?", help="call to replay")
+    parser.add_argument("--list", action="store_true", help="list recorded calls")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="clock speed, 1 is real time"
+    )
+    parser.add_argument(
+        "--trace", help="write the timing trace as JSON lines to this file"
+    )
+    args = parser.parse_args()
+
+    if args.list or not args.call_id:
+        for call_id in sorted({e["call_id"] for e in read_index(args.directory)}):
+            print(call_id)
+        return
+
+    logging.basicConfig(level=logging.WARNING)
+    call = load_call(args.directory, args.call_id)
+    trace = asyncio.run(replay_call(call, speed=args.speed))
+    if args.trace:
+        trace.write(args.trace)
+    print(json.dumps({"call_id": call.call_id, "turns": trace.turns()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
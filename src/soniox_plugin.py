@@ -2,24 +2,214 @@ import asyncio
 import json
 import logging
 import os
-from typing import Any, Dict, List, Optional, Union
+import sys
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Union
 
 import websockets
-from websockets.exceptions import ConnectionClosed
 from livekit.agents.stt.stt import (
-    STT, 
-    STTCapabilities, 
-    SpeechEvent, 
-    SpeechEventType,
+    STT,
+    RecognizeStream,
     SpeechData,
-    RecognizeStream
+    SpeechEvent,
+    SpeechEventType,
+    STTCapabilities,
 )
 from livekit.agents.types import NOT_GIVEN, APIConnectOptions, NotGivenOr
+from livekit.agents.utils import is_given
 from livekit.rtc.audio_frame import AudioFrame
+from websockets.exceptions import ConnectionClosed
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class StablePrefix:
+    """Leading part of the current user turn that Soniox is unlikely to revise."""
+
+    text: str
+    is_final: bool
+    end_ms: int
+    revision: int
+
+
+class SpeakerLock:
+    """
+    Locks a call's transcript onto its primary speaker.
+
+    With diarization enabled Soniox tags every token with a speaker. The first
+    speaker to accumulate enough confident final speech becomes the primary speaker
+    for the rest of the call; tokens from any other speaker (the agent's own TTS echo
+    on speakerphone, bystanders) are dropped before transcripts are built. Until the
+    lock is taken every token passes through. The lock is shared by all streams of
+    a call, so it survives reconnects.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_speech_ms: int = 1200,
+        min_confidence: float = 0.7,
+        eligible: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        """
+        Initialize the lock.
+
+        Args:
+            min_speech_ms: Final speech a speaker needs before becoming primary
+            min_confidence: Minimum confidence for a token to count towards the lock
+            eligible: Returns False while speech should not count towards the lock,
+                e.g. while the agent is speaking and its echo may be picked up
+        """
+        self.min_speech_ms = min_speech_ms
+        self.min_confidence = min_confidence
+        self.eligible = eligible
+        self.primary_speaker: Optional[str] = None
+        self.suppressed_tokens = 0
+        self.suppressed_turns = 0
+        self._speech_ms: Dict[str, int] = {}
+        self._last_final_speaker: Optional[str] = None
+
+    def lock(self, speaker: str) -> None:
+        """Make the given speaker primary."""
+        self.primary_speaker = str(speaker)
+        logger.info(f"Locked transcript onto speaker {self.primary_speaker}")
+
+    def reset(self) -> None:
+        """Release the lock so the next qualifying speaker becomes primary."""
+        self.primary_speaker = None
+        self._speech_ms = {}
+        self._last_final_speaker = None
+
+    def is_primary(self, token: Dict[str, Any]) -> bool:
+        """Return True if the token belongs to the primary speaker (or no lock is held)."""
+        speaker = token.get("speaker")
+        return (
+            self.primary_speaker is None
+            or speaker is None
+            or str(speaker) == self.primary_speaker
+        )
+
+    def _observe(self, token: Dict[str, Any], speaker: str) -> None:
+        if self.primary_speaker is not None:
+            return
+        if token.get("confidence", 1.0) < self.min_confidence:
+            return
+        if self.eligible is not None and not self.eligible():
+            return
+        spoken_ms = max(0, int(token.get("end_ms", 0)) - int(token.get("start_ms", 0)))
+        self._speech_ms[speaker] = self._speech_ms.get(speaker, 0) + spoken_ms
+        if self._speech_ms[speaker] >= self.min_speech_ms:
+            self.lock(speaker)
+
+    def filter(self, tokens: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Return the tokens of the primary speaker.
+
+        Final tokens update the lock. A run of consecutive final tokens from one
+        non-primary speaker counts as one suppressed turn.
+        """
+        kept = []
+        for token in tokens:
+            speaker = token.get("speaker")
+            if speaker is None or not token.get("text"):
+                kept.append(token)
+                continue
+
+            speaker = str(speaker)
+            is_final = bool(token.get("is_final"))
+            if is_final:
+                self._observe(token, speaker)
+
+            if self.is_primary(token):
+                kept.append(token)
+            elif is_final:
+                self.suppressed_tokens += 1
+                if self._last_final_speaker != speaker:
+                    self.suppressed_turns += 1
+                    logger.info(f"Suppressing speech from non-primary speaker {speaker}")
+
+            if is_final:
+                self._last_final_speaker = speaker
+        return kept
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the primary speaker and suppression counts."""
+        return {
+            "primary_speaker": self.primary_speaker,
+            "speakers": len(self._speech_ms),
+            "suppressed_turns": self.suppressed_turns,
+            "suppressed_tokens": self.suppressed_tokens,
+        }
+
+
+END_TOKEN = "<end>"
+
+
+class SonioxToken:
+    """
+    Compact form of a recognised Soniox token.
+
+    Only the fields transcripts are built from are kept; the rest of the server
+    message is dropped. Language and speaker tags are interned, so tokens share a
+    single copy of each.
+    """
+
+    __slots__ = ("confidence", "end_ms", "is_final", "language", "speaker", "start_ms", "text")
+
+    def __init__(
+        self,
+        text: str,
+        start_ms: int = 0,
+        end_ms: int = 0,
+        confidence: float = 1.0,
+        is_final: bool = False,
+        language: Optional[str] = None,
+        speaker: Optional[str] = None,
+    ) -> None:
+        self.text = text
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.confidence = confidence
+        self.is_final = is_final
+        self.language = language
+        self.speaker = speaker
+
+    @classmethod
+    def from_message(cls, token: Dict[str, Any]) -> "SonioxToken":
+        """Build a token from its JSON form in a Soniox message."""
+        language = token.get("language")
+        speaker = token.get("speaker")
+        return cls(
+            text=token["text"],
+            start_ms=int(token.get("start_ms", 0)),
+            end_ms=int(token.get("end_ms", 0)),
+            confidence=float(token.get("confidence", 1.0)),
+            is_final=bool(token.get("is_final")),
+            language=sys.intern(language) if language else None,
+            speaker=sys.intern(str(speaker)) if speaker is not None else None,
+        )
+
+    def nbytes(self) -> int:
+        """Approximate memory held by this token (language and speaker are shared)."""
+        return sys.getsizeof(self) + sys.getsizeof(self.text)
+
+
+StablePrefixCallback = Callable[[StablePrefix], None]
+TokensCallback = Callable[[List[Dict[str, Any]]], None]
+AudioCallback = Callable[[AudioFrame], None]
+
+
+def _resolve_language_hints(language: str, language_hints: Optional[List[str]]) -> List[str]:
+    """Combine the primary language and explicit hints, primary language first."""
+    hints = list(language_hints) if language_hints else []
+    if language != "auto" and language not in hints:
+        hints.insert(0, language)
+    return hints
+
+
 class SonioxSTT(STT):
     """Soniox STT integration for LiveKit Agents."""
     
@@ -31,6 +221,7 @@ class SonioxSTT(STT):
         api_key: Optional[str] = None,
         model: str = "stt-rt-preview",
         language: str = "tr",
+        language_hints: Optional[List[str]] = None,
         sample_rate: int = 16000,
         interim_results: bool = True,
         punctuate: bool = True,
@@ -38,6 +229,10 @@ class SonioxSTT(STT):
         max_retries: int = 3,
         retry_delay: float = 1.0,
         timeout: float = 30.0,
+        stability_window_ms: int = 600,
+        stability_min_confidence: float = 0.85,
+        speaker_lock: Optional[SpeakerLock] = None,
+        max_segment_tokens: int = 256,
     ) -> None:
         """
         Initialize Soniox STT.
@@ -46,6 +241,8 @@ class SonioxSTT(STT):
             api_key: Soniox API key. If not provided, will look for SONIOX_API_KEY env var.
             model: Soniox model to use (stt-rt-preview, etc.)
             language: Language code or 'auto' for automatic detection
+            language_hints: Additional languages the caller may switch to; language
+                identification is enabled when more than one language is possible
             sample_rate: Audio sample rate in Hz
             interim_results: Whether to return interim results
             punctuate: Whether to add punctuation
@@ -53,6 +250,14 @@ class SonioxSTT(STT):
             max_retries: Maximum number of retry attempts
             retry_delay: Delay between retries in seconds
             timeout: Request timeout in seconds
+            stability_window_ms: Non-final tokens older than this (relative to the
+                newest token) count as stable
+            stability_min_confidence: Minimum confidence for a non-final token to
+                count as stable
+            speaker_lock: Filters transcripts down to the call's primary speaker;
+                created with defaults when diarize is enabled
+            max_segment_tokens: Final tokens a stream buffers before emitting them
+                as a final transcript even without an endpoint
         """
         self.api_key = api_key or os.getenv("SONIOX_API_KEY")
         if not self.api_key:
@@ -63,6 +268,7 @@ class SonioxSTT(STT):
         
         self.model = model
         self.language = language
+        self.language_hints = list(language_hints) if language_hints else None
         self.sample_rate = sample_rate
         self.interim_results = interim_results
         self.punctuate = punctuate
@@ -70,6 +276,16 @@ class SonioxSTT(STT):
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.timeout = timeout
+        self.stability_window_ms = stability_window_ms
+        self.stability_min_confidence = stability_min_confidence
+        if speaker_lock is None and diarize:
+            speaker_lock = SpeakerLock()
+        self.speaker_lock = speaker_lock
+        self.max_segment_tokens = max_segment_tokens
+        self._stable_prefix_listeners: List[StablePrefixCallback] = []
+        self._tokens_listeners: List[TokensCallback] = []
+        self._audio_listeners: List[AudioCallback] = []
+        self._streams: weakref.WeakSet[SonioxRecognizeStream] = weakref.WeakSet()
         
         capabilities = STTCapabilities(
             streaming=True,
@@ -88,6 +304,80 @@ class SonioxSTT(STT):
         """Return a human-readable label for this STT provider."""
         return f"Soniox ({self.model})"
     
+    def on_stable_prefix(self, callback: StablePrefixCallback) -> None:
+        """
+        Register a callback invoked whenever the stable prefix of an utterance changes.
+        
+        Args:
+            callback: Called from the stream listener with the new StablePrefix
+        """
+        self._stable_prefix_listeners.append(callback)
+    
+    def on_tokens(self, callback: TokensCallback) -> None:
+        """
+        Register a callback invoked with the raw tokens of every Soniox message.
+        
+        Args:
+            callback: Called from the stream listener with the message's token list
+        """
+        self._tokens_listeners.append(callback)
+    
+    def on_audio(self, callback: AudioCallback) -> None:
+        """
+        Register a callback invoked with every audio frame sent to Soniox.
+        
+        Args:
+            callback: Called with the frame right before it is sent
+        """
+        self._audio_listeners.append(callback)
+
+    @property
+    def active_streams(self) -> int:
+        """Number of streams currently holding an open Soniox websocket."""
+        return sum(1 for stream in self._streams if stream._websocket is not None)
+
+    def token_stats(self) -> Dict[str, int]:
+        """Return token buffer sizes summed over the live streams."""
+        totals = {"streams": 0}
+        for stream in self._streams:
+            totals["streams"] += 1
+            for key, value in stream.stats().items():
+                if key.startswith("peak_"):
+                    totals[key] = max(totals.get(key, 0), value)
+                else:
+                    totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def commit_turn(self) -> None:
+        """
+        Mark the end of a user turn on every live stream.
+
+        Stable prefixes span the whole user turn across Soniox segments; call this
+        when the turn is committed so the next prefix starts from the next turn.
+        """
+        for stream in self._streams:
+            stream.commit_turn()
+
+    def update_options(
+        self,
+        *,
+        language: NotGivenOr[str] = NOT_GIVEN,
+        language_hints: NotGivenOr[List[str]] = NOT_GIVEN,
+    ) -> None:
+        """
+        Update language settings for new and live streams.
+        
+        Args:
+            language: Primary language code or 'auto'
+            language_hints: Additional languages the caller may switch to
+        """
+        if is_given(language):
+            self.language = language
+        if is_given(language_hints):
+            self.language_hints = list(language_hints) if language_hints else None
+        
+        for stream in self._streams:
+            stream.update_options(language=language, language_hints=language_hints)
 
     
     async def _recognize_impl(
@@ -173,16 +463,30 @@ class SonioxSTT(STT):
         
         actual_language = str(actual_language) if actual_language != NOT_GIVEN else "auto"
         
-        return SonioxRecognizeStream(
+        stream = self._create_stream(
             api_key=self.api_key,
             model=self.model,
             language=actual_language,
+            language_hints=self.language_hints,
             sample_rate=self.sample_rate,
             interim_results=self.interim_results,
             punctuate=self.punctuate,
             diarize=self.diarize,
-            timeout=self.timeout
+            timeout=self.timeout,
+            stability_window_ms=self.stability_window_ms,
+            stability_min_confidence=self.stability_min_confidence,
+            speaker_lock=self.speaker_lock,
+            max_segment_tokens=self.max_segment_tokens,
+            stable_prefix_listeners=self._stable_prefix_listeners,
+            tokens_listeners=self._tokens_listeners,
+            audio_listeners=self._audio_listeners,
         )
+        self._streams.add(stream)
+        return stream
+    
+    def _create_stream(self, **kwargs: Any) -> "SonioxRecognizeStream":
+        """Construct the stream object; replay substitutes a recorded session here."""
+        return SonioxRecognizeStream(**kwargs)
     
     async def aclose(self) -> None:
         """Close the STT and clean up resources."""
@@ -207,11 +511,19 @@ class SonioxRecognizeStream(RecognizeStream):
         api_key: str,
         model: str = "stt-rt-preview",
         language: str = "auto",
+        language_hints: Optional[List[str]] = None,
         sample_rate: int = 16000,
         interim_results: bool = True,
         punctuate: bool = True,
         diarize: bool = False,
         timeout: float = 30.0,
+        stability_window_ms: int = 600,
+        stability_min_confidence: float = 0.85,
+        speaker_lock: Optional[SpeakerLock] = None,
+        max_segment_tokens: int = 256,
+        stable_prefix_listeners: Optional[List[StablePrefixCallback]] = None,
+        tokens_listeners: Optional[List[TokensCallback]] = None,
+        audio_listeners: Optional[List[AudioCallback]] = None,
     ) -> None:
         """
         Initialize streaming session.
@@ -220,11 +532,20 @@ class SonioxRecognizeStream(RecognizeStream):
             api_key: Soniox API key
             model: Soniox model to use
             language: Language code
+            language_hints: Additional languages the caller may switch to
             sample_rate: Audio sample rate
             interim_results: Whether to return interim results
             punctuate: Whether to add punctuation
             diarize: Whether to perform speaker diarization
             timeout: WebSocket timeout
+            stability_window_ms: Age after which a non-final token counts as stable
+            stability_min_confidence: Minimum confidence for a stable non-final token
+            speaker_lock: Primary-speaker lock shared by the streams of a call
+            max_segment_tokens: Final tokens buffered before they are emitted as a
+                final transcript even without an endpoint
+            stable_prefix_listeners: Callbacks notified when the stable prefix changes
+            tokens_listeners: Callbacks receiving the raw tokens of each message
+            audio_listeners: Callbacks receiving each audio frame sent to Soniox
         """
         dummy_stt = SonioxSTT(api_key=api_key, model=model, language=language)
         
@@ -237,16 +558,46 @@ class SonioxRecognizeStream(RecognizeStream):
         self.api_key = api_key
         self.model = model
         self.language = language
+        self._explicit_language_hints = language_hints
+        self.language_hints = _resolve_language_hints(language, language_hints)
         self.sample_rate = sample_rate
         self.interim_results = interim_results
         self.punctuate = punctuate
         self.diarize = diarize
         self.timeout = timeout
+        self.stability_window_ms = stability_window_ms
+        self.stability_min_confidence = stability_min_confidence
+        self.speaker_lock = speaker_lock
+        self.max_segment_tokens = max_segment_tokens
         
         self._websocket = None
         self._listen_task = None
-        self._final_tokens = []
-        self._non_final_tokens = []
+        # monotonic time of the last non-error message from Soniox, including
+        # messages whose tokens the speaker lock drops; tells a live session from
+        # a stalled or failing one
+        self.last_message_at: Optional[float] = None
+        # tokens of the current segment; finals are evicted once emitted as final
+        self._final_tokens: List[SonioxToken] = []
+        self._non_final_tokens: List[SonioxToken] = []
+        self._final_bytes = 0
+        self._peak_bytes = 0
+        self._peak_tokens = 0
+        self._segments = 0
+        self._forced_segments = 0
+        self._evicted_tokens = 0
+        self._stable_prefix_listeners = (
+            stable_prefix_listeners if stable_prefix_listeners is not None else []
+        )
+        self._tokens_listeners = tokens_listeners if tokens_listeners is not None else []
+        self._audio_listeners = audio_listeners if audio_listeners is not None else []
+        # final text of the segments already evicted in the current user turn
+        self._turn_text = ""
+        self._stable_text = ""
+        self._stable_revision = 0
+        self._session_hints: List[str] = []
+        self._session_identification = False
+        self._reconnect_pending = False
+        self._detected_language: Optional[str] = None
     
     async def _run(self) -> None:
         """Main run loop that processes audio input and manages WebSocket connection."""
@@ -276,12 +627,14 @@ class SonioxRecognizeStream(RecognizeStream):
                             logger.error(f"Error sending flush: {e}")
                 else:
                     logger.debug(f"Processing audio frame: {type(item)}")
+                    if self._reconnect_pending and not self._non_final_tokens:
+                        # apply new language settings between utterances
+                        await self._reconnect()
                     try:
                         await self.write(item)
                     except ConnectionClosed:
                         logger.warning("WebSocket connection lost, attempting to reconnect...")
-                        self._websocket = None
-                        await self._connect()
+                        await self._reconnect()
                         if self._websocket:
                             await self.write(item)
         except Exception as e:
@@ -298,6 +651,62 @@ class SonioxRecognizeStream(RecognizeStream):
                 except asyncio.CancelledError:
                     pass
     
+    def update_options(
+        self,
+        *,
+        language: NotGivenOr[str] = NOT_GIVEN,
+        language_hints: NotGivenOr[List[str]] = NOT_GIVEN,
+    ) -> None:
+        """
+        Update language settings of the live session.
+        
+        Soniox fixes the configuration when the session starts, so the live socket
+        is kept whenever the running session already identifies every requested
+        language. Otherwise the session is replaced at the next utterance boundary.
+        
+        Args:
+            language: Primary language code or 'auto'
+            language_hints: Additional languages the caller may switch to
+        """
+        if is_given(language):
+            self.language = language
+        if is_given(language_hints):
+            self._explicit_language_hints = language_hints
+        self.language_hints = _resolve_language_hints(
+            self.language, self._explicit_language_hints
+        )
+        
+        if self._websocket is None:
+            return
+        
+        if self._session_identification and set(self.language_hints) <= set(self._session_hints):
+            logger.info(f"Language hints {self.language_hints} served by the live Soniox session")
+            return
+        
+        logger.info(f"Language hints changed to {self.language_hints}, reconnecting at next pause")
+        self._reconnect_pending = True
+    
+    async def _reconnect(self) -> None:
+        """Replace the WebSocket session and restart the listener."""
+        self._reconnect_pending = False
+        
+        if self._listen_task:
+            self._listen_task.cancel()
+            try:
+                await self._listen_task
+            except asyncio.CancelledError:
+                pass
+        
+        if self._websocket:
+            try:
+                await self._websocket.close()
+            except Exception:
+                pass
+            self._websocket = None
+        
+        await self._connect()
+        self._listen_task = asyncio.create_task(self._listen())
+    
     async def _connect(self) -> None:
         """Establish WebSocket connection to Soniox streaming API."""
         if self._websocket is not None:
@@ -306,13 +715,14 @@ class SonioxRecognizeStream(RecognizeStream):
         logger.info(f"Connecting to Soniox WebSocket API...")
         logger.info(f"URL: {SonioxSTT.WEBSOCKET_URL}")
         logger.info(f"Model: {self.model}")
-        logger.info(f"Language: {self.language}")
+        logger.info(f"Language: {self.language}, hints: {self.language_hints}")
         
+        identification = self.language == "auto" or len(self.language_hints) > 1
         config = {
             "api_key": self.api_key,
             "model": self.model,
-            "language_hints": [self.language] if self.language != "auto" else ["en"],
-            "enable_language_identification": self.language == "auto",
+            "language_hints": self.language_hints,
+            "enable_language_identification": identification,
             "enable_speaker_diarization": self.diarize,
             "enable_endpoint_detection": True,
             "audio_format": "pcm_s16le",
@@ -354,6 +764,8 @@ class SonioxRecognizeStream(RecognizeStream):
                 logger.error(f"Error receiving initial response: {e}")
             
             logger.info("Connected to Soniox WebSocket streaming API")
+            self._session_hints = list(self.language_hints)
+            self._session_identification = identification
             
             try:
                 pong_waiter = await self._websocket.ping()
@@ -399,29 +811,8 @@ class SonioxRecognizeStream(RecognizeStream):
                     logger.error(f"Failed to parse JSON: {e}")
                     continue
                 
-                if "error_code" in data:
-                    logger.error(f"Soniox error: {data['error_code']} - {data['error_message']}")
+                if not await self._handle_message(data):
                     break
-                
-                if data.get("finished"):
-                    logger.info("Soniox session finished")
-                    break
-                
-                tokens = data.get("tokens", [])
-                self._non_final_tokens = []
-                
-                for token in tokens:
-                    if token.get("text"):
-                        if token.get("is_final"):
-                            self._final_tokens.append(token)
-                            logger.info(f"Final token: {token['text']}")
-                        else:
-                            self._non_final_tokens.append(token)
-                            logger.info(f"Non-final token: {token['text']}")
-                
-                # Emit speech events
-                if self._final_tokens or self._non_final_tokens:
-                    await self._emit_speech_event()
                     
         except Exception as e:
             logger.error(f"Error in Soniox WebSocket listener: {e}")
@@ -432,20 +823,202 @@ class SonioxRecognizeStream(RecognizeStream):
             if self._websocket:
                 logger.info(f"WebSocket state at end: {self._websocket.state}")
     
-    async def _emit_speech_event(self) -> None:
-        """Emit speech event with current tokens."""
-        # Combine final and non-final tokens
-        all_tokens = self._final_tokens + self._non_final_tokens
+    async def _handle_message(self, data: Dict[str, Any]) -> bool:
+        """
+        Process one parsed Soniox message.
+        
+        Args:
+            data: Decoded JSON message from the WebSocket (or a recording)
+            
+        Returns:
+            False when the session ended or failed and listening should stop
+        """
+        if "error_code" in data:
+            logger.error(f"Soniox error: {data['error_code']} - {data['error_message']}")
+            return False
+        self.last_message_at = time.monotonic()
+        
+        if data.get("finished"):
+            logger.info("Soniox session finished")
+            return False
+        
+        tokens = data.get("tokens", [])
+        self._non_final_tokens = []
+        
+        for listener in self._tokens_listeners:
+            try:
+                listener(tokens)
+            except Exception as e:
+                logger.error(f"Error in tokens listener: {e}")
+        
+        if self.speaker_lock is not None:
+            tokens = self.speaker_lock.filter(tokens)
+        
+        endpoint = False
+        for token in tokens:
+            if not token.get("text"):
+                continue
+            if token["text"] == END_TOKEN:
+                # endpoint detection: the caller finished the utterance
+                endpoint = endpoint or bool(token.get("is_final"))
+                continue
+            compact = SonioxToken.from_message(token)
+            if compact.is_final:
+                self._final_tokens.append(compact)
+                self._final_bytes += compact.nbytes()
+                logger.info(f"Final token: {compact.text}")
+            else:
+                self._non_final_tokens.append(compact)
+                logger.info(f"Non-final token: {compact.text}")
+        self._update_peaks()
+        
+        # Emit the finished segment on its own so its tokens can be evicted, also
+        # when continuous speech never produces an all-final message
+        forced = len(self._final_tokens) >= self.max_segment_tokens
+        if (endpoint or forced) and self._final_tokens:
+            self._update_stable_prefix([])
+            await self._emit_speech_event(self._final_tokens)
+            self._evict_segment(forced=forced and not endpoint)
+        
+        # Emit speech events
+        if self._final_tokens or self._non_final_tokens:
+            self._update_stable_prefix(self._non_final_tokens)
+            await self._emit_speech_event(self._final_tokens + self._non_final_tokens)
+            if not self._non_final_tokens:
+                self._evict_segment()
+        
+        return True
+    
+    def _update_peaks(self) -> None:
+        pending_bytes = sum(token.nbytes() for token in self._non_final_tokens)
+        self._peak_bytes = max(self._peak_bytes, self._final_bytes + pending_bytes)
+        self._peak_tokens = max(
+            self._peak_tokens, len(self._final_tokens) + len(self._non_final_tokens)
+        )
+    
+    def _evict_segment(self, *, forced: bool = False) -> None:
+        """Drop the final tokens of a segment that has been emitted as final."""
+        self._segments += 1
+        self._forced_segments += int(forced)
+        self._evicted_tokens += len(self._final_tokens)
+        # the user turn may span several segments, keep its text for the prefix
+        self._turn_text = " ".join(
+            text for text in (self._turn_text, self._join_tokens(self._final_tokens)) if text
+        )
+        self._final_tokens = []
+        self._final_bytes = 0
+
+    def commit_turn(self) -> None:
+        """Start a new user turn: the next stable prefix no longer includes this one."""
+        self._turn_text = ""
+        self._stable_text = ""
+    
+    def stats(self) -> Dict[str, int]:
+        """Return the size of the token buffers and eviction counts of this stream."""
+        return {
+            "tokens": len(self._final_tokens) + len(self._non_final_tokens),
+            "bytes": self._final_bytes + sum(t.nbytes() for t in self._non_final_tokens),
+            "peak_tokens": self._peak_tokens,
+            "peak_bytes": self._peak_bytes,
+            "segments": self._segments,
+            "forced_segments": self._forced_segments,
+            "evicted_tokens": self._evicted_tokens,
+        }
+    
+    @staticmethod
+    def _join_tokens(tokens: List[SonioxToken]) -> str:
+        """Join token texts the same way transcripts are built."""
+        return " ".join(token.text for token in tokens)
+    
+    def _update_stable_prefix(self, pending: List[SonioxToken]) -> None:
+        """
+        Compute the stable prefix of the current user turn and notify listeners.
+        
+        The prefix starts with the segments already finalized in this turn, since
+        the last commit_turn(). In the current segment final tokens are always
+        stable. A non-final token is stable when it ended at least
+        stability_window_ms before the newest token and its confidence is high
+        enough; the prefix stops at the first token that fails either check.
+        """
+        if not self._stable_prefix_listeners:
+            return
+        
+        stable = list(self._final_tokens)
+        if pending:
+            horizon = pending[-1].end_ms - self.stability_window_ms
+            for token in pending:
+                if (
+                    token.end_ms > horizon
+                    or token.confidence < self.stability_min_confidence
+                ):
+                    break
+                stable.append(token)
+        
+        if not stable:
+            return
+        text = " ".join(
+            text for text in (self._turn_text, self._join_tokens(stable)) if text
+        )
+        if text == self._stable_text:
+            return
+        
+        self._stable_text = text
+        self._stable_revision += 1
+        prefix = StablePrefix(
+            text=text,
+            is_final=not pending,
+            end_ms=stable[-1].end_ms,
+            revision=self._stable_revision,
+        )
+        
+        for listener in self._stable_prefix_listeners:
+            try:
+                listener(prefix)
+            except Exception as e:
+                logger.error(f"Error in stable prefix listener: {e}")
+    
+    def _detect_language(self, tokens: List[SonioxToken]) -> str:
+        """
+        Return the dominant language of the tokens as identified by Soniox.
+        
+        The last detected language is kept for tokens without language information,
+        falling back to the configured language.
+        """
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            if token.language:
+                counts[token.language] = counts.get(token.language, 0) + len(token.text)
+        
+        if counts:
+            self._detected_language = max(counts, key=counts.get)
         
+        if self._detected_language:
+            return self._detected_language
+        if self.language != "auto":
+            return self.language
+        return self.language_hints[0] if self.language_hints else "auto"
+    
+    def _speaker_id(self, tokens: List[SonioxToken]) -> Optional[str]:
+        """Return the primary speaker, or the dominant speaker of the tokens."""
+        if self.speaker_lock is not None and self.speaker_lock.primary_speaker is not None:
+            return self.speaker_lock.primary_speaker
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            if token.speaker is not None:
+                counts[token.speaker] = counts.get(token.speaker, 0) + len(token.text)
+        return max(counts, key=counts.get) if counts else None
+    
+    async def _emit_speech_event(self, all_tokens: List[SonioxToken]) -> None:
+        """Emit a speech event for the tokens, final when all of them are final."""
         if not all_tokens:
             return
         
-        text = " ".join(token.get("text", "") for token in all_tokens if token.get("text"))
+        text = self._join_tokens(all_tokens)
         
         if not text:
             return
         
-        is_final = all(token.get("is_final", True) for token in all_tokens)
+        is_final = all(token.is_final for token in all_tokens)
         
         event_type = (
             SpeechEventType.FINAL_TRANSCRIPT if is_final 
@@ -456,8 +1029,9 @@ class SonioxRecognizeStream(RecognizeStream):
             type=event_type,
             alternatives=[
                 SpeechData(
-                    language=self.language,
-                    text=text
+                    language=self._detect_language(all_tokens),
+                    text=text,
+                    speaker_id=self._speaker_id(all_tokens),
                 )
             ]
         )
@@ -465,9 +1039,6 @@ class SonioxRecognizeStream(RecognizeStream):
         await self._event_ch.send(event)
         
         logger.info(f"Soniox STT: {event.type.name} - '{text}'")
-        
-        if is_final:
-            self._final_tokens = []
     
     async def write(self, frame: AudioFrame) -> None:
         """Write audio frame to the streaming session."""
@@ -476,6 +1047,12 @@ class SonioxRecognizeStream(RecognizeStream):
             await self._connect()
         
         if self._websocket:
+            for listener in self._audio_listeners:
+                try:
+                    listener(frame)
+                except Exception as e:
+                    logger.error(f"Error in audio listener: {e}")
+            
             try:
                 audio_data = frame.data.tobytes()
                 logger.debug(f"Sending {len(audio_data)} bytes of audio data")
@@ -516,6 +1093,7 @@ def create_soniox_stt(
     api_key: Optional[str] = None,
     model: str = "stt-rt-preview",
     language: str = "auto",
+    language_hints: Optional[List[str]] = None,
     sample_rate: int = 16000,
     interim_results: bool = True,
     punctuate: bool = True,
@@ -523,12 +1101,17 @@ def create_soniox_stt(
     max_retries: int = 3,
     retry_delay: float = 1.0,
     timeout: float = 30.0,
+    stability_window_ms: int = 600,
+    stability_min_confidence: float = 0.85,
+    speaker_lock: Optional[SpeakerLock] = None,
+    max_segment_tokens: int = 256,
 ) -> SonioxSTT:
 
     return SonioxSTT(
         api_key=api_key,
         model=model,
         language=language,
+        language_hints=language_hints,
         sample_rate=sample_rate,
         interim_results=interim_results,
         punctuate=punctuate,
@@ -536,4 +1119,8 @@ def create_soniox_stt(
         max_retries=max_retries,
         retry_delay=retry_delay,
         timeout=timeout,
+        stability_window_ms=stability_window_ms,
+        stability_min_confidence=stability_min_confidence,
+        speaker_lock=speaker_lock,
+        max_segment_tokens=max_segment_tokens,
     )
@@ -0,0 +1,531 @@
+import asyncio
+import contextlib
+import logging
+import statistics
+import time
+from collections import deque
+from typing import Any, Optional
+
+from livekit import rtc
+from livekit.agents import APIConnectionError, utils
+from livekit.agents.stt import (
+    STT,
+    RecognizeStream,
+    SpeechEvent,
+    SpeechEventType,
+    STTCapabilities,
+)
+from livekit.agents.types import (
+    DEFAULT_API_CONNECT_OPTIONS,
+    NOT_GIVEN,
+    APIConnectOptions,
+    NotGivenOr,
+)
+
+from interruptions import InterruptionClassifier
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderHealth:
+    """
+    Rolling first-interim latency, error rate and usage of one STT provider.
+
+    Samples older than error_ttl seconds are ignored, so a provider that was
+    degraded counts as healthy again once it had time to recover.
+    """
+
+    def __init__(
+        self, name: str, *, window: int = 20, error_ttl: Optional[float] = None
+    ) -> None:
+        self.name = name
+        self.error_ttl = error_ttl
+        # (monotonic time, seconds) per answered utterance
+        self.latencies: deque[tuple[float, float]] = deque(maxlen=window)
+        # (monotonic time, failed): True for errors and stalls, False for answers
+        self.outcomes: deque[tuple[float, bool]] = deque(maxlen=window)
+        self.errors = 0
+        self.audio_seconds = 0.0
+
+    def record_latency(self, seconds: float) -> None:
+        now = time.monotonic()
+        self.latencies.append((now, seconds))
+        self.outcomes.append((now, False))
+
+    def record_error(self) -> None:
+        self.errors += 1
+        self.outcomes.append((time.monotonic(), True))
+
+    def _recent(self, samples: deque[tuple[float, Any]]) -> list[Any]:
+        if self.error_ttl is None:
+            return [value for _, value in samples]
+        cutoff = time.monotonic() - self.error_ttl
+        return [value for at, value in samples if at >= cutoff]
+
+    @property
+    def error_rate(self) -> float:
+        outcomes = self._recent(self.outcomes)
+        return sum(outcomes) / len(outcomes) if outcomes else 0.0
+
+    @property
+    def latency_p50(self) -> Optional[float]:
+        latencies = self._recent(self.latencies)
+        return statistics.median(latencies) if latencies else None
+
+    def stats(self, cost_per_minute: float = 0.0) -> dict[str, float]:
+        p50 = self.latency_p50
+        return {
+            "first_interim_p50_s": round(p50, 3) if p50 is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "errors": self.errors,
+            "audio_minutes": round(self.audio_seconds / 60, 2),
+            "cost": round(self.audio_seconds / 60 * cost_per_minute, 4),
+        }
+
+
+class FailoverSTT(STT):
+    """
+    Streaming STT that fails over between providers on errors or slow transcripts.
+
+    Each call starts on the cheapest provider whose rolling first-interim latency
+    and error rate are within bounds. A stream switches to another provider mid-call
+    when the active one fails or stops answering speech; the audio of the current
+    utterance is kept in a buffer shared by the providers and replayed to the new
+    one, so nothing the caller said is lost. Once recovery_interval has passed since
+    a provider's failure, the stream fails back to it at the next utterance
+    boundary. Optionally the first seconds of a call are hedged on all providers
+    and the first to answer is kept.
+
+    Provider health is kept in the `health` mapping, which can be shared by the
+    calls of a process so a degraded provider is avoided for new calls too.
+    """
+
+    def __init__(
+        self,
+        providers: list[STT],
+        *,
+        cost_per_minute: Optional[list[float]] = None,
+        health: Optional[dict[str, ProviderHealth]] = None,
+        max_first_interim_s: float = 1.5,
+        max_error_rate: float = 0.3,
+        stall_timeout: float = 3.0,
+        min_switch_interval: float = 5.0,
+        buffer_seconds: float = 8.0,
+        hedge_seconds: float = 0.0,
+        min_energy_dbfs: float = -40.0,
+        recovery_interval: float = 30.0,
+    ) -> None:
+        """
+        Initialize the failover STT.
+
+        Args:
+            providers: Streaming STTs in order of preference
+            cost_per_minute: Price of one audio minute per provider, used to prefer the
+                cheaper of the healthy providers
+            health: Rolling provider health keyed by provider label
+            max_first_interim_s: Median first-interim latency above which a provider
+                counts as degraded
+            max_error_rate: Share of failed attempts above which a provider counts
+                as degraded
+            stall_timeout: Seconds of speech during which the active provider sends
+                nothing at all, after which it is abandoned
+            min_switch_interval: Seconds between switches caused by slowness
+            buffer_seconds: Audio of the current utterance kept for replay on a switch
+            hedge_seconds: Seconds at the start of a call streamed to all providers,
+                0 disables hedging
+            min_energy_dbfs: Frames louder than this count as speech the provider must
+                react to
+            recovery_interval: Seconds after which a failed or degraded provider
+                is tried again
+        """
+        if not providers:
+            raise ValueError("at least one STT provider is required")
+        for provider in providers:
+            if not provider.capabilities.streaming:
+                raise ValueError(f"{provider.label} does not support streaming")
+
+        super().__init__(
+            capabilities=STTCapabilities(
+                streaming=True,
+                interim_results=all(p.capabilities.interim_results for p in providers),
+            )
+        )
+        self.providers = providers
+        self.cost_per_minute = cost_per_minute or [0.0] * len(providers)
+        self.recovery_interval = recovery_interval
+        self.health = health if health is not None else {}
+        for provider in providers:
+            self.health.setdefault(
+                provider.label,
+                ProviderHealth(provider.label, error_ttl=recovery_interval),
+            )
+        self.max_first_interim_s = max_first_interim_s
+        self.max_error_rate = max_error_rate
+        self.stall_timeout = stall_timeout
+        self.min_switch_interval = min_switch_interval
+        self.buffer_seconds = buffer_seconds
+        self.hedge_seconds = hedge_seconds
+        self.min_energy_dbfs = min_energy_dbfs
+        self.switches = 0
+        self.failbacks = 0
+
+    @property
+    def label(self) -> str:
+        return f"Failover ({', '.join(p.label for p in self.providers)})"
+
+    def provider_health(self, index: int) -> ProviderHealth:
+        return self.health[self.providers[index].label]
+
+    def is_healthy(self, index: int) -> bool:
+        health = self.provider_health(index)
+        p50 = health.latency_p50
+        return health.error_rate <= self.max_error_rate and (
+            p50 is None or p50 <= self.max_first_interim_s
+        )
+
+    def choose(self, exclude: Optional[set[int]] = None) -> Optional[int]:
+        """
+        Return the provider to use: the cheapest healthy one, else the least degraded.
+
+        Args:
+            exclude: Providers not to consider
+
+        Returns:
+            The provider index, or None if every provider is excluded
+        """
+        candidates = [
+            i for i in range(len(self.providers)) if not exclude or i not in exclude
+        ]
+        if not candidates:
+            return None
+        healthy = [i for i in candidates if self.is_healthy(i)]
+        if healthy:
+            return min(healthy, key=lambda i: (self.cost_per_minute[i], i))
+
+        def _degradation(i: int) -> tuple:
+            health = self.provider_health(i)
+            p50 = health.latency_p50
+            return (health.error_rate, p50 if p50 is not None else 0.0, i)
+
+        return min(candidates, key=_degradation)
+
+    async def _recognize_impl(
+        self,
+        buffer: utils.AudioBuffer,
+        *,
+        language: NotGivenOr[str] = NOT_GIVEN,
+        conn_options: APIConnectOptions,
+    ) -> SpeechEvent:
+        last_error: Optional[Exception] = None
+        first = self.choose() or 0
+        for index in [first] + [i for i in range(len(self.providers)) if i != first]:
+            provider = self.providers[index]
+            try:
+                return await provider.recognize(
+                    buffer, language=language, conn_options=conn_options
+                )
+            except Exception as e:
+                self.provider_health(index).record_error()
+                last_error = e
+        raise APIConnectionError(f"all STT providers failed: {last_error}")
+
+    def stream(
+        self,
+        *,
+        language: NotGivenOr[str] = NOT_GIVEN,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> "FailoverRecognizeStream":
+        return FailoverRecognizeStream(
+            self, language=language, conn_options=conn_options
+        )
+
+    def stats(self) -> dict[str, object]:
+        """Return switch count and per-provider health and cost."""
+        return {
+            "switches": self.switches,
+            "failbacks": self.failbacks,
+            "providers": {
+                p.label: self.provider_health(i).stats(self.cost_per_minute[i])
+                for i, p in enumerate(self.providers)
+            },
+        }
+
+    async def aclose(self) -> None:
+        for provider in self.providers:
+            await provider.aclose()
+
+
+class FailoverRecognizeStream(RecognizeStream):
+    """Forwards audio to the active provider's stream and its events to the session."""
+
+    def __init__(
+        self,
+        failover: FailoverSTT,
+        *,
+        language: NotGivenOr[str],
+        conn_options: APIConnectOptions,
+    ) -> None:
+        super().__init__(stt=failover, conn_options=conn_options, sample_rate=NOT_GIVEN)
+        self._failover = failover
+        self._language = language
+        self._streams: dict[int, RecognizeStream] = {}
+        self._forward_tasks: dict[int, asyncio.Task] = {}
+        # streams being closed on purpose, whose end is not a failure
+        self._closing: set[RecognizeStream] = set()
+        # provider streams being closed, awaited before this stream finishes
+        self._close_tasks: set[asyncio.Task] = set()
+        self._failed: set[int] = set()
+        # when each provider last failed or stalled in this stream
+        self._failed_at: dict[int, float] = {}
+        self._at_boundary = False
+        self._active = 0
+        self._hedging = False
+        self._hedge_winner: Optional[int] = None
+        self._switched_at = 0.0
+        # audio since the active provider's last final transcript
+        self._buffer: deque[rtc.AudioFrame] = deque()
+        self._buffered_s = 0.0
+        # per provider: when speech started that the provider has not reacted to with
+        # any message, when it last sent anything, and the current utterance's first
+        # speech frame until its first transcript
+        self._waiting_since: dict[int, float] = {}
+        self._heard_at: dict[int, float] = {}
+        self._utterance_started: dict[int, float] = {}
+
+    def _open(self, index: int) -> RecognizeStream:
+        stream = self._failover.providers[index].stream(
+            language=self._language, conn_options=self._conn_options
+        )
+        self._failed.discard(index)
+        self._streams[index] = stream
+        self._forward_tasks[index] = asyncio.create_task(self._forward(index, stream))
+        return stream
+
+    def _close(self, index: int) -> None:
+        stream = self._streams.pop(index, None)
+        # a closed provider is only kept out by _failed_at until it may recover
+        self._failed.discard(index)
+        self._waiting_since.pop(index, None)
+        self._heard_at.pop(index, None)
+        self._utterance_started.pop(index, None)
+        if stream is None:
+            return
+        self._closing.add(stream)
+        # taken now: a failback may reopen this provider before the close finishes
+        forward = self._forward_tasks.pop(index, None)
+
+        async def _aclose() -> None:
+            with contextlib.suppress(Exception):
+                await stream.aclose()
+            if forward is not None:
+                await utils.aio.cancel_and_wait(forward)
+            self._closing.discard(stream)
+
+        task = asyncio.create_task(_aclose())
+        self._close_tasks.add(task)
+        task.add_done_callback(self._close_tasks.discard)
+
+    async def _wait_closed(self) -> None:
+        for index in list(self._streams):
+            self._close(index)
+        if self._close_tasks:
+            await asyncio.gather(*self._close_tasks, return_exceptions=True)
+
+    async def _forward(self, index: int, stream: RecognizeStream) -> None:
+        label = self._failover.providers[index].label
+        try:
+            async for ev in stream:
+                if stream not in self._closing:
+                    self._on_event(index, ev)
+        except Exception as e:
+            if stream not in self._closing:
+                logger.warning(f"{label} stream failed: {e}")
+        if stream not in self._closing and not self._input_ch.closed:
+            self._failed.add(index)
+            self._failed_at[index] = time.monotonic()
+
+    def _last_heard(self, index: int) -> float:
+        """
+        Return when a provider last sent anything.
+
+        Any event counts. Provider streams that expose `last_message_at` (Soniox)
+        also count raw messages that produced no event, e.g. tokens the speaker
+        lock dropped or silence, so a filtered or quiet stream is not a stall.
+        """
+        heard = self._heard_at.get(index, 0.0)
+        raw = getattr(self._streams.get(index), "last_message_at", None)
+        return max(heard, raw) if raw is not None else heard
+
+    def _on_event(self, index: int, ev: SpeechEvent) -> None:
+        self._heard_at[index] = time.monotonic()
+        self._waiting_since.pop(index, None)
+        transcript = ev.type in (
+            SpeechEventType.INTERIM_TRANSCRIPT,
+            SpeechEventType.FINAL_TRANSCRIPT,
+        )
+        if (
+            transcript
+            and (started := self._utterance_started.pop(index, None)) is not None
+        ):
+            self._failover.provider_health(index).record_latency(
+                time.monotonic() - started
+            )
+
+        if self._hedging and self._hedge_winner is None and transcript:
+            self._hedge_winner = self._active = index
+            logger.info(f"{self._failover.providers[index].label} answered first")
+        if index != self._active:
+            return
+
+        if ev.type == SpeechEventType.FINAL_TRANSCRIPT:
+            self._buffer.clear()
+            self._buffered_s = 0.0
+            self._at_boundary = True
+        self._event_ch.send_nowait(ev)
+
+    def _buffer_frame(self, frame: rtc.AudioFrame) -> None:
+        self._buffer.append(frame)
+        self._buffered_s += frame.duration
+        while (
+            self._buffered_s > self._failover.buffer_seconds and len(self._buffer) > 1
+        ):
+            self._buffered_s -= self._buffer.popleft().duration
+
+    def _end_hedge(self) -> None:
+        self._hedging = False
+        for index in list(self._streams):
+            if index != self._active:
+                self._close(index)
+
+    def _excluded(self, now: float) -> set[int]:
+        """Providers that failed in this stream less than recovery_interval ago."""
+        interval = self._failover.recovery_interval
+        return {i for i, at in self._failed_at.items() if now - at < interval}
+
+    def _switch(
+        self, reason: str, *, now: float, forced: bool, target: Optional[int] = None
+    ) -> None:
+        if not forced and now - self._switched_at < self._failover.min_switch_interval:
+            return
+        old = self._active
+        new = target
+        if new is None:
+            new = self._failover.choose(
+                exclude={old} | self._failed | self._excluded(now)
+            )
+        if new is None:
+            if forced:
+                raise APIConnectionError(f"all STT providers failed ({reason})")
+            return
+
+        providers = self._failover.providers
+        if new not in self._streams:
+            stream = self._open(new)
+            # replay the unfinished utterance so the new provider hears all of it
+            for frame in self._buffer:
+                stream.push_frame(frame)
+            self._failover.provider_health(new).audio_seconds += self._buffered_s
+        self._active = new
+        self._hedging = False
+        self._switched_at = now
+        self._failover.switches += 1
+        self._close(old)
+        logger.warning(
+            f"STT switched from {providers[old].label} to {providers[new].label} ({reason}), "
+            f"replayed {self._buffered_s:.1f}s of audio"
+        )
+
+    def _check_active(self, now: float) -> None:
+        if self._active in self._failed:
+            self._failover.provider_health(self._active).record_error()
+            self._failed_at[self._active] = now
+            self._switch("stream failed", now=now, forced=True)
+            return
+
+        since = self._waiting_since.get(self._active)
+        if since is None:
+            return
+        if self._last_heard(self._active) >= since:
+            # the provider is alive, it just had nothing to transcribe
+            self._waiting_since.pop(self._active, None)
+            return
+        if now - since > self._failover.stall_timeout:
+            self._failover.provider_health(self._active).record_error()
+            self._failed_at[self._active] = now
+            # count the stall once, then wait for the next unanswered speech
+            self._waiting_since.pop(self._active, None)
+            self._utterance_started.pop(self._active, None)
+            self._switch("no response to speech", now=now, forced=False)
+
+    def _maybe_failback(self, now: float) -> None:
+        """At an utterance boundary, return to the preferred provider if it recovered."""
+        if self._hedging:
+            return
+        preferred = self._failover.choose(exclude=self._failed | self._excluded(now))
+        if preferred is None or preferred == self._active:
+            return
+        switches = self._failover.switches
+        self._switch("provider recovered", now=now, forced=False, target=preferred)
+        if self._failover.switches != switches:
+            self._failover.failbacks += 1
+
+    async def _run(self) -> None:
+        failover = self._failover
+        # a retry after every provider failed starts over with all of them
+        self._failed = set()
+        self._failed_at = {}
+        self._active = failover.choose() or 0
+        self._open(self._active)
+        hedge_until = None
+        if failover.hedge_seconds > 0 and len(failover.providers) > 1:
+            self._hedging = True
+            hedge_until = time.monotonic() + failover.hedge_seconds
+            for index in range(len(failover.providers)):
+                if index != self._active:
+                    self._open(index)
+
+        try:
+            async for item in self._input_ch:
+                if isinstance(item, self._FlushSentinel):
+                    for stream in self._streams.values():
+                        with contextlib.suppress(RuntimeError):
+                            stream.flush()
+                    continue
+
+                now = time.monotonic()
+                if self._hedging and hedge_until is not None and now >= hedge_until:
+                    self._end_hedge()
+                self._check_active(now)
+                if self._at_boundary:
+                    self._at_boundary = False
+                    self._maybe_failback(now)
+
+                speech = (
+                    InterruptionClassifier.energy_dbfs([item])
+                    >= failover.min_energy_dbfs
+                )
+                self._buffer_frame(item)
+                for index, stream in list(self._streams.items()):
+                    if speech:
+                        self._waiting_since.setdefault(index, now)
+                        self._utterance_started.setdefault(index, now)
+                    try:
+                        stream.push_frame(item)
+                    except RuntimeError:
+                        # the stream ended, its forward task marks it failed
+                        continue
+                    failover.provider_health(index).audio_seconds += item.duration
+
+            for stream in self._streams.values():
+                with contextlib.suppress(RuntimeError):
+                    stream.end_input()
+            task = self._forward_tasks.get(self._active)
+            if task is not None:
+                await asyncio.wait([task], timeout=failover.stall_timeout)
+        finally:
+            await self._wait_closed()
+
+    async def aclose(self) -> None:
+        await super().aclose()
+        # _run may have been cancelled before its provider streams were closed
+        await self._wait_closed()
@@ -0,0 +1,213 @@
+import glob
+import logging
+import mmap
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+WORKER_INDEX_ENV = "AGENT_WORKER_INDEX"
+WORKER_CPU_ENV = "AGENT_WORKER_CPU"
+WORKER_PORT_ENV = "AGENT_WORKER_PORT"
+
+
+def model_files() -> list[str]:
+    """Return the VAD and turn-detector weight files present on this machine."""
+    paths = []
+    try:
+        import livekit.plugins.silero
+
+        paths.append(
+            os.path.join(
+                os.path.dirname(livekit.plugins.silero.__file__),
+                "resources",
+                "silero_vad.onnx",
+            )
+        )
+    except ImportError:
+        pass
+
+    try:
+        from huggingface_hub import constants
+
+        paths.extend(
+            glob.glob(
+                os.path.join(
+                    constants.HF_HUB_CACHE,
+                    "models--livekit--turn-detector",
+                    "snapshots",
+                    "*",
+                    "onnx",
+                    "*.onnx",
+                )
+            )
+        )
+    except ImportError:
+        pass
+    return [path for path in paths if os.path.isfile(path)]
+
+
+class ModelPages:
+    """
+    Keeps model weight files mapped read-only in the supervisor.
+
+    Mapping the files with MADV_WILLNEED pulls them into the page cache and the
+    mapping keeps them there while workers restart, so a worker loading its VAD
+    and turn-detector models reads the files from memory instead of disk. This
+    only speeds up loading: each worker's ONNX Runtime session still holds its own
+    copy of the weights, so it does not reduce the memory used per worker.
+    """
+
+    def __init__(self, paths: list[str]) -> None:
+        self.paths = paths
+        self._maps: list[mmap.mmap] = []
+        self.mapped_bytes = 0
+
+    def map(self) -> None:
+        for path in self.paths:
+            try:
+                with open(path, "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Failed to map model file {path}: {e}")
+                continue
+            if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+                mapped.madvise(mmap.MADV_WILLNEED)
+            self._maps.append(mapped)
+            self.mapped_bytes += len(mapped)
+        logger.info(
+            f"mapped {len(self._maps)} model files ({self.mapped_bytes / 1e6:.1f}MB)"
+        )
+
+    def close(self) -> None:
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+
+
+def configure_worker() -> dict[str, int]:
+    """
+    Apply the settings the supervisor passed to this worker process.
+
+    Pins the process to its core (job and inference processes inherit the
+    affinity) and returns WorkerOptions overrides. Outside supervisor mode this
+    does nothing and returns no overrides.
+    """
+    if WORKER_INDEX_ENV not in os.environ:
+        return {}
+
+    overrides: dict[str, int] = {}
+    if (cpu := os.getenv(WORKER_CPU_ENV)) and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {int(cpu)})
+    if port := os.getenv(WORKER_PORT_ENV):
+        overrides["port"] = int(port)
+    return overrides
+
+
+def worker_cpu() -> Optional[int]:
+    """Core this worker is pinned to in supervisor mode."""
+    cpu = os.getenv(WORKER_CPU_ENV)
+    return int(cpu) if cpu else None
+
+
+class Supervisor:
+    """
+    Runs one agent worker process per core and restarts them when they exit.
+
+    Every worker registers with LiveKit on its own and reports the load of its
+    core, so the server dispatches each job to the least loaded worker. Workers
+    are pinned to distinct cores together with their job and inference processes,
+    keeping the Soniox listeners, VAD and turn detection of different calls from
+    competing for one core.
+    """
+
+    def __init__(
+        self,
+        script: str,
+        argv: list[str],
+        *,
+        num_workers: Optional[int] = None,
+        base_port: int = 8081,
+        restart_delay: float = 2.0,
+    ) -> None:
+        """
+        Initialize the supervisor.
+
+        Args:
+            script: Agent entry point run by each worker
+            argv: Command line passed to each worker (e.g. ["start"])
+            num_workers: Worker count, defaults to the cores available to us
+            base_port: Health check port of the first worker, incremented per worker
+            restart_delay: Seconds to wait before restarting a worker that exited
+        """
+        self.script = script
+        self.argv = argv
+        cpus = (
+            sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+        )
+        self.cpus = cpus or list(range(os.cpu_count() or 1))
+        self.num_workers = num_workers or len(self.cpus)
+        self.base_port = base_port
+        self.restart_delay = restart_delay
+        self.model_pages = ModelPages(model_files())
+        self._workers: dict[int, subprocess.Popen] = {}
+        self._stopping = False
+        self.restarts = 0
+
+    def _spawn(self, index: int) -> subprocess.Popen:
+        env = os.environ.copy()
+        # each worker aggregates the load of its own job processes
+        env.pop("AGENT_LOAD_DIR", None)
+        env[WORKER_INDEX_ENV] = str(index)
+        env[WORKER_CPU_ENV] = str(self.cpus[index % len(self.cpus)])
+        env[WORKER_PORT_ENV] = str(self.base_port + index)
+        # size inference thread pools for a single core
+        env["NUM_CPUS"] = "1"
+        env["OMP_NUM_THREADS"] = "1"
+        process = subprocess.Popen([sys.executable, self.script, *self.argv], env=env)
+        logger.info(
+            f"started worker {index} (pid {process.pid}) on cpu {env[WORKER_CPU_ENV]}"
+        )
+        return process
+
+    def _stop(self, signum: int, frame: object) -> None:
+        self._stopping = True
+        for process in self._workers.values():
+            if process.poll() is None:
+                process.send_signal(signum)
+
+    def run(self) -> int:
+        """Start the workers and supervise them until interrupted."""
+        self.model_pages.map()
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+
+        for index in range(self.num_workers):
+            self._workers[index] = self._spawn(index)
+
+        try:
+            while not self._stopping:
+                time.sleep(0.5)
+                for index, process in list(self._workers.items()):
+                    code = process.poll()
+                    if code is None or self._stopping:
+                        continue
+                    logger.warning(
+                        f"worker {index} exited with code {code}, restarting"
+                    )
+                    time.sleep(self.restart_delay)
+                    self._workers[index] = self._spawn(index)
+                    self.restarts += 1
+        finally:
+            for process in self._workers.values():
+                try:
+                    process.wait(timeout=60)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            self.model_pages.close()
+        return 0
@@ -0,0 +1,438 @@
+import asyncio
+import logging
+import re
+import time
+from collections.abc import AsyncIterable
+from typing import Any, Callable, Optional, Union
+
+from livekit import rtc
+from livekit.agents import tts as agents_tts
+from livekit.agents import utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions
+
+logger = logging.getLogger(__name__)
+
+
+ChunkCallback = Callable[[dict[str, Any]], None]
+
+
+_ONES = ["", "bir", "iki", "üç", "dört", "beş", "altı", "yedi", "sekiz", "dokuz"]
+_TENS = [
+    "",
+    "on",
+    "yirmi",
+    "otuz",
+    "kırk",
+    "elli",
+    "altmış",
+    "yetmiş",
+    "seksen",
+    "doksan",
+]
+_SCALES = [(10**9, "milyar"), (10**6, "milyon"), (10**3, "bin")]
+
+
+def _below_thousand(n: int) -> list[str]:
+    words = []
+    hundreds, rest = divmod(n, 100)
+    if hundreds:
+        if hundreds > 1:
+            words.append(_ONES[hundreds])
+        words.append("yüz")
+    tens, ones = divmod(rest, 10)
+    if tens:
+        words.append(_TENS[tens])
+    if ones:
+        words.append(_ONES[ones])
+    return words
+
+
+def number_to_turkish(n: int) -> str:
+    """
+    Spell out a non-negative integer in Turkish.
+
+    Args:
+        n: Number to spell out
+
+    Returns:
+        The number as Turkish words, e.g. 532 -> "beş yüz otuz iki"
+    """
+    if n == 0:
+        return "sıfır"
+
+    words = []
+    for scale, name in _SCALES:
+        count, n = divmod(n, scale)
+        if count:
+            # "bin" is never preceded by "bir", larger scales always are
+            if not (count == 1 and scale == 1000):
+                words.extend(
+                    _below_thousand(count)
+                    if count < 1000
+                    else [number_to_turkish(count)]
+                )
+            words.append(name)
+    words.extend(_below_thousand(n))
+    return " ".join(words)
+
+
+def _spell_digits(digits: str) -> str:
+    """Read a digit group as a number, keeping leading zeros as 'sıfır'."""
+    stripped = digits.lstrip("0")
+    words = ["sıfır"] * (len(digits) - len(stripped))
+    if stripped:
+        words.append(number_to_turkish(int(stripped)))
+    return " ".join(words)
+
+
+def _time_of_day(hour: int) -> str:
+    if 5 <= hour < 12:
+        return "sabah"
+    if hour == 12:
+        return "öğlen"
+    if 13 <= hour < 17:
+        return "öğleden sonra"
+    if 17 <= hour < 22:
+        return "akşam"
+    return "gece"
+
+
+def _spell_time(match: "re.Match[str]") -> str:
+    hour, minute = int(match.group(1)), int(match.group(2))
+    spoken_hour = hour % 12 or 12
+    words = [_time_of_day(hour), number_to_turkish(spoken_hour)]
+    if minute == 30:
+        words.append("buçuk")
+    elif minute:
+        words.append(number_to_turkish(minute))
+    return " ".join(words)
+
+
+def _spell_phone(match: "re.Match[str]") -> str:
+    country, trunk, area, first, second, third = match.groups()
+    words = ["artı doksan"] if country else []
+    if trunk:
+        words.append("sıfır")
+    # read in the groups people say: 0 532 123 45 67
+    words.extend(_spell_digits(group) for group in (area, first, second, third))
+    return " ".join(words)
+
+
+_PHONE_RE = re.compile(
+    r"(?<![\d+])(\+90[\s-]?)?\(?(0)?[\s-]?\(?([2-5]\d{2})\)?[\s-]?(\d{3})[\s-]?(\d{2})[\s-]?(\d{2})(?!\d)"
+)
+_THOUSANDS_RE = re.compile(r"\b\d{1,3}(?:\.\d{3})+\b")
+_TIME_RE = re.compile(r"\b([01]?\d|2[0-3])[:.]([0-5]\d)\b")
+_ROUND_THE_CLOCK_RE = re.compile(r"\b7\s*/\s*24\b")
+_PERCENT_RE = re.compile(r"%\s*(\d+)")
+_PERCENT_SUFFIX_RE = re.compile(r"\b(\d+)\s*%")
+_DECIMAL_RE = re.compile(r"\b(\d+),(\d+)\b")
+_NUMBER_RE = re.compile(r"\d+")
+
+
+def normalize_spoken_turkish(text: str) -> str:
+    """
+    Rewrite digits, times and symbols into the words the agent should say.
+
+    Handles phone numbers (read in groups), thousands separators ("1.200"), clock
+    times ("18:00" -> "akşam altı"), "7/24", percentages ("%20" or "20%") and
+    decimals; any remaining digit group is spelled out.
+
+    Args:
+        text: Text chunk produced by the LLM
+
+    Returns:
+        Text suitable for speech synthesis
+    """
+    text = _ROUND_THE_CLOCK_RE.sub("yedi yirmi dört", text)
+    text = _PHONE_RE.sub(_spell_phone, text)
+    text = _THOUSANDS_RE.sub(lambda m: m.group(0).replace(".", ""), text)
+    text = _TIME_RE.sub(_spell_time, text)
+    text = _PERCENT_RE.sub(lambda m: f"yüzde {_spell_digits(m.group(1))}", text)
+    text = _PERCENT_SUFFIX_RE.sub(lambda m: f"yüzde {_spell_digits(m.group(1))}", text)
+    text = _DECIMAL_RE.sub(
+        lambda m: f"{_spell_digits(m.group(1))} virgül {_spell_digits(m.group(2))}",
+        text,
+    )
+    return _NUMBER_RE.sub(lambda m: _spell_digits(m.group(0)), text)
+
+
+_STRONG_BOUNDARY_RE = re.compile(r"[.!?…\n]+\s")
+_WEAK_BOUNDARY_RE = re.compile(
+    r"[,;:]\s|\s(?=(?:ve|ama|ancak|fakat|çünkü|yani|sonra|eğer|böylece|ayrıca)\s)",
+    re.IGNORECASE,
+)
+
+
+class SpokenChunker:
+    """
+    Split streamed LLM text into chunks that can be synthesized independently.
+
+    The prompt forbids punctuation, so sentence tokenizers rarely fire. Chunks are
+    cut at sentence marks when present, otherwise at clause boundaries (commas and
+    Turkish conjunctions) once the chunk is long enough, and as a last resort at the
+    last word boundary before max_chars. The first chunk uses lower limits so
+    synthesis can start early. A chunk never ends between two digit groups, so a
+    phone number, time or amount spoken with spaces stays in one TTS request and
+    is normalized as a whole.
+    """
+
+    def __init__(
+        self,
+        *,
+        first_min_chars: int = 20,
+        first_max_chars: int = 60,
+        min_chars: int = 50,
+        max_chars: int = 160,
+    ) -> None:
+        """
+        Initialize the chunker.
+
+        Args:
+            first_min_chars: Minimum length of the first chunk of a reply
+            first_max_chars: Hard upper bound on the first chunk length
+            min_chars: Minimum length of subsequent clause-split chunks
+            max_chars: Hard upper bound on chunk length
+        """
+        self.first_min_chars = first_min_chars
+        self.first_max_chars = first_max_chars
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+        self._emitted = 0
+
+    def push(self, text: str) -> list[str]:
+        """Add streamed text and return the chunks that are ready."""
+        self._buffer += text
+        chunks = []
+        while True:
+            split = self._find_split()
+            if split is None:
+                break
+            chunk, self._buffer = (
+                self._buffer[:split].strip(),
+                self._buffer[split:].lstrip(),
+            )
+            if chunk:
+                chunks.append(chunk)
+                self._emitted += 1
+        return chunks
+
+    def flush(self) -> list[str]:
+        """Return whatever text is left at the end of the reply."""
+        chunk, self._buffer = self._buffer.strip(), ""
+        self._emitted = 0
+        return [chunk] if chunk else []
+
+    def _find_split(self) -> Optional[int]:
+        # only consider complete words, the last word may still be streaming
+        complete = (
+            self._buffer[: self._buffer.rfind(" ") + 1] if " " in self._buffer else ""
+        )
+        if not complete:
+            return None
+
+        first = self._emitted == 0
+        min_len = self.first_min_chars if first else self.min_chars
+        max_len = self.first_max_chars if first else self.max_chars
+
+        for match in _STRONG_BOUNDARY_RE.finditer(complete):
+            if match.end() >= self.first_min_chars and not self._inside_number(
+                match.end()
+            ):
+                return match.end()
+
+        for match in _WEAK_BOUNDARY_RE.finditer(complete):
+            if match.end() >= min_len and not self._inside_number(match.end()):
+                return match.end()
+
+        if len(complete) >= max_len:
+            split = complete.rfind(" ", 0, max_len)
+            while split > 0 and self._inside_number(split + 1):
+                split = complete.rfind(" ", 0, split)
+            if split > 0:
+                return split + 1
+            return None if self._inside_number(len(complete)) else len(complete)
+
+        return None
+
+    def _inside_number(self, split: int) -> bool:
+        # a digit group followed by another one (or by a word still streaming)
+        before = self._buffer[:split].rstrip()[-1:]
+        after = self._buffer[split:].lstrip()[:1]
+        return (before.isdigit() or before == ")") and (
+            not after or after.isdigit() or after in "(+"
+        )
+
+
+class ChunkedTTSPipeline:
+    """
+    Synthesize a streamed reply chunk by chunk with pipelined requests.
+
+    Each chunk is normalized and sent to the TTS as soon as the chunker releases it,
+    while earlier chunks are still playing; up to `lookahead` chunks are synthesized
+    ahead of playback. A streaming TTS (Cartesia) gets each chunk on its own
+    stream, pushed and ended at the chunk boundary, over the plugin's pooled
+    websocket connections, instead of one HTTP request per chunk. First-audio
+    latency is recorded for every turn.
+    """
+
+    def __init__(
+        self,
+        *,
+        lookahead: int = 2,
+        first_min_chars: int = 20,
+        first_max_chars: int = 60,
+        min_chars: int = 50,
+        max_chars: int = 160,
+    ) -> None:
+        """
+        Initialize the pipeline.
+
+        Args:
+            lookahead: Number of chunks synthesized ahead of the one being played
+            first_min_chars: Minimum length of the first chunk of a reply
+            first_max_chars: Hard upper bound on the first chunk length
+            min_chars: Minimum length of subsequent chunks
+            max_chars: Hard upper bound on chunk length
+        """
+        self.lookahead = lookahead
+        self.first_min_chars = first_min_chars
+        self.first_max_chars = first_max_chars
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.turns: list[dict[str, float]] = []
+        self._chunk_listeners: list[ChunkCallback] = []
+
+    def on_chunk(self, callback: ChunkCallback) -> None:
+        """
+        Register a callback invoked after every chunk has been synthesized.
+
+        Args:
+            callback: Called with the turn index, the spoken text, the time to first
+                audio of the request and the synthesized audio duration
+        """
+        self._chunk_listeners.append(callback)
+
+    def _notify_chunk(self, chunk: dict[str, Any]) -> None:
+        for listener in self._chunk_listeners:
+            try:
+                listener(chunk)
+            except Exception as e:
+                logger.error(f"Error in TTS chunk listener: {e}")
+
+    @staticmethod
+    def _synthesize(
+        tts: agents_tts.TTS, text: str, conn_options: APIConnectOptions
+    ) -> Union[agents_tts.ChunkedStream, agents_tts.SynthesizeStream]:
+        if not tts.capabilities.streaming:
+            return tts.synthesize(text, conn_options=conn_options)
+        # one stream per chunk: livekit ends a stream's segment at its first flush,
+        # and the plugin reuses a pooled websocket for every stream
+        stream = tts.stream(conn_options=conn_options)
+        stream.push_text(text)
+        stream.end_input()
+        return stream
+
+    async def run(
+        self,
+        tts: agents_tts.TTS,
+        text: AsyncIterable[str],
+        *,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> AsyncIterable[rtc.AudioFrame]:
+        """
+        Synthesize the reply text stream and yield audio frames in order.
+
+        Args:
+            tts: TTS used for each chunk
+            text: Streamed reply text from the LLM
+            conn_options: Connection options for each synthesis request
+
+        Yields:
+            Audio frames for the reply
+        """
+        chunker = SpokenChunker(
+            first_min_chars=self.first_min_chars,
+            first_max_chars=self.first_max_chars,
+            min_chars=self.min_chars,
+            max_chars=self.max_chars,
+        )
+        turn = {"turn": len(self.turns), "chunks": 0}
+        self.turns.append(turn)
+        started_at = time.perf_counter()
+        streams: asyncio.Queue = asyncio.Queue(maxsize=self.lookahead)
+
+        async def _submit(chunk: str) -> None:
+            spoken = normalize_spoken_turkish(chunk)
+            if not spoken.strip():
+                return
+            if not turn["chunks"]:
+                turn["first_chunk_s"] = time.perf_counter() - started_at
+            turn["chunks"] += 1
+            await streams.put(
+                (
+                    spoken,
+                    time.perf_counter(),
+                    self._synthesize(tts, spoken, conn_options),
+                )
+            )
+
+        async def _produce() -> None:
+            try:
+                async for delta in text:
+                    for chunk in chunker.push(delta):
+                        await _submit(chunk)
+                for chunk in chunker.flush():
+                    await _submit(chunk)
+            finally:
+                await streams.put(None)
+
+        producer = asyncio.create_task(_produce())
+        try:
+            while True:
+                item = await streams.get()
+                if item is None:
+                    break
+                spoken, submitted_at, stream = item
+                chunk = {"turn": turn["turn"], "text": spoken, "audio_s": 0.0}
+                async with stream:
+                    async for ev in stream:
+                        if "ttfb_s" not in chunk:
+                            chunk["ttfb_s"] = round(
+                                time.perf_counter() - submitted_at, 4
+                            )
+                        if "first_audio_s" not in turn:
+                            turn["first_audio_s"] = time.perf_counter() - started_at
+                            logger.info(
+                                f"TTS turn {turn['turn']}: first audio after "
+                                f"{turn['first_audio_s'] * 1000:.0f}ms"
+                            )
+                        chunk["audio_s"] += ev.frame.duration
+                        yield ev.frame
+                chunk["audio_s"] = round(chunk["audio_s"], 4)
+                self._notify_chunk(chunk)
+
+            # surface errors from the LLM text stream
+            await producer
+        finally:
+            await utils.aio.cancel_and_wait(producer)
+            while not streams.empty():
+                item = streams.get_nowait()
+                if item is not None:
+                    await item[2].aclose()
+            turn["total_s"] = time.perf_counter() - started_at
+
+    def stats(self) -> dict[str, float]:
+        """Return aggregate first-audio latency over the recorded turns."""
+        latencies = sorted(
+            t["first_audio_s"] for t in self.turns if "first_audio_s" in t
+        )
+        if not latencies:
+            return {"turns": len(self.turns)}
+        return {
+            "turns": len(self.turns),
+            "first_audio_avg_s": round(sum(latencies) / len(latencies), 3),
+            "first_audio_p50_s": round(latencies[len(latencies) // 2], 3),
+            "first_audio_max_s": round(latencies[-1], 3),
+        }
@@ -0,0 +1,271 @@
+import asyncio
+import contextlib
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any, Callable, Optional
+
+import psutil
+from livekit.agents import JobRequest, Worker
+from livekit.agents.utils import MovingAverage
+from livekit.agents.utils.hw import get_cpu_monitor
+
+logger = logging.getLogger(__name__)
+
+
+LOAD_DIR_ENV = "AGENT_LOAD_DIR"
+
+
+def load_directory() -> str:
+    """
+    Directory where job processes publish their load snapshots.
+
+    The worker sets AGENT_LOAD_DIR before spawning job processes so every process
+    of a worker agrees on it; the fallback keys the directory by process id.
+    """
+    if path := os.getenv(LOAD_DIR_ENV):
+        return path
+    path = os.path.join(tempfile.gettempdir(), f"agent-load-{os.getpid()}")
+    os.environ[LOAD_DIR_ENV] = path
+    return path
+
+
+class LoadReporter:
+    """
+    Publishes the load of a job process for the worker's admission control.
+
+    Tracks in-flight LLM/TTS requests, pluggable gauges such as active Soniox
+    streams, and event-loop lag (how late a periodic wake-up fires). A snapshot
+    is written atomically to the load directory every interval.
+
+    There is one reporter per process (`load_reporter`) and its snapshot is keyed
+    by process id, which assumes the process executor's one job per process: a
+    job's gauges are never removed and `aclose()` stops reporting for the whole
+    process. Under the thread executor jobs would overwrite each other's gauges.
+    """
+
+    def __init__(self, *, interval: float = 0.5) -> None:
+        """
+        Initialize the reporter.
+
+        Args:
+            interval: Seconds between snapshots and loop-lag samples
+        """
+        self.interval = interval
+        self.pending: dict[str, int] = {}
+        self._gauges: dict[str, Callable[[], int]] = {}
+        self._loop_lag = MovingAverage(4)
+        self._task: Optional[asyncio.Task] = None
+        self._path: Optional[str] = None
+
+    def add_gauge(self, name: str, read: Callable[[], int]) -> None:
+        """Register a value sampled into every snapshot (e.g. active streams)."""
+        self._gauges[name] = read
+
+    @contextlib.contextmanager
+    def track(self, kind: str) -> Iterator[None]:
+        """Count a request of the given kind ("llm", "tts") as in flight."""
+        self.pending[kind] = self.pending.get(kind, 0) + 1
+        try:
+            yield
+        finally:
+            self.pending[kind] -= 1
+
+    def start(self) -> None:
+        """Start publishing; must be called from the job's event loop."""
+        if self._task is not None:
+            return
+        directory = load_directory()
+        os.makedirs(directory, exist_ok=True)
+        self._path = os.path.join(directory, f"{os.getpid()}.json")
+        self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        """Stop publishing and remove this process's snapshot."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._path is not None:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._path)
+
+    def snapshot(self) -> dict[str, Any]:
+        gauges = {}
+        for name, read in self._gauges.items():
+            try:
+                gauges[name] = int(read())
+            except Exception as e:
+                logger.error(f"Error reading load gauge {name}: {e}")
+        return {
+            "pending": dict(self.pending),
+            "gauges": gauges,
+            "loop_lag": round(self._loop_lag.get_avg(), 4),
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._loop_lag.add_sample(max(loop.time() - expected, 0.0))
+            self._write(self.snapshot())
+
+    def _write(self, snapshot: dict[str, Any]) -> None:
+        tmp = f"{self._path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp, self._path)
+        except OSError as e:
+            logger.warning(f"Failed to publish load snapshot: {e}")
+
+
+# the reporter of this process, started and closed by the job it runs
+load_reporter = LoadReporter()
+
+
+class AdmissionController:
+    """
+    Worker-side load calculation and job admission.
+
+    A background thread samples CPU and aggregates the snapshots published by job
+    processes. The load is the highest of CPU usage, active streams, pending
+    LLM/TTS requests and event-loop lag, each normalised by its capacity, so the
+    scarcest resource decides. `load` is meant for WorkerOptions.load_fnc and
+    `request_fnc` for WorkerOptions.request_fnc: jobs are accepted below
+    soft_threshold, deferred briefly between the thresholds and rejected above
+    hard_threshold so the dispatcher can route them to a less loaded worker.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_streams: int = 25,
+        max_pending: int = 40,
+        max_loop_lag: float = 0.25,
+        soft_threshold: float = 0.6,
+        hard_threshold: float = 0.8,
+        defer_timeout: float = 1.5,
+        snapshot_max_age: float = 3.0,
+        cpu_index: Optional[int] = None,
+    ) -> None:
+        """
+        Initialize the controller.
+
+        Args:
+            max_streams: Active STT streams the worker can sustain
+            max_pending: In-flight LLM/TTS requests the worker can sustain
+            max_loop_lag: Loop lag in seconds that counts as fully loaded
+            soft_threshold: Load above which new jobs are deferred
+            hard_threshold: Load above which new jobs are rejected
+            defer_timeout: Seconds a deferred job waits for load to drop
+            snapshot_max_age: Snapshots older than this are ignored
+            cpu_index: Core the worker is pinned to; CPU load is measured on that
+                core only instead of machine-wide
+        """
+        self.max_streams = max_streams
+        self.max_pending = max_pending
+        self.max_loop_lag = max_loop_lag
+        self.soft_threshold = soft_threshold
+        self.hard_threshold = hard_threshold
+        self.defer_timeout = defer_timeout
+        self.snapshot_max_age = snapshot_max_age
+        self.cpu_index = cpu_index
+
+        self.accepted = 0
+        self.deferred = 0
+        self.rejected = 0
+
+        self._components: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            load_directory()
+            self._thread = threading.Thread(
+                target=self._monitor, daemon=True, name="worker_admission_monitor"
+            )
+            self._thread.start()
+
+    def _monitor(self) -> None:
+        cpu_monitor = get_cpu_monitor()
+        cpu_avg = MovingAverage(5)
+        while True:
+            if self.cpu_index is not None:
+                usage = (
+                    psutil.cpu_percent(interval=0.5, percpu=True)[self.cpu_index]
+                    / 100.0
+                )
+            else:
+                usage = cpu_monitor.cpu_percent(interval=0.5)
+            cpu_avg.add_sample(usage)
+            self._update(cpu_avg.get_avg())
+
+    def _update(self, cpu: float) -> None:
+        streams, pending, lag = self._aggregate()
+        with self._lock:
+            self._components = {
+                "cpu": cpu,
+                "streams": streams / self.max_streams,
+                "pending": pending / self.max_pending,
+                "loop_lag": lag / self.max_loop_lag,
+            }
+
+    def _aggregate(self) -> "tuple[int, int, float]":
+        streams = pending = 0
+        lag = 0.0
+        now = time.time()
+        for path in glob.glob(os.path.join(load_directory(), "*.json")):
+            try:
+                if now - os.path.getmtime(path) > self.snapshot_max_age:
+                    continue
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            streams += sum(snapshot.get("gauges", {}).values())
+            pending += sum(snapshot.get("pending", {}).values())
+            lag = max(lag, snapshot.get("loop_lag", 0.0))
+        return streams, pending, lag
+
+    def components(self) -> dict[str, float]:
+        """Return the normalised load components."""
+        self._ensure_started()
+        with self._lock:
+            return dict(self._components)
+
+    def current_load(self) -> float:
+        return min(max(self.components().values(), default=0.0), 1.0)
+
+    def load(self, worker: Worker) -> float:
+        """WorkerOptions.load_fnc implementation."""
+        return self.current_load()
+
+    async def request_fnc(self, req: JobRequest) -> None:
+        """WorkerOptions.request_fnc implementation."""
+        load = self.current_load()
+        if self.soft_threshold <= load < self.hard_threshold:
+            self.deferred += 1
+            deadline = time.monotonic() + self.defer_timeout
+            while load >= self.soft_threshold and time.monotonic() < deadline:
+                await asyncio.sleep(0.25)
+                load = self.current_load()
+
+        if load >= self.soft_threshold:
+            self.rejected += 1
+            logger.warning(
+                f"rejecting job {req.id}, load {load:.2f} {self.components()}"
+            )
+            await req.reject()
+            return
+
+        self.accepted += 1
+        await req.accept()
@@ -0,0 +1,100 @@
+import json
+import os
+
+import pytest
+
+from agent_config import AgentConfig, ConfigWatcher, load_config
+
+DEFAULTS = AgentConfig(instructions="varsayılan talimatlar")
+
+
+def _write(path, data: str) -> None:
+    # write next to the target and rename, as a rollout would
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def test_defaults_match_the_pipeline_without_a_config():
+    config = ConfigWatcher(None, DEFAULTS).current()
+
+    assert config is DEFAULTS
+    assert config.language == "tr" and config.language_hints == ()
+    assert not config.diarize and not config.stt_failover
+
+
+def test_load_config_from_json_file(tmp_path):
+    path = tmp_path / "agent.json"
+    path.write_text(
+        json.dumps(
+            {
+                "instructions": "kısa cevap ver",
+                "language_hints": "tr, en",
+                "diarize": True,
+                "stability_window_ms": "400",
+                "unknown": 1,
+            }
+        )
+    )
+
+    config = load_config(str(path), DEFAULTS)
+
+    assert config.instructions == "kısa cevap ver"
+    assert config.language_hints == ("tr", "en")
+    assert config.diarize is True
+    assert config.stability_window_ms == 400
+    assert config.llm_model == DEFAULTS.llm_model
+    assert config.version != DEFAULTS.version
+    assert load_config(str(path), DEFAULTS).version == config.version
+
+
+def test_load_config_joins_prompt_files_in_name_order(tmp_path):
+    (tmp_path / "config.json").write_text(json.dumps({"llm_model": "gpt-4o"}))
+    (tmp_path / "20-tools.md").write_text("araçları kullan\n")
+    (tmp_path / "10-persona.txt").write_text("  satış danışmanısın  ")
+    (tmp_path / "notes.yaml").write_text("ignored: true")
+
+    config = load_config(str(tmp_path), DEFAULTS)
+
+    assert config.instructions == "satış danışmanısın\n\naraçları kullan"
+    assert config.llm_model == "gpt-4o"
+
+
+@pytest.mark.parametrize(
+    "settings",
+    ['{"diarize": "yes"}', '{"stability_window_ms": "soon"}', "[1, 2]", "{"],
+)
+def test_load_config_rejects_invalid_settings(tmp_path, settings):
+    path = tmp_path / "agent.json"
+    path.write_text(settings)
+
+    with pytest.raises(ValueError):
+        load_config(str(path), DEFAULTS)
+
+
+def test_watcher_swaps_in_changed_config_and_keeps_it_on_failure(tmp_path):
+    path = tmp_path / "agent.json"
+    _write(path, json.dumps({"llm_model": "gpt-4o"}))
+    watcher = ConfigWatcher(str(path), DEFAULTS)
+    first = watcher.current()
+    assert first.llm_model == "gpt-4o"
+    assert not watcher.check()
+
+    _write(path, json.dumps({"llm_model": "gpt-4.1-mini"}))
+    assert watcher.check()
+    second = watcher.current()
+    # a job that read the config earlier keeps its own version
+    assert first.llm_model == "gpt-4o"
+    assert second.llm_model == "gpt-4.1-mini"
+    assert second.version != first.version
+
+    _write(path, '{"llm_model": ')
+    assert not watcher.check()
+    assert watcher.current() is second
+
+    assert watcher.stats() == {
+        "version": second.version,
+        "reloads": 1,
+        "failures": 1,
+    }
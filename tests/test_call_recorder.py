@@ -0,0 +1,83 @@
+import json
+
+import numpy as np
+from livekit import rtc
+
+from call_recorder import (
+    KIND_EVENTS,
+    KIND_PCM,
+    CallRecorder,
+    RecordingWriter,
+    iter_events,
+    read_batch,
+    read_index,
+)
+
+TOKENS = [
+    {
+        "text": "merhaba",
+        "start_ms": 0,
+        "end_ms": 400,
+        "is_final": True,
+        "confidence": 0.9,
+    },
+    {"text": " nasılsınız", "start_ms": 450, "end_ms": 900, "is_final": False},
+]
+
+
+def _frame(value: int, samples: int = 160) -> rtc.AudioFrame:
+    data = np.full(samples, value, dtype=np.int16)
+    return rtc.AudioFrame(data.tobytes(), 16000, 1, samples)
+
+
+def test_recordings_round_trip_through_segments_and_index(tmp_path):
+    # tiny segments so the batches spread over several segment files
+    writer = RecordingWriter(str(tmp_path), segment_max_bytes=256)
+    first = CallRecorder(writer, "call-1", record_audio=True, flush_bytes=512)
+    second = CallRecorder(writer, "call-2")
+
+    for i in range(20):
+        first.record_tokens(TOKENS)
+        first.record_event("message", role="user", text=f"cümle {i}")
+        first.record_audio_frame(_frame(i))
+    second.record_event("message", role="assistant", text="iyi günler")
+    first.close()
+    second.close()
+    writer.close()
+
+    assert len(list(tmp_path.glob("segment-*.crb"))) > 1
+    assert writer.stats()["dropped_batches"] == 0
+
+    events = list(iter_events(str(tmp_path), "call-1"))
+    assert [e["type"] for e in events[:2]] == ["tokens", "message"]
+    assert [e["tokens"] for e in events if e["type"] == "tokens"] == [TOKENS] * 20
+    assert [e["text"] for e in events if e["type"] == "message"] == [
+        f"cümle {i}" for i in range(20)
+    ]
+    assert events[-1]["type"] == "call_ended"
+    assert [e["t"] for e in events] == sorted(e["t"] for e in events)
+    assert [e["text"] for e in iter_events(str(tmp_path), "call-2") if "text" in e] == [
+        "iyi günler"
+    ]
+
+    audio = [e for e in read_index(str(tmp_path), "call-1") if e["kind"] == KIND_PCM]
+    pcm = b"".join(read_batch(str(tmp_path), entry) for entry in audio)
+    assert pcm == b"".join(bytes(_frame(i).data.cast("B")) for i in range(20))
+    assert sum(entry["samples"] for entry in audio) == 20 * 160
+
+
+def test_event_size_estimate_counts_token_lists(tmp_path):
+    writer = RecordingWriter(str(tmp_path), max_pending_bytes=10_000_000)
+    recorder = CallRecorder(writer, "call", flush_bytes=10_000_000)
+
+    for _ in range(50):
+        recorder.record_tokens(TOKENS)
+
+    encoded = sum(
+        len(json.dumps(event, ensure_ascii=False)) for event in recorder._events
+    )
+    assert 0.5 * encoded <= recorder._events_bytes <= 2 * encoded
+    recorder.close()
+    writer.close()
+    (entry,) = read_index(str(tmp_path), "call")
+    assert entry["kind"] == KIND_EVENTS and entry["count"] == 51
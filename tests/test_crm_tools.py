@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from crm_tools import (
+    CRMTools,
+    HttpCRMBackend,
+    LocalCRMBackend,
+    ToolError,
+    ToolRunner,
+    ToolTimeoutError,
+)
+
+LEAD = {"id": "lead-1", "name": "Test Bey", "phone": "0 532 568 47 13"}
+
+
+class CountingBackend(LocalCRMBackend):
+    """Local backend that counts the requests it receives."""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.requests = []
+
+    async def get_lead(self, lead_id):
+        self.requests.append(("get_lead", lead_id))
+        return await super().get_lead(lead_id)
+
+    async def find_slots(self, date_range):
+        self.requests.append(("find_slots", date_range))
+        return await super().find_slots(date_range)
+
+
+def _tools(latency: float = 0.0, lead_id="lead-1", **runner_kwargs) -> CRMTools:
+    backend = CountingBackend(leads={"lead-1": LEAD}, latency=latency)
+    runner = ToolRunner(**runner_kwargs) if runner_kwargs else None
+    return CRMTools(backend, lead_id=lead_id, runner=runner)
+
+
+async def test_prefetch_is_shared_with_tool_calls():
+    tools = _tools(latency=0.05)
+
+    prefetch = asyncio.create_task(tools.prefetch())
+    await asyncio.sleep(0)
+    lead, slots = await asyncio.gather(tools.get_lead(), tools.find_slots("Bu Hafta"))
+    await prefetch
+
+    assert lead == LEAD
+    assert slots == tools.backend.slots
+    # the in-flight prefetch answered both tool calls
+    assert tools.backend.requests == [
+        ("get_lead", "lead-1"),
+        ("find_slots", "bu hafta"),
+    ]
+    assert tools.runner.stats()["get_lead"]["cache_hits"] == 1
+
+
+async def test_get_lead_without_lead_id():
+    tools = _tools(lead_id=None)
+
+    assert await tools.get_lead() == {}
+    assert tools.backend.requests == []
+
+
+async def test_slow_backend_times_out():
+    tools = _tools(latency=0.2, timeouts={"find_slots": 0.05})
+
+    with pytest.raises(ToolTimeoutError):
+        await tools.find_slots("yarın")
+    assert tools.runner.stats()["find_slots"]["timeouts"] == 1
+
+
+async def test_failed_lookup_is_not_served_from_cache():
+    tools = _tools(latency=0.2, timeouts={"get_lead": 0.05})
+    with pytest.raises(ToolTimeoutError):
+        await tools.get_lead()
+
+    tools.runner.timeouts["get_lead"] = 1.0
+    assert await tools.get_lead() == LEAD
+    assert len(tools.backend.requests) == 2
+
+
+async def test_booking_forwards_details_and_invalidates_slots():
+    tools = _tools()
+    slots = await tools.find_slots("yarın")
+    details = {"full_name": "Test Bey", "address": "Kadıköy, İstanbul"}
+
+    booking = await tools.book_appointment(slots[0], details)
+
+    assert booking == {"lead_id": "lead-1", "appointment_time": slots[0], **details}
+    assert tools.backend.bookings == [booking]
+    assert slots[0] not in await tools.find_slots("yarın")
+    assert tools.backend.requests.count(("find_slots", "yarın")) == 2
+
+
+async def test_booking_without_lead_is_refused():
+    tools = _tools(lead_id=None)
+
+    with pytest.raises(ToolError):
+        await tools.book_appointment("yarın sabah on", {"full_name": "Test Bey"})
+    assert tools.backend.bookings == []
+
+
+@pytest.fixture
+async def crm_server():
+    """Local CRM API whose lead endpoint fails with a server error."""
+
+    async def lead(request: web.Request) -> web.Response:
+        if request.match_info["lead_id"] == "broken":
+            return web.Response(status=500, text="internal error")
+        if request.match_info["lead_id"] == "html":
+            return web.Response(text="<html></html>", content_type="text/html")
+        return web.json_response(LEAD)
+
+    app = web.Application()
+    app.router.add_get("/api/leads/{lead_id}", lead)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    yield f"http://127.0.0.1:{runner.addresses[0][1]}/api"
+    await runner.cleanup()
+
+
+async def test_http_backend_returns_json(crm_server):
+    backend = HttpCRMBackend(crm_server)
+    try:
+        assert await backend.get_lead("lead-1") == LEAD
+    finally:
+        await backend.aclose()
+
+
+@pytest.mark.parametrize("lead_id", ["broken", "html"])
+async def test_http_backend_maps_bad_responses_to_tool_error(crm_server, lead_id):
+    backend = HttpCRMBackend(crm_server)
+    try:
+        with pytest.raises(ToolError):
+            await backend.get_lead(lead_id)
+    finally:
+        await backend.aclose()
+
+
+async def test_http_backend_maps_connection_errors_to_tool_error(unused_tcp_port):
+    backend = HttpCRMBackend(f"http://127.0.0.1:{unused_tcp_port}/api")
+    tools = CRMTools(backend, lead_id="lead-1")
+    try:
+        with pytest.raises(ToolError):
+            await tools.get_lead()
+        assert tools.runner.stats()["get_lead"]["errors"] == 1
+    finally:
+        await backend.aclose()
@@ -0,0 +1,168 @@
+import numpy as np
+import pytest
+from livekit import rtc
+from livekit.agents import vad
+
+from interruptions import GatedVAD, InterruptionClassifier, SpeechResumer
+
+SAMPLE_RATE = 16000
+REPLY = "Merhaba ben Ayşe size yeni kampanyamızdan bahsetmek istiyorum"
+
+
+def _frame(value: int, seconds: float = 0.1) -> rtc.AudioFrame:
+    samples = int(SAMPLE_RATE * seconds)
+    data = np.full(samples, value, dtype=np.int16)
+    return rtc.AudioFrame(data.tobytes(), SAMPLE_RATE, 1, samples)
+
+
+def _event(kind: vad.VADEventType, speech_duration: float = 0.0, level: int = 0):
+    return vad.VADEvent(
+        type=kind,
+        samples_index=0,
+        timestamp=0.0,
+        speech_duration=speech_duration,
+        silence_duration=0.0,
+        frames=[_frame(level)] if level else [],
+    )
+
+
+class _ScriptedStream(vad.VADStream):
+    async def _main_task(self) -> None:
+        for ev in self._vad.events:
+            self._event_ch.send_nowait(ev)
+
+
+class ScriptedVAD(vad.VAD):
+    """Emits a fixed list of events, whatever audio it is given."""
+
+    def __init__(self, events: list[vad.VADEvent]) -> None:
+        super().__init__(capabilities=vad.VADCapabilities(update_interval=0.1))
+        self.events = events
+
+    def stream(self) -> vad.VADStream:
+        return _ScriptedStream(self)
+
+
+# a noise burst, then a caller who keeps talking
+EVENTS = [
+    _event(vad.VADEventType.START_OF_SPEECH),
+    _event(vad.VADEventType.INFERENCE_DONE, 0.3, level=50),
+    _event(vad.VADEventType.INFERENCE_DONE, 0.6, level=8000),
+    _event(vad.VADEventType.END_OF_SPEECH),
+    _event(vad.VADEventType.START_OF_SPEECH),
+    _event(vad.VADEventType.INFERENCE_DONE, 1.5, level=8000),
+]
+
+
+async def _gated_durations(agent_speaking: bool) -> tuple[list[float], GatedVAD]:
+    gated = GatedVAD(
+        ScriptedVAD(EVENTS),
+        InterruptionClassifier(),
+        agent_speaking=lambda: agent_speaking,
+    )
+    stream = gated.stream()
+    stream.end_input()
+    durations = [
+        ev.speech_duration
+        async for ev in stream
+        if ev.type == vad.VADEventType.INFERENCE_DONE
+    ]
+    await stream.aclose()
+    return durations, gated
+
+
+async def test_gated_vad_suppresses_noise_while_agent_speaks():
+    durations, gated = await _gated_durations(agent_speaking=True)
+
+    # quiet frames and short loud speech without STT evidence are noise
+    assert durations == [0.0, 0.0, 1.5]
+    assert gated.suppressed_segments == 1
+
+
+async def test_gated_vad_forwards_everything_while_agent_listens():
+    durations, gated = await _gated_durations(agent_speaking=False)
+
+    assert durations == [0.3, 0.6, 1.5]
+    assert gated.suppressed_segments == 0
+
+
+class FakeSession:
+    def __init__(self) -> None:
+        self.said: list[tuple[str, list[rtc.AudioFrame], bool]] = []
+
+    def say(self, text, *, audio, add_to_chat_ctx):
+        self.said.append((text, audio, add_to_chat_ctx))
+
+
+async def _capture(resumer: SpeechResumer, frames: int = 10, complete: bool = True):
+    async def text():
+        for word in REPLY.split(" "):
+            yield word + " "
+
+    async def audio():
+        for i in range(frames):
+            yield _frame(i + 1)
+
+    async for _ in resumer.capture_text(text()):
+        pass
+    captured = resumer.capture_audio(audio())
+    async for _ in captured:
+        if not complete:
+            # the interruption cancels the TTS before synthesis ends
+            await captured.aclose()
+            break
+
+
+async def _resumed(session: FakeSession) -> tuple[str, list[int]]:
+    text, audio, add_to_chat_ctx = session.said[0]
+    assert add_to_chat_ctx
+    levels = [
+        int(np.frombuffer(frame.data, dtype=np.int16)[0]) async for frame in audio
+    ]
+    return text, levels
+
+
+@pytest.mark.parametrize(
+    ("played_text", "remaining"),
+    [
+        ("Merhaba ben Ayşe", "size yeni kampanyamızdan bahsetmek istiyorum"),
+        # stopped inside a word, which is said again
+        ("Merhaba ben Ayşe size yeni kampan", "kampanyamızdan bahsetmek istiyorum"),
+        ("", REPLY),
+        # a transcript that was not synchronized holds the whole reply, the cut is
+        # estimated from the playback position
+        (REPLY, "yeni kampanyamızdan bahsetmek istiyorum"),
+    ],
+)
+async def test_resume_replays_the_rest_of_the_reply(played_text, remaining):
+    resumer = SpeechResumer()
+    await _capture(resumer)
+    resumer.on_playback_finished(0.55, interrupted=True)
+    session = FakeSession()
+
+    assert resumer.resume(session, played_text)
+
+    text, levels = await _resumed(session)
+    assert text == remaining
+    # the frame playing at the interruption and everything after it
+    assert levels == [6, 7, 8, 9, 10]
+    assert resumer.stats()["resumed_chars"] == len(remaining)
+    # a second false interruption of the same position is not resumed twice
+    assert not resumer.resume(FakeSession(), played_text)
+
+
+@pytest.mark.parametrize(
+    ("played_text", "complete"),
+    [("Merhaba ben Ayşe", False), ("Merhaba sen Ayşe", True)],
+)
+async def test_resume_regenerates_without_matching_complete_audio(
+    played_text, complete
+):
+    resumer = SpeechResumer()
+    await _capture(resumer, complete=complete)
+    resumer.on_playback_finished(0.05, interrupted=True)
+    session = FakeSession()
+
+    assert not resumer.resume(session, played_text)
+    assert session.said == []
+    assert resumer.stats()["false_interruptions"] == 1
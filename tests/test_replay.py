@@ -0,0 +1,89 @@
+import asyncio
+
+from livekit.agents import llm
+
+from agent import speculating
+from context_window import SUMMARY_REQUEST_ID
+from replay import RecordedCall, ReplayClock, ReplayLLM, ReplaySTT, ReplayTrace
+
+RESPONSES = [
+    {"kind": "speculative", "user_text": "yarın sabah", "text": "sabah mı"},
+    {
+        "kind": "turn",
+        "user_text": "yarın sabah uygun",
+        "text": "harika",
+        "speculative": True,
+    },
+    {"kind": "summary", "text": "müşteri yarın sabah uygun"},
+    {"kind": "turn", "user_text": "evet", "text": "adresinizi alayım"},
+    {"kind": "turn", "user_text": "evet", "text": "teşekkürler"},
+]
+
+
+def _ctx(user_text: str) -> llm.ChatContext:
+    ctx = llm.ChatContext.empty()
+    ctx.add_message(role="system", content="instructions")
+    ctx.add_message(role="user", content=user_text)
+    return ctx
+
+
+def _replay_llm() -> ReplayLLM:
+    clock = ReplayClock(speed=100)
+    return ReplayLLM([dict(r) for r in RESPONSES], clock, ReplayTrace(clock))
+
+
+def _speculative(replay_llm: ReplayLLM, user_text: str):
+    token = speculating.set(True)
+    try:
+        return replay_llm._pick(_ctx(user_text))
+    finally:
+        speculating.reset(token)
+
+
+def test_requests_are_matched_by_kind_and_text():
+    replay_llm = _replay_llm()
+
+    assert _speculative(replay_llm, "Yarın sabah")["text"] == "sabah mı"
+    # a summary request does not take the next turn reply
+    summary_ctx = llm.ChatContext.empty()
+    summary_ctx.add_message(role="system", content="summarize", id=SUMMARY_REQUEST_ID)
+    summary_ctx.add_message(role="user", content="evet")
+    assert replay_llm._pick(summary_ctx)["text"] == "müşteri yarın sabah uygun"
+    # the turn answered by a speculation is skipped by the next matching turn
+    assert replay_llm._pick(_ctx("evet"))["text"] == "adresinizi alayım"
+    assert replay_llm._pick(_ctx("evet"))["text"] == "teşekkürler"
+    assert replay_llm._pick(_ctx("evet")) is None
+
+
+def test_speculation_borrows_the_turn_reply_for_its_text():
+    replay_llm = _replay_llm()
+
+    assert _speculative(replay_llm, "yarın sabah uygun")["text"] == "harika"
+    # not consumed, the turn itself may still ask for it
+    assert replay_llm._pick(_ctx("yarın sabah uygun"))["text"] == "harika"
+    assert _speculative(replay_llm, "bilmiyorum") is None
+
+
+async def test_recognize_stream_catches_up_on_earlier_messages():
+    clock = ReplayClock(speed=100)
+    trace = ReplayTrace(clock)
+    call = RecordedCall(
+        call_id="call",
+        token_messages=[
+            (0.0, [{"text": "merhaba", "is_final": True}]),
+            (0.1, [{"text": " evet", "is_final": True}]),
+            (3.0, [{"text": " tamam", "is_final": False}]),
+        ],
+    )
+    stt = ReplaySTT(call, clock, trace)
+    clock.start()
+    await asyncio.sleep(0.02)  # two call seconds in, after the first two messages
+
+    stream = stt.stream()
+    try:
+        await asyncio.sleep(0.005)
+        assert [e["final"] for e in trace.events if e["stage"] == "stt"] == [1, 1]
+        await asyncio.sleep(0.02)
+        assert [e["pending"] for e in trace.events if e["stage"] == "stt"] == [0, 0, 1]
+    finally:
+        await stream.aclose()
@@ -0,0 +1,79 @@
+import pytest
+
+from soniox_plugin import END_TOKEN, SonioxRecognizeStream, SonioxSTT
+
+
+class _OfflineStream(SonioxRecognizeStream):
+    """Stream fed through _handle_message instead of a Soniox session."""
+
+    async def _connect(self) -> None:
+        pass
+
+    async def _listen(self) -> None:
+        pass
+
+
+class _OfflineSTT(SonioxSTT):
+    def _create_stream(self, **kwargs) -> SonioxRecognizeStream:
+        return _OfflineStream(**kwargs)
+
+
+def _token(text: str, end_ms: int, *, is_final: bool = True) -> dict:
+    return {
+        "text": text,
+        "start_ms": end_ms - 200,
+        "end_ms": end_ms,
+        "is_final": is_final,
+    }
+
+
+@pytest.fixture
+async def stt():
+    stt = _OfflineSTT(api_key="test", stability_window_ms=300)
+    yield stt
+    await stt.aclose()
+
+
+async def test_stable_prefix_spans_the_segments_of_a_turn(stt):
+    prefixes = []
+    stt.on_stable_prefix(lambda prefix: prefixes.append(prefix.text))
+    stream = stt.stream()
+    try:
+        await stream._handle_message(
+            {
+                "tokens": [
+                    _token("yarın", 200),
+                    _token("sabah", 400),
+                    _token(END_TOKEN, 400),
+                ]
+            }
+        )
+        # the next segment of the same turn, its first word already stable
+        await stream._handle_message(
+            {
+                "tokens": [
+                    _token("uygun", 700, is_final=False),
+                    _token("olur", 1100, is_final=False),
+                ]
+            }
+        )
+        await stream._handle_message(
+            {
+                "tokens": [
+                    _token("uygun", 700),
+                    _token("olur", 1100),
+                    _token(END_TOKEN, 1100),
+                ]
+            }
+        )
+        assert prefixes == [
+            "yarın sabah",
+            "yarın sabah uygun",
+            "yarın sabah uygun olur",
+        ]
+
+        stt.commit_turn()
+        await stream._handle_message({"tokens": [_token("evet", 1500)]})
+        assert prefixes[-1] == "evet"
+    finally:
+        await stream.aclose()
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from livekit.agents import Agent, llm
+
+from agent import SpeculativeReplyController
+from soniox_plugin import StablePrefix
+
+
+@pytest.fixture
+def requests(monkeypatch):
+    """Prefixes the speculative LLM requests were made for."""
+    requests = []
+
+    async def _reply():
+        yield llm.ChatChunk(
+            id="reply", delta=llm.ChoiceDelta(role="assistant", content="tamam")
+        )
+
+    def _llm_node(agent, chat_ctx, tools, model_settings):
+        requests.append(chat_ctx.items[-1].text_content)
+        return _reply()
+
+    monkeypatch.setattr(Agent.default, "llm_node", _llm_node)
+    return requests
+
+
+def _prefix(text: str, *, is_final: bool = False) -> StablePrefix:
+    return StablePrefix(text=text, is_final=is_final, end_ms=0, revision=0)
+
+
+async def test_restarts_only_on_material_changes(requests):
+    controller = SpeculativeReplyController(min_chars=5, min_extension_words=3)
+    controller.attach(Agent(instructions="test"))
+
+    controller.on_stable_prefix(_prefix("yarın sabah"))
+    # short extensions keep the running speculation
+    controller.on_stable_prefix(_prefix("yarın sabah on"))
+    controller.on_stable_prefix(_prefix("yarın sabah on gibi"))
+    # three new words, then a revision, then the finalized prefix
+    controller.on_stable_prefix(_prefix("yarın sabah on gibi uygun olur mu"))
+    controller.on_stable_prefix(_prefix("yarın akşam on gibi uygun olur mu"))
+    controller.on_stable_prefix(
+        _prefix("yarın akşam on gibi uygun olur mu acaba", is_final=True)
+    )
+    await asyncio.sleep(0)
+
+    assert requests == [
+        "yarın sabah",
+        "yarın sabah on gibi uygun olur mu",
+        "yarın akşam on gibi uygun olur mu",
+        "yarın akşam on gibi uygun olur mu acaba",
+    ]
+    stats = controller.stats()
+    assert stats["started"] == 4 and stats["restarts"] == 3
+    assert stats["skipped_extensions"] == 2 and stats["wasted"] == 0
+
+    controller.close()
+    assert controller.stats()["wasted"] == 1
+
+
+async def test_turn_commit_is_forwarded():
+    controller = SpeculativeReplyController()
+    commits = []
+    controller.on_turn_committed(lambda: commits.append(True))
+
+    controller.turn_committed()
+
+    assert commits == [True]
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import math
+from array import array
+
+import aiohttp
+import pytest
+import websockets
+from aiohttp import web
+from livekit import rtc
+from livekit.agents.stt import SpeechEventType
+from livekit.plugins import deepgram
+
+from soniox_plugin import SonioxSTT
+from stt_failover import FailoverSTT
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 160
+# both mock providers answer every half second of audio
+ANSWER_BYTES = SAMPLE_RATE
+
+
+def _tone_frame() -> rtc.AudioFrame:
+    samples = array("h", (int(8000 * math.sin(i / 3)) for i in range(FRAME_SAMPLES)))
+    return rtc.AudioFrame(samples.tobytes(), SAMPLE_RATE, 1, FRAME_SAMPLES)
+
+
+class MockSoniox:
+    """
+    Local Soniox websocket server.
+
+    Modes: "ok" answers with a final token, "quiet" answers with no tokens (as
+    when the speaker lock drops them), "stall" sends nothing and "error" sends
+    a Soniox error and closes. `modes` sets the mode of each new connection.
+    """
+
+    def __init__(self, *modes: str) -> None:
+        self.modes = list(modes)
+        self.connections = 0
+        self.open = 0
+        self.audio_bytes = 0
+
+    async def handler(self, ws) -> None:
+        mode = self.modes[min(self.connections, len(self.modes) - 1)]
+        self.connections += 1
+        self.open += 1
+        try:
+            await ws.recv()
+            await ws.send(json.dumps({"tokens": []}))
+            received = 0
+            async for message in ws:
+                if not isinstance(message, bytes) or not message:
+                    continue
+                received += len(message)
+                self.audio_bytes += len(message)
+                if received % ANSWER_BYTES:
+                    continue
+                if mode == "ok":
+                    token = {
+                        "text": f"s{received}",
+                        "is_final": True,
+                        "start_ms": 0,
+                        "end_ms": 100,
+                    }
+                    await ws.send(json.dumps({"tokens": [token]}))
+                elif mode == "quiet":
+                    await ws.send(json.dumps({"tokens": []}))
+                elif mode == "error":
+                    await ws.send(
+                        json.dumps({"error_code": 503, "error_message": "unavailable"})
+                    )
+                    await ws.close()
+                    return
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.open -= 1
+
+
+class MockDeepgram:
+    """Local Deepgram live endpoint answering with a final result."""
+
+    def __init__(self) -> None:
+        self.connections = 0
+        self.open = 0
+        self.audio_bytes = 0
+
+    async def handler(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        self.open += 1
+        received = 0
+        try:
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.BINARY:
+                    continue
+                received += len(message.data)
+                self.audio_bytes += len(message.data)
+                if received % ANSWER_BYTES:
+                    continue
+                alternative = {
+                    "transcript": f"d{received}",
+                    "confidence": 0.9,
+                    "words": [{"word": "d", "start": 0, "end": 0.5, "confidence": 0.9}],
+                }
+                await ws.send_str(
+                    json.dumps(
+                        {
+                            "type": "Results",
+                            "channel_index": [0, 1],
+                            "start": 0,
+                            "duration": 0.5,
+                            "is_final": True,
+                            "speech_final": True,
+                            "channel": {"alternatives": [alternative]},
+                            "metadata": {"request_id": "mock"},
+                        }
+                    )
+                )
+        finally:
+            self.open -= 1
+        return ws
+
+
+@pytest.fixture
+async def providers(monkeypatch):
+    """Start the mock servers and return a factory for a failover STT using them."""
+    monkeypatch.setenv("SONIOX_API_KEY", "test-key-0123456789")
+    soniox = MockSoniox("ok")
+    dg = MockDeepgram()
+
+    soniox_server = await websockets.serve(soniox.handler, "127.0.0.1", 0)
+    soniox_port = soniox_server.sockets[0].getsockname()[1]
+    monkeypatch.setattr(SonioxSTT, "WEBSOCKET_URL", f"ws://127.0.0.1:{soniox_port}")
+
+    app = web.Application()
+    app.router.add_get("/v1/listen", dg.handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    dg_port = runner.addresses[0][1]
+    http_session = aiohttp.ClientSession()
+
+    def create(**kwargs) -> FailoverSTT:
+        kwargs.setdefault("stall_timeout", 1.0)
+        kwargs.setdefault("min_switch_interval", 0.5)
+        return FailoverSTT(
+            [
+                SonioxSTT(),
+                deepgram.STT(
+                    api_key="test",
+                    http_session=http_session,
+                    base_url=f"http://127.0.0.1:{dg_port}/v1/listen",
+                    language="multi",
+                ),
+            ],
+            cost_per_minute=[0.002, 0.0077],
+            **kwargs,
+        )
+
+    yield soniox, dg, create
+
+    await http_session.close()
+    await runner.cleanup()
+    soniox_server.close()
+    await soniox_server.wait_closed()
+
+
+async def _stream_audio(failover: FailoverSTT, seconds: float) -> list[str]:
+    """Stream a tone for the given time and return the final transcripts."""
+    stream = failover.stream()
+    finals = []
+
+    async def read() -> None:
+        async for ev in stream:
+            if ev.type == SpeechEventType.FINAL_TRANSCRIPT:
+                finals.append(ev.alternatives[0].text)
+
+    reader = asyncio.create_task(read())
+    frame = _tone_frame()
+    for _ in range(int(seconds * 100)):
+        stream.push_frame(frame)
+        await asyncio.sleep(0.01)
+    stream.end_input()
+    await asyncio.wait_for(reader, 10)
+    await stream.aclose()
+    return finals
+
+
+def _provider(text: str) -> str:
+    return "soniox" if text.startswith("s") else "deepgram"
+
+
+async def test_healthy_provider_is_kept(providers):
+    _, dg, create = providers
+    failover = create()
+
+    finals = await _stream_audio(failover, 3)
+
+    assert finals and all(_provider(t) == "soniox" for t in finals)
+    assert failover.switches == 0
+    assert dg.connections == 0
+
+
+async def test_fails_over_on_provider_error(providers):
+    soniox, dg, create = providers
+    soniox.modes = ["error"]
+    failover = create()
+
+    finals = await _stream_audio(failover, 3)
+
+    assert failover.switches == 1
+    assert finals and _provider(finals[-1]) == "deepgram"
+    assert failover.stats()["providers"]["Soniox (stt-rt-preview)"]["errors"] == 1
+    # the unfinished utterance was replayed, so Deepgram heard the audio Soniox lost
+    assert dg.audio_bytes > 3 * SAMPLE_RATE * 2 - soniox.audio_bytes
+
+
+async def test_fails_over_when_provider_stalls(providers):
+    soniox, _, create = providers
+    soniox.modes = ["stall"]
+    failover = create()
+
+    finals = await _stream_audio(failover, 3)
+
+    assert failover.switches == 1
+    assert finals and all(_provider(t) == "deepgram" for t in finals)
+
+
+async def test_quiet_provider_is_not_a_stall(providers):
+    soniox, dg, create = providers
+    soniox.modes = ["quiet"]
+    failover = create()
+
+    await _stream_audio(failover, 3)
+
+    assert failover.switches == 0
+    assert dg.connections == 0
+
+
+async def test_fails_back_after_recovery(providers):
+    soniox, _, create = providers
+    soniox.modes = ["error", "ok"]
+    failover = create(recovery_interval=1.0)
+
+    finals = await _stream_audio(failover, 5)
+
+    assert failover.stats()["failbacks"] == 1
+    assert "deepgram" in {_provider(t) for t in finals}
+    assert _provider(finals[-1]) == "soniox"
+
+
+async def test_aclose_closes_provider_connections(providers):
+    soniox, dg, create = providers
+    failover = create(hedge_seconds=5.0)
+    stream = failover.stream()
+    frame = _tone_frame()
+    for _ in range(100):
+        stream.push_frame(frame)
+        await asyncio.sleep(0.01)
+    assert soniox.open == 1 and dg.open == 1
+
+    await stream.aclose()
+    await asyncio.sleep(0.1)
+
+    assert soniox.open == 0 and dg.open == 0
@@ -0,0 +1,207 @@
+import pytest
+from livekit.agents import tts, utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions
+
+from tts_chunker import ChunkedTTSPipeline, SpokenChunker, normalize_spoken_turkish
+
+SAMPLE_RATE = 24000
+# samples of audio synthesized per character of text
+SAMPLES_PER_CHAR = 240
+
+
+@pytest.mark.parametrize(
+    ("text", "spoken"),
+    [
+        ("05321234567", "sıfır beş yüz otuz iki yüz yirmi üç kırk beş altmış yedi"),
+        (
+            "0 532 568 47 13",
+            "sıfır beş yüz otuz iki beş yüz altmış sekiz kırk yedi on üç",
+        ),
+        (
+            "0532 568 4713",
+            "sıfır beş yüz otuz iki beş yüz altmış sekiz kırk yedi on üç",
+        ),
+        (
+            "+90 532 568 47 13",
+            "artı doksan beş yüz otuz iki beş yüz altmış sekiz kırk yedi on üç",
+        ),
+        ("(0212) 555 12 34", "sıfır iki yüz on iki beş yüz elli beş on iki otuz dört"),
+        ("%20 indirim", "yüzde yirmi indirim"),
+        ("20% indirim", "yüzde yirmi indirim"),
+        ("faiz 20 % oldu", "faiz yüzde yirmi oldu"),
+        ("saat 12:00", "saat öğlen on iki"),
+        ("12:30 uygun", "öğlen on iki buçuk uygun"),
+        ("13:15", "öğleden sonra bir on beş"),
+        ("18:00", "akşam altı"),
+        ("09:30", "sabah dokuz buçuk"),
+        ("7/24 izleme", "yedi yirmi dört izleme"),
+        ("1.200 müşteri", "bin iki yüz müşteri"),
+        ("2,5 yıl", "iki virgül beş yıl"),
+        ("200.000 müşteri", "iki yüz bin müşteri"),
+    ],
+)
+def test_normalize_spoken_turkish(text, spoken):
+    assert normalize_spoken_turkish(text) == spoken
+
+
+def test_chunker_splits_on_clauses_without_punctuation():
+    chunker = SpokenChunker(
+        first_min_chars=10, first_max_chars=40, min_chars=20, max_chars=60
+    )
+    text = "size kısaca bilgi vermek isterim ve ardından uygun bir çözüm olup olmadığına bakalım "
+
+    chunks = []
+    for word in text.split(" "):
+        chunks.extend(chunker.push(word + " "))
+    chunks.extend(chunker.flush())
+
+    assert chunks[0] == "size kısaca bilgi vermek isterim"
+    assert " ".join(chunks) == text.strip()
+
+
+@pytest.mark.parametrize("first_max_chars", [45, 50, 52])
+def test_chunker_keeps_spaced_numbers_in_one_chunk(first_max_chars):
+    chunker = SpokenChunker(
+        first_min_chars=20, first_max_chars=first_max_chars, min_chars=40
+    )
+    text = (
+        "Kaydınızda telefon numaranız şu anda 0532 123 45 67 olarak görünüyor doğru mu "
+    )
+
+    chunks = []
+    for word in text.split(" "):
+        chunks.extend(chunker.push(word + " "))
+    chunks.extend(chunker.flush())
+
+    assert chunks[0] == "Kaydınızda telefon numaranız şu anda"
+    assert chunks[1].startswith("0532 123 45 67 ")
+    assert "beş yüz otuz iki yüz yirmi üç kırk beş altmış yedi" in (
+        normalize_spoken_turkish(chunks[1])
+    )
+
+
+class _FakeChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        output_emitter.initialize(
+            request_id="fake",
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+            mime_type="audio/pcm",
+        )
+        output_emitter.push(b"\x00\x00" * SAMPLES_PER_CHAR * len(self.input_text))
+        output_emitter.flush()
+
+
+class _FakeSynthesizeStream(tts.SynthesizeStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        output_emitter.initialize(
+            request_id="fake",
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+            mime_type="audio/pcm",
+            stream=True,
+        )
+        output_emitter.start_segment(segment_id="turn")
+        pending = ""
+        async for data in self._input_ch:
+            if isinstance(data, self._FlushSentinel):
+                self._tts.flushed.append(pending.strip())
+                output_emitter.push(
+                    b"\x00\x00" * SAMPLES_PER_CHAR * len(pending.strip())
+                )
+                pending = ""
+                continue
+            pending += data
+        output_emitter.end_input()
+
+
+class FakeTTS(tts.TTS):
+    """Produces silence for each request, recording what it was asked to say."""
+
+    def __init__(self, *, streaming: bool) -> None:
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=streaming),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+        )
+        self.requests: list[str] = []
+        self.streams = 0
+        self.flushed: list[str] = []
+
+    def synthesize(
+        self,
+        text: str,
+        *,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> tts.ChunkedStream:
+        self.requests.append(text)
+        return _FakeChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def stream(
+        self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> tts.SynthesizeStream:
+        self.streams += 1
+        return _FakeSynthesizeStream(tts=self, conn_options=conn_options)
+
+
+REPLY = (
+    "Harika o zaman size yarın saat 12:00 için bir danışmanlık randevusu ayarlayalım "
+    "ve numaranızı 05321234567 olarak not aldım ayrıca ilk ay 20% indirim var "
+)
+
+
+async def _synthesize(pipeline: ChunkedTTSPipeline, engine: FakeTTS) -> float:
+    async def text():
+        for word in REPLY.split(" "):
+            yield word + " "
+
+    audio_s = 0.0
+    async for frame in pipeline.run(engine, text()):
+        audio_s += frame.duration
+    return audio_s
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+async def test_pipeline_synthesizes_normalized_chunks(streaming):
+    engine = FakeTTS(streaming=streaming)
+    pipeline = ChunkedTTSPipeline(first_min_chars=20, first_max_chars=60, min_chars=40)
+    reported = []
+    pipeline.on_chunk(reported.append)
+
+    audio_s = await _synthesize(pipeline, engine)
+
+    spoken = [chunk["text"] for chunk in reported]
+    assert len(spoken) > 1
+    assert " ".join(spoken) == normalize_spoken_turkish(REPLY.strip())
+    if streaming:
+        # a stream per chunk, ended at the chunk boundary
+        assert engine.streams == len(spoken) and engine.requests == []
+        assert engine.flushed == spoken
+    else:
+        assert engine.streams == 0 and engine.requests == spoken
+
+    expected_s = SAMPLES_PER_CHAR * sum(len(text) for text in spoken) / SAMPLE_RATE
+    assert audio_s == pytest.approx(expected_s, abs=0.05)
+    assert sum(chunk["audio_s"] for chunk in reported) == pytest.approx(
+        audio_s, abs=0.05
+    )
+    assert all(chunk["ttfb_s"] >= 0 for chunk in reported)
+
+    stats = pipeline.stats()
+    assert stats["turns"] == 1 and "first_audio_p50_s" in stats
+
+
+async def test_streamed_turn_is_closed_when_playback_stops():
+    engine = FakeTTS(streaming=True)
+    pipeline = ChunkedTTSPipeline(first_min_chars=20, first_max_chars=60, min_chars=40)
+
+    async def text():
+        for word in REPLY.split(" "):
+            yield word + " "
+
+    frames = pipeline.run(engine, text())
+    await frames.__anext__()
+    await frames.aclose()
+    await utils.aio.sleep(0)
+
+    assert "total_s" in pipeline.turns[0]
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from worker_load import LOAD_DIR_ENV, AdmissionController
+
+
+class FakeJobRequest:
+    def __init__(self) -> None:
+        self.id = "job-1"
+        self.decision = None
+
+    async def accept(self) -> None:
+        self.decision = "accepted"
+
+    async def reject(self) -> None:
+        self.decision = "rejected"
+
+
+@pytest.fixture
+def load_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv(LOAD_DIR_ENV, str(tmp_path))
+    return tmp_path
+
+
+def _publish(load_dir, pid: int, streams: int, pending: int = 0, lag: float = 0.0):
+    snapshot = {
+        "pending": {"llm": pending},
+        "gauges": {"soniox_streams": streams},
+        "loop_lag": lag,
+    }
+    (load_dir / f"{pid}.json").write_text(json.dumps(snapshot))
+
+
+def _controller(**kwargs) -> AdmissionController:
+    controller = AdmissionController(max_streams=10, **kwargs)
+    # components come from the stubbed snapshots only, no CPU sampling thread
+    controller._ensure_started = lambda: None
+    controller._update(0.0)
+    return controller
+
+
+def test_load_is_the_scarcest_resource(load_dir):
+    _publish(load_dir, 1, streams=3, pending=4)
+    _publish(load_dir, 2, streams=2, lag=0.1)
+    _publish(load_dir, 3, streams=9)
+    # a process that stopped publishing is ignored
+    os.utime(load_dir / "3.json", (0, 0))
+
+    controller = _controller()
+
+    assert controller.components() == {
+        "cpu": 0.0,
+        "streams": 0.5,
+        "pending": 0.1,
+        "loop_lag": pytest.approx(0.4),
+    }
+    assert controller.current_load() == 0.5
+
+
+@pytest.mark.parametrize(
+    ("streams", "decision"), [(4, "accepted"), (7, "rejected"), (9, "rejected")]
+)
+async def test_request_fnc_accepts_below_and_rejects_above_the_soft_threshold(
+    load_dir, streams, decision
+):
+    _publish(load_dir, 1, streams=streams)
+    controller = _controller(defer_timeout=0.3)
+    req = FakeJobRequest()
+
+    await controller.request_fnc(req)
+
+    assert req.decision == decision
+    # only a load between the thresholds waits before being rejected
+    assert controller.deferred == (1 if streams == 7 else 0)
+    assert controller.accepted + controller.rejected == 1
+
+
+async def test_request_fnc_accepts_a_deferred_job_when_load_drops(load_dir):
+    _publish(load_dir, 1, streams=7)
+    controller = _controller(defer_timeout=5.0)
+    req = FakeJobRequest()
+
+    async def _call_ends() -> None:
+        await asyncio.sleep(0.1)
+        _publish(load_dir, 1, streams=2)
+        controller._update(0.0)
+
+    ending = asyncio.create_task(_call_ends())
+    await controller.request_fnc(req)
+    await ending
+
+    assert req.decision == "accepted"
+    assert (controller.accepted, controller.deferred, controller.rejected) == (1, 1, 0)